@@ -47,8 +47,7 @@ mpiexec --verbose -mca orte_abort_on_non_zero_status 1 -n $SLURM_NTASKS python -
 
 echo Saving output files  # Note: the script (and thus cp) is only executed on the first allocated node (so cp *.log would only give part of the logs)
 cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/log0.log" "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"
-cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/saved_results.pickle" "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"  # Does not work well with wildcards
-cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/saved_results_bak.pickle" "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"
+cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/saved_results.journal" "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"  # Does not work well with wildcards
 cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/AnalysisOutput.xml"    "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"
 cp "$LOCALSCRATCH/PDSA-RTS-GMLC/4-PDSA/AnalysisOutput_critical.xml"    "$SLURM_SUBMIT_DIR/PDSA-RTS-GMLC/4-PDSA/"
 
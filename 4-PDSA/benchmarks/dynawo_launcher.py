@@ -0,0 +1,76 @@
+"""
+Compare the per-job overhead of spawning Dynawo from the slave (job.run_with_timeout()) and through the persistent
+launcher (see PERSISTENT_LAUNCHER), for the N-1 contingencies of the first static sample. Simulations are stopped at
+their start time, so that mostly the overhead is timed. With --dry-run, a trivial command is run instead of Dynawo
+(no input files needed), and --ballast-mb allocates memory to mimic the size of a slave (networks, caches...).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/dynawo_launcher.py --nb-contingencies 50
+python benchmarks/dynawo_launcher.py --dry-run --nb-contingencies 1000 --ballast-mb 2000
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from common import *
+from job import run_with_timeout
+import dynawo_launcher
+
+
+def time_commands(cmds, run_function):
+    t0 = time.perf_counter()
+    for cmd in cmds:
+        timed_out, stderr = run_function(cmd, timeout=JOB_TIMEOUT_S)
+        if timed_out or 'Error' in stderr:
+            print(f'Command {cmd} failed')
+    return (time.perf_counter() - t0) / len(cmds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-contingencies', type=int, default=50)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--ballast-mb', type=int, default=0)
+    args = parser.parse_args()
+
+    ballast = bytearray(args.ballast_mb * 10**6)
+    for i in range(0, len(ballast), 4096):  # Touch the pages so that they are actually allocated
+        ballast[i] = 1
+
+    jobs = []
+    if args.dry_run:
+        cmds = [['true']] * args.nb_contingencies
+    else:
+        from natsort import natsorted
+        from contingencies import Contingency
+        from job import Job
+        from dynawo_startup import set_stop_time_to_start_time
+        import dynawo_inputs
+        static_file = natsorted(glob.glob(f'../2-SCOPF/d-Final-dispatch/{CASE}_{NETWORK_NAME}/*.iidm'))[0]
+        static_id = os.path.basename(static_file).split('.')[0]
+        contingencies = [contingency for contingency in Contingency.create_contingency_list() if contingency.order == 1]
+        jobs = [Job(static_id, 1, contingency) for contingency in contingencies[:args.nb_contingencies]]
+        cmds = []
+        for job in jobs:
+            dynawo_inputs.write_job_files(job)
+            jobs_file = os.path.join(job.working_dir, NETWORK_NAME + '.jobs')
+            set_stop_time_to_start_time(jobs_file)
+            cmds.append([DYNAWO_PATH, 'jobs', jobs_file])
+
+    print(f'Spawned by the process: {time_commands(cmds, run_with_timeout) * 1e3:.1f}ms per job')
+    launcher = dynawo_launcher.DynawoLauncher()
+    t0 = time.perf_counter()
+    launcher.start()
+    launcher.run_with_timeout(['true'], timeout=JOB_TIMEOUT_S)
+    print(f'Launcher started in {(time.perf_counter() - t0) * 1e3:.1f}ms')
+    print(f'Spawned by the launcher: {time_commands(cmds, launcher.run_with_timeout) * 1e3:.1f}ms per job')
+    launcher.stop()
+
+    for job in jobs:
+        shutil.rmtree(job.working_dir, ignore_errors=True)
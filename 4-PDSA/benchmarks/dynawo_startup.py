@@ -0,0 +1,84 @@
+"""
+Measure the start-up time of Dynawo (reading the inputs, compiling/loading the models and initialising the simulation)
+per job, without the compilation cache and with it (see COMPILATION_CACHE_DIR). The stop time of the simulations is set
+to their start time, so that only the start-up is timed. Jobs are generated for --nb-contingencies contingencies of the
+first --nb-static-ids static samples. With the cache, the first job of each model set populates the cache. The number
+and size of the files in the entries of the cache are reported (empty entries mean that Dynawo compiled nothing, see
+compilation_cache.py).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/dynawo_startup.py --nb-static-ids 2 --nb-contingencies 10
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from natsort import natsorted
+from common import *
+from contingencies import Contingency
+from job import Job, run_with_timeout
+import compilation_cache
+import dynawo_inputs
+
+
+def set_stop_time_to_start_time(jobs_file):
+    xml.etree.ElementTree.register_namespace('dyn', DYNAWO_NAMESPACE)
+    tree = xml.etree.ElementTree.parse(jobs_file)
+    for simulation in tree.getroot().iter('{%s}simulation' % DYNAWO_NAMESPACE):
+        simulation.set('stopTime', simulation.get('startTime'))
+    tree.write(jobs_file, xml_declaration=True, encoding='UTF-8')
+
+
+def time_startup(jobs: list[Job], cache_dir):
+    dynawo_inputs.COMPILATION_CACHE_DIR = cache_dir
+    compilation_cache.COMPILATION_CACHE_DIR = cache_dir
+    times = []
+    hit_times = []  # Jobs that used models compiled by a previous job
+    for job in jobs:
+        compilation_entry = dynawo_inputs.write_job_files(job)
+        jobs_file = os.path.join(job.working_dir, NETWORK_NAME + '.jobs')
+        set_stop_time_to_start_time(jobs_file)
+        t0 = time.perf_counter()
+        timed_out, stderr = run_with_timeout([DYNAWO_PATH, 'jobs', jobs_file], timeout=JOB_TIMEOUT_S)
+        times.append(time.perf_counter() - t0)
+        if timed_out or 'Error' in stderr:
+            print(f'Job {job} failed')
+        if compilation_entry is not None:
+            compilation_cache.publish(compilation_cache.get_compile_dir(jobs_file), compilation_entry)
+        elif cache_dir is not None:
+            hit_times.append(times[-1])
+        shutil.rmtree(job.working_dir)
+    return times, hit_times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-static-ids', type=int, default=2)
+    parser.add_argument('--nb-contingencies', type=int, default=10)
+    args = parser.parse_args()
+
+    static_files = natsorted(glob.glob(f'../2-SCOPF/d-Final-dispatch/{CASE}_{NETWORK_NAME}/*.iidm'))
+    static_ids = [os.path.basename(file).split('.')[0] for file in static_files[:args.nb_static_ids]]
+    contingencies = Contingency.create_contingency_list()[:args.nb_contingencies]
+    jobs = [Job(static_id, 1, contingency) for static_id in static_ids for contingency in contingencies]
+
+    times, _ = time_startup(jobs, None)
+    print(f'Without compilation cache: {sum(times) / len(times):.2f}s per job')
+
+    cache_dir = tempfile.mkdtemp(prefix='pdsa_compilation_')
+    times, hit_times = time_startup(jobs, cache_dir)
+    print(f'With compilation cache: {sum(times) / len(times):.2f}s per job ({len(times) - len(hit_times)} cache misses)')
+    if hit_times:
+        print(f'With compilation cache, cache hits only: {sum(hit_times) / len(hit_times):.2f}s per job')
+    for entry in sorted(os.listdir(cache_dir)):
+        files = [os.path.join(root, file) for root, _, entry_files in os.walk(os.path.join(cache_dir, entry)) for file in entry_files]
+        print(f'Entry {entry}: {len(files)} files, {sum(os.path.getsize(file) for file in files) / 1e6:.1f}MB')
+    shutil.rmtree(cache_dir)
@@ -0,0 +1,76 @@
+"""
+Measure the time taken to extract the results of a job from the outputs of Dynawo (dynawo_outputs.get_job_results()),
+for the first job of each static sample (the data of the static sample, network and number of synchronous machines,
+then have to be loaded, see STATIC_DATA_CACHE_SIZE) and for the following ones. The N-1 contingencies of the first
+--nb-static-ids static samples are simulated once, and the extraction is repeated --nb-repeats times on their outputs.
+Set NETWORK_NAME in common.py to measure it on the RTS or Texas case.
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/extract_results.py --nb-static-ids 2 --nb-contingencies 20
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from natsort import natsorted
+from common import *
+from contingencies import Contingency
+from job import Job, run_dynawo, JOBS_FILES, DEFAULT_SOLVER
+import dynawo_inputs
+import dynawo_outputs
+import network_cache
+
+
+def time_extraction(jobs):
+    """
+    Return the extraction times of the first job of each static sample and of the other jobs
+    """
+    network_cache.network_cache.clear()
+    dynawo_outputs.static_data_cache.clear()
+    first_times = []
+    times = []
+    for job in jobs:
+        first = str(job.static_id) not in dynawo_outputs.static_data_cache
+        t0 = time.perf_counter()
+        dynawo_outputs.get_job_results(job.working_dir, job.contingency.id, job.contingency.fault_location, job.static_id)
+        (first_times if first else times).append(time.perf_counter() - t0)
+    return first_times, times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-static-ids', type=int, default=2)
+    parser.add_argument('--nb-contingencies', type=int, default=20)
+    parser.add_argument('--nb-repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    static_files = natsorted(glob.glob(f'../2-SCOPF/d-Final-dispatch/{CASE}_{NETWORK_NAME}/*.iidm'))[:args.nb_static_ids]
+    static_ids = [os.path.basename(static_file).split('.')[0] for static_file in static_files]
+    contingencies = [contingency for contingency in Contingency.create_contingency_list() if contingency.order == 1]
+    contingencies = contingencies[:args.nb_contingencies]
+
+    jobs = [Job(static_id, 1, contingency) for static_id in static_ids for contingency in contingencies]
+    t0 = time.perf_counter()
+    for job in jobs:
+        dynawo_inputs.write_job_files(job)
+        cmd = [DYNAWO_PATH, 'jobs', os.path.join(job.working_dir, JOBS_FILES[DEFAULT_SOLVER])]
+        run_dynawo(cmd, timeout=JOB_TIMEOUT_S)
+    print(f'Simulated {len(jobs)} jobs in {time.perf_counter() - t0:.1f}s')
+
+    first_times = []
+    times = []
+    for _ in range(args.nb_repeats):
+        repeat_first_times, repeat_times = time_extraction(jobs)
+        first_times += repeat_first_times
+        times += repeat_times
+    print(f'{NETWORK_NAME}: first job of a static sample: {sum(first_times) / len(first_times) * 1e3:.1f}ms, '
+          f'other jobs: {sum(times) / max(len(times), 1) * 1e3:.2f}ms per job')
+
+    for job in jobs:
+        shutil.rmtree(job.working_dir, ignore_errors=True)
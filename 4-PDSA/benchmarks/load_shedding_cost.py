@@ -0,0 +1,59 @@
+"""
+Compare the closed-form cost of dynawo_outputs.load_shedding_to_cost() with the numerical integration of the VoLL
+(scipy quad over the interpolated VoLL, as previously done for each job), and measure the time taken to compute the cost
+of --nb-results results at once (numpy arrays, e.g. to re-cost the results in postprocessing).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/load_shedding_cost.py --nb-results 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+import numpy as np
+import scipy.integrate
+from scipy.interpolate import interp1d
+from dynawo_outputs import load_shedding_to_cost, VOLL_TIME, VOLL_COST
+
+
+def load_shedding_to_cost_quad(load_shedding, total_load):
+    """
+    Reference cost, integrated numerically
+    """
+    def interpolVoLL(t):
+        return interp1d(VOLL_TIME, VOLL_COST)(max(t, VOLL_TIME[0]))
+
+    H = 0.1419 * load_shedding + 0.6482
+    k = 3
+    return scipy.integrate.quad(lambda t: k/H*np.exp(-k*t/H) * t * interpolVoLL(t), 0, H, epsabs=1e-4, epsrel=1e-4)[0] * load_shedding / 100 * total_load / 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-results', type=int, default=1000000)
+    parser.add_argument('--nb-checks', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    load_sheddings = np.concatenate(([0, 1e-3, 50, 100, 100.1, 100.2], rng.uniform(0, 100, args.nb_checks)))
+    total_load = 4348
+
+    t0 = time.perf_counter()
+    reference = [load_shedding_to_cost_quad(load_shedding, total_load) for load_shedding in load_sheddings]
+    t_reference = (time.perf_counter() - t0) / len(load_sheddings)
+    t0 = time.perf_counter()
+    costs = [load_shedding_to_cost(load_shedding, total_load) for load_shedding in load_sheddings]
+    t_scalar = (time.perf_counter() - t0) / len(load_sheddings)
+    max_error = max(abs(cost - ref) / max(ref, 1e-9) for cost, ref in zip(costs, reference))
+    print(f'Max relative difference with numerical integration: {max_error:.1e}')
+    print(f'Numerical integration: {t_reference * 1e6:.1f}us per result, closed form: {t_scalar * 1e6:.1f}us per result')
+
+    load_sheddings = rng.uniform(0, 100, args.nb_results)
+    total_loads = rng.uniform(3000, 6000, args.nb_results)
+    t0 = time.perf_counter()
+    load_shedding_to_cost(load_sheddings, total_loads)
+    t_vector = (time.perf_counter() - t0) / args.nb_results
+    print(f'Closed form on arrays of {args.nb_results} results: {t_vector * 1e9:.0f}ns per result')
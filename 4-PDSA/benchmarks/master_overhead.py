@@ -0,0 +1,107 @@
+"""
+Measure the dispatch overhead of the master. Slaves run fake jobs that only sleep for a fixed duration, so any time
+above the ideal makespan (nb_jobs * job_duration / nb_slaves) is time where slaves wait for the master. The job queue
+is replaced by a dummy queue that returns batches of NB_RUNS_PER_INDICATOR_EVALUATION jobs, and that can emulate the
+time taken to update the statistical indicators and write the results (--batch-delay).
+
+Run from the 4-PDSA directory, e.g. for 64, 320 and 1024 ranks:
+mpiexec -n 64 python benchmarks/master_overhead.py --nb-jobs 20000 --job-duration 0.1 --batch-delay 5
+Add --hierarchical to use one sub-master per node (see HIERARCHICAL_MASTER), note that sub-masters do not run jobs.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from mpi4py import MPI
+from common import *
+from contingencies import Contingency
+from job import Job
+from master import Master
+from slave import Slave
+from sub_master import SubMaster, get_hierarchical_topology
+
+
+class DummyJobQueue:
+    def __init__(self, nb_jobs, batch_delay, nb_static_ids):
+        self.contingencies = Contingency.create_base_contingency()
+        self.nb_jobs = nb_jobs
+        self.nb_static_ids = nb_static_ids
+        self.batch_delay = batch_delay
+        self.nb_created_jobs = 0
+        self.nb_completed_jobs = 0
+
+    def get_next_jobs(self, init: bool) -> tuple[list[Job], bool]:
+        time.sleep(self.batch_delay)
+        nb_jobs = min(NB_RUNS_PER_INDICATOR_EVALUATION, self.nb_jobs - self.nb_created_jobs)
+        jobs = [Job(str((self.nb_created_jobs + i) % self.nb_static_ids), self.nb_created_jobs + i + 1, self.contingencies[0]) for i in range(nb_jobs)]
+        self.nb_created_jobs += nb_jobs
+        return jobs, False
+
+    def get_additional_jobs(self) -> list[Job]:
+        return []
+
+    def get_saved_job(self, job: Job):
+        return None
+
+    def store_completed_job(self, job: Job, exists=False):
+        self.nb_completed_jobs += 1
+
+    def write_saved_results(self):
+        pass
+
+    def write_analysis_output(self, done=False):
+        pass
+
+    def log_early_termination_statistics(self):
+        pass
+
+
+def sleep_instead_of_dynawo(job: Job):
+    time.sleep(job_duration)
+    job.skip()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-jobs', type=int, default=10000)
+    parser.add_argument('--job-duration', type=float, default=0.1, help='Duration of a fake job in seconds')
+    parser.add_argument('--batch-delay', type=float, default=0, help='Time taken by the dummy get_next_jobs() in seconds')
+    parser.add_argument('--hierarchical', action='store_true', help='Use one sub-master per node')
+    parser.add_argument('--nb-static-ids', type=int, default=8760, help='Number of static samples the jobs are spread over (to measure the affinity of the dispatch)')
+    args = parser.parse_args()
+    job_duration = args.job_duration
+
+    rank = MPI.COMM_WORLD.Get_rank()
+    size = MPI.COMM_WORLD.Get_size()
+
+    if args.hierarchical:
+        node_comm, slaves, sub_masters, sub_master, local_slaves = get_hierarchical_topology()
+        nb_slaves = size - 1 - len(sub_masters)
+    else:
+        node_comm, slaves, sub_masters, sub_master, local_slaves = MPI.COMM_WORLD, range(1, size), [], 0, []
+        nb_slaves = size - 1
+
+    MPI.COMM_WORLD.Barrier()
+    t0 = time.time()
+    if rank == 0:
+        job_queue = DummyJobQueue(args.nb_jobs, args.batch_delay, args.nb_static_ids)
+        master = Master(slaves=slaves, job_queue=job_queue, hierarchical=args.hierarchical)
+        elapsed_time = time.time() - t0
+
+        ideal_time = args.nb_jobs * args.job_duration / nb_slaves
+        idle_time_per_job = (elapsed_time * nb_slaves - args.nb_jobs * args.job_duration) / args.nb_jobs
+        print(f'{size} ranks, {job_queue.nb_completed_jobs} jobs of {args.job_duration}s, batch delay of {args.batch_delay}s')
+        print(f'Elapsed time: {elapsed_time:.3f}s, ideal time: {ideal_time:.3f}s, efficiency: {ideal_time / elapsed_time * 100:.1f}%')
+        print(f'Master overhead per job (slave idle time): {idle_time_per_job * 1e3:.3f}ms')
+        if not args.hierarchical:  # Not tracked for sub-masters
+            print(f'Jobs sent to a slave that recently ran the same static sample: {master.nb_affine_jobs / master.nb_dispatched_jobs * 100:.1f}%')
+    elif rank in sub_masters:
+        SubMaster(node_comm, slaves=local_slaves)
+    else:
+        Job.call_dynawo = sleep_instead_of_dynawo
+        if sub_master is None:  # No sub-master on the node of this rank
+            node_comm, sub_master = MPI.COMM_WORLD, 0
+        Slave(Contingency.create_base_contingency(), comm=node_comm, master=sub_master)
@@ -0,0 +1,93 @@
+"""
+Compare the memory used by the results of completed jobs (measured with pympler's asizeof, as in the probe of
+Master.show_memory_usage()) in the compact representation of results.py and in the previous one (dataclass with a list
+of TimeLineEvent objects and lists of ids, the strings of each job being read from its own timeline). Synthetic results
+are created for --nb-jobs jobs, --share-with-trips of them having between 1 and --max-trip-events trip events (models
+drawn from --nb-models model names). Also checks that the trip timelines are unchanged.
+
+Requires pympler (python -m pip install pympler). Run from the 4-PDSA directory, e.g.
+python benchmarks/results_memory.py --nb-jobs 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from pympler import asizeof
+from common import *
+from dynawo_outputs import TimeLineEvent
+from results import Results
+import results as results_module
+
+DESCRIPTIONS = ['Distance protection tripped zone 2', 'Distance protection tripped zone 3', 'Distance protection tripped zone 1', 'UFLS step 1 activated', 'GENERATOR : disconnecting']
+
+
+@dataclass
+class LegacyResults:
+    load_shedding: float
+    cost: float
+    trip_timeline: list[TimeLineEvent]
+    excited_hidden_failures: list[str]
+    excited_generator_failures: list[str]
+
+
+def create_timelines(nb_jobs, share_with_trips, max_trip_events, nb_models):
+    """
+    Return the lines of the timeline of each job (events are read from these lines, as by dynawo_outputs)
+    """
+    random.seed(0)
+    timelines = []
+    for _ in range(nb_jobs):
+        timeline = []
+        if random.random() < share_with_trips:
+            t = T_INIT
+            for _ in range(random.randint(1, max_trip_events)):
+                t += round(random.uniform(0.001, 2), 6)
+                timeline.append('{} | LINE_{}_Side2_Distance | {}'.format(round(t, 6), random.randrange(nb_models), random.choice(DESCRIPTIONS)))
+        timelines.append(timeline)
+    return timelines
+
+
+def create_results(timelines, results_class):
+    all_results = []
+    for timeline in timelines:
+        trip_timeline = []
+        for line in timeline:
+            time_, model, event_description = line.split(' | ')
+            trip_timeline.append(TimeLineEvent(float(time_), model, event_description))
+        hidden_failures = [event.model for event in trip_timeline[:2]]
+        all_results.append(results_class(random.uniform(0, 100), random.uniform(0, 500), trip_timeline, hidden_failures, []))
+    return all_results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-jobs', type=int, default=100000)
+    parser.add_argument('--share-with-trips', type=float, default=0.3)
+    parser.add_argument('--max-trip-events', type=int, default=20)
+    parser.add_argument('--nb-models', type=int, default=500)
+    args = parser.parse_args()
+
+    timelines = create_timelines(args.nb_jobs, args.share_with_trips, args.max_trip_events, args.nb_models)
+
+    for name, results_class in [('Previous', LegacyResults), ('Compact', Results)]:
+        t0 = time.perf_counter()
+        all_results = create_results(timelines, results_class)
+        delta_t = time.perf_counter() - t0
+        size = asizeof.asizeof(all_results)
+        if results_class is Results:
+            size += asizeof.asizeof(results_module.model_names, results_module.event_descriptions)
+            compact_results = all_results
+        else:
+            legacy_results = all_results
+        print(f'{name:>10}: {size / 1e6:.1f}MB ({size / args.nb_jobs:.0f}B per job), created in {delta_t / args.nb_jobs * 1e6:.1f}us per job')
+
+    for legacy, compact in zip(legacy_results, compact_results):
+        assert [(event.model, event.event_description) for event in legacy.trip_timeline] == [(event.model, event.event_description) for event in compact.trip_timeline]
+        assert all(abs(a.time - b.time) <= 1e-6 * max(a.time, 1) for a, b in zip(legacy.trip_timeline, compact.trip_timeline))
+        assert list(legacy.excited_hidden_failures) == list(compact.excited_hidden_failures)
+    print('Trip timelines identical (times up to float32 precision)')
@@ -0,0 +1,121 @@
+"""
+Compare the pickled Job objects previously exchanged between the master and the slaves with the compact encoding of
+job_messages.py (message size, encoding and decoding times). With more than one rank, also measure the rate at which
+the master (rank 0) can receive completed jobs from all other ranks with both formats.
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/serialization.py --nb-trip-events 20
+mpiexec -n 64 python benchmarks/serialization.py --nb-messages 1000
+"""
+
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from mpi4py import MPI
+from common import *
+from contingencies import Contingency
+from dynawo_outputs import TimeLineEvent
+from job import Job
+from results import Results
+import job_messages
+
+
+def create_completed_job(nb_trip_events):
+    contingency = Contingency.create_base_contingency()[0]
+    job = Job('2019-01-01_0000', 3, contingency)
+    trip_timeline = [TimeLineEvent(1.0 + 0.05 * i, 'LINE_{}_Side2_Distance'.format(i), 'Distance protection tripped zone 2') for i in range(nb_trip_events)]
+    job.results = Results(12.5, 1.3e5, trip_timeline, ['LINE_1_Side2_Distance'], [])
+    job.elapsed_time = 42.0
+    job.completed = True
+    if WITH_SCREENING:
+        job.voltage_stable, job.transient_stable, job.frequency_stable = True, False, True
+        job.shc_ratio, job.cct, job.RoCoF, job.power_loss_over_reserve = 3.2, 0.25, 0.1, 0.5
+    return job
+
+
+def time_function(function, nb_repetitions):
+    t0 = time.perf_counter()
+    for _ in range(nb_repetitions):
+        function()
+    return (time.perf_counter() - t0) / nb_repetitions
+
+
+def local_benchmark(nb_trip_events, nb_repetitions):
+    job = create_completed_job(nb_trip_events)
+    contingencies = {job.contingency.id: job.contingency}
+
+    pickled_request = pickle.dumps(job)  # Requests were full (not yet completed) jobs, the results only add a few bytes
+    encoded_request = job_messages.encode_job_request(job)
+    pickled_result = pickle.dumps(job)
+    encoded_result = job_messages.encode_job_result(job, job.id)
+
+    print(f'Job with {nb_trip_events} trip events')
+    print(f'{"":>10}{"pickle":>12}{"encoded":>12}')
+    print(f'{"Request":>10}{len(pickled_request):>11}B{len(encoded_request):>11}B')
+    print(f'{"Result":>10}{len(pickled_result):>11}B{len(encoded_result):>11}B')
+
+    timings = [
+        ('Encode request', lambda: pickle.dumps(job), lambda: job_messages.encode_job_request(job)),
+        ('Decode request', lambda: pickle.loads(pickled_request), lambda: job_messages.decode_job_request(encoded_request, contingencies)),
+        ('Encode result', lambda: pickle.dumps(job), lambda: job_messages.encode_job_result(job, job.id)),
+        ('Decode result', lambda: pickle.loads(pickled_result), lambda: job_messages.decode_job_result(encoded_result, job)),
+    ]
+    for name, pickle_function, encode_function in timings:
+        pickle_time = time_function(pickle_function, nb_repetitions)
+        encode_time = time_function(encode_function, nb_repetitions)
+        print(f'{name}: pickle {pickle_time * 1e6:.1f}us, encoded {encode_time * 1e6:.1f}us')
+
+
+def mpi_benchmark(nb_trip_events, nb_messages):
+    comm = MPI.COMM_WORLD
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    job = create_completed_job(nb_trip_events)
+
+    # Pickled messages (lowercase mpi4py methods)
+    comm.Barrier()
+    t0 = time.perf_counter()
+    if rank == 0:
+        for _ in range(nb_messages * (size - 1)):
+            job = comm.recv(source=MPI.ANY_SOURCE, tag=MPI_TAGS.DONE.value)
+    else:
+        for _ in range(nb_messages):
+            comm.send(job, dest=0, tag=MPI_TAGS.DONE.value)
+    comm.Barrier()
+    pickle_time = time.perf_counter() - t0
+
+    # Buffer-based messages
+    comm.Barrier()
+    t0 = time.perf_counter()
+    if rank == 0:
+        buffer = bytearray(MPI_RECV_BUFFER_SIZE)
+        for _ in range(nb_messages * (size - 1)):
+            comm.Recv([buffer, MPI.BYTE], source=MPI.ANY_SOURCE, tag=MPI_TAGS.DONE.value)
+            job_messages.decode_job_result(buffer, job)
+    else:
+        for _ in range(nb_messages):
+            comm.Send([job_messages.encode_job_result(job, job.id), MPI.BYTE], dest=0, tag=MPI_TAGS.DONE.value)
+    comm.Barrier()
+    encoded_time = time.perf_counter() - t0
+
+    if rank == 0:
+        nb_received = nb_messages * (size - 1)
+        print(f'{size - 1} senders, {nb_received} completed jobs with {nb_trip_events} trip events received by rank 0')
+        print(f'Pickle: {nb_received / pickle_time:.0f} jobs/s, encoded: {nb_received / encoded_time:.0f} jobs/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-trip-events', type=int, default=10)
+    parser.add_argument('--nb-repetitions', type=int, default=10000, help='Number of repetitions of the local benchmark')
+    parser.add_argument('--nb-messages', type=int, default=1000, help='Number of messages sent by each rank in the MPI benchmark')
+    args = parser.parse_args()
+
+    if MPI.COMM_WORLD.Get_size() == 1:
+        local_benchmark(args.nb_trip_events, args.nb_repetitions)
+    else:
+        mpi_benchmark(args.nb_trip_events, args.nb_messages)
@@ -0,0 +1,118 @@
+"""
+Check that dynawo_outputs.compare_trip_timelines() (used for special jobs) gives the same variable order and missing
+events flags as the previous implementation (nested loops over the slow and fast trip timelines) on --nb-checks random
+trip timelines, and compare their times on long cascades (--nb-trips trips, e.g. on the Texas case).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/special_job_order.py --nb-checks 100000 --nb-trips 500
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from dynawo_outputs import TimeLineEvent, timeline_events_match, compare_trip_timelines
+
+DESCRIPTIONS = ['Distance protection tripped zone {}'.format(zone) for zone in range(1, 5)] + ['UFLS step 1 activated', 'GENERATOR : disconnecting']
+
+
+def compare_trip_timelines_reference(trip_timeline):
+    """
+    Previous implementation of compare_trip_timelines()
+    """
+    slow_trip_timeline = [timeline_event for timeline_event in trip_timeline if 'tripped zone 2' in timeline_event.event_description or 'tripped zone 3' in timeline_event.event_description]
+    fast_trip_timeline = [timeline_event for timeline_event in trip_timeline if 'tripped zone 1' in timeline_event.event_description or 'tripped zone 4' in timeline_event.event_description]
+
+    for i, timeline_event in enumerate(fast_trip_timeline):
+        if timeline_event.event_description == 'Distance protection tripped zone 1':
+            fast_trip_timeline[i] = TimeLineEvent(timeline_event.time, timeline_event.model, "Distance protection tripped zone 2")
+        if timeline_event.event_description == 'Distance protection tripped zone 4':
+            fast_trip_timeline[i] = TimeLineEvent(timeline_event.time, timeline_event.model, "Distance protection tripped zone 3")
+
+    same_order = True
+    index = 0
+    for slow_timeline_event in slow_trip_timeline:
+        time = float(slow_timeline_event.time)
+        for following_timeline_event in slow_trip_timeline[index+1:]:
+            for fast_timeline_event in fast_trip_timeline:
+                if timeline_events_match(fast_timeline_event, following_timeline_event):
+                    fast_time = float(fast_timeline_event.time)
+                    if fast_time + 0.07 < time:
+                        same_order = False
+                    break
+        index += 1
+
+    missing_events = False
+    for fast_timeline_event in fast_trip_timeline:
+        found = False
+        for slow_timeline_event in slow_trip_timeline:
+            if timeline_events_match(fast_timeline_event, slow_timeline_event):
+                found = True
+                break
+        if not found:
+            missing_events = True
+            break
+    for slow_timeline_event in slow_trip_timeline:
+        found = False
+        for fast_timeline_event in fast_trip_timeline:
+            if timeline_events_match(fast_timeline_event, slow_timeline_event):
+                found = True
+                break
+        if not found:
+            missing_events = True
+            break
+
+    return not same_order, missing_events
+
+
+def create_trip_timeline(nb_trips, nb_models):
+    """
+    Random trip timeline of a special job: slow trips of some models, with fast equivalents of most of them (with
+    perturbed times), plus a few unrelated trips. Times are not necessarily sorted
+    """
+    models = ['LINE_{}_Side{}_Distance'.format(random.randrange(nb_models), random.randint(1, 2)) for _ in range(nb_trips)]
+    trip_timeline = []
+    t = 5
+    for model in models:
+        t += random.choice([0, 0.01, 0.05, 0.1, 0.3])
+        zone = random.choice([2, 3])
+        trip_timeline.append(TimeLineEvent(t, model, 'Distance protection tripped zone {}'.format(zone)))
+        if random.random() < 0.9:
+            fast_time = t - random.choice([0, 0.02, 0.07, 0.08, 0.2, 0.5, 1])
+            trip_timeline.append(TimeLineEvent(fast_time, model, 'Distance protection tripped zone {}'.format(zone - 1 if zone == 2 else 4)))
+    for _ in range(random.randint(0, 2)):
+        trip_timeline.append(TimeLineEvent(random.uniform(5, t), random.choice(models + ['GEN_1']), random.choice(DESCRIPTIONS)))
+    if random.random() < 0.1:
+        random.shuffle(trip_timeline)
+    else:
+        trip_timeline.sort(key=lambda event: event.time)
+    return trip_timeline
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-checks', type=int, default=100000)
+    parser.add_argument('--nb-trips', type=int, default=500)
+    args = parser.parse_args()
+
+    random.seed(0)
+    nb_flags = [0, 0]
+    for _ in range(args.nb_checks):
+        trip_timeline = create_trip_timeline(random.randint(0, 6), random.randint(1, 6))
+        flags = compare_trip_timelines(trip_timeline)
+        reference_flags = compare_trip_timelines_reference(trip_timeline)
+        if flags != reference_flags:
+            print('Different flags {} (reference {}) for timeline {}'.format(flags, reference_flags, trip_timeline))
+            sys.exit(1)
+        nb_flags[0] += flags[0]
+        nb_flags[1] += flags[1]
+    print(f'{args.nb_checks} random timelines: same flags as the previous implementation (variable order: {nb_flags[0]}, missing events: {nb_flags[1]})')
+
+    trip_timeline = create_trip_timeline(args.nb_trips, args.nb_trips)
+    for name, function in [('Previous', compare_trip_timelines_reference), ('Indexed', compare_trip_timelines)]:
+        t0 = time.perf_counter()
+        flags = function(trip_timeline)
+        print(f'{name:>10}: {(time.perf_counter() - t0) * 1e3:.2f}ms for {len(trip_timeline)} trip events, flags {flags}')
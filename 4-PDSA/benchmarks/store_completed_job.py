@@ -0,0 +1,58 @@
+"""
+Measure the cost of JobQueue.store_completed_job() as the number of stored jobs grows. Synthetic jobs are spread
+over --nb-contingencies contingencies and --nb-static-ids static ids, and the time taken by each chunk of jobs is
+printed. With constant-time lookups, the time per chunk should stay flat (up to the cost of the dict resizes).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/store_completed_job.py --nb-jobs 1000000 --nb-contingencies 100 --nb-static-ids 8760
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from common import *
+from contingencies import Contingency
+from job import Job
+from job_queue import JobQueue
+from results import Results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-jobs', type=int, default=10**6)
+    parser.add_argument('--nb-contingencies', type=int, default=100)
+    parser.add_argument('--nb-static-ids', type=int, default=8760)
+    parser.add_argument('--nb-chunks', type=int, default=10)
+    args = parser.parse_args()
+
+    contingencies = [Contingency('Contingency_{}'.format(i), 1, 1e-3, [], 0.1) for i in range(args.nb_contingencies)]
+    static_ids = ['Static_{}'.format(i) for i in range(args.nb_static_ids)]
+
+    os.chdir(tempfile.mkdtemp())  # Do not load or overwrite saved results of actual runs
+    job_queue = JobQueue(contingencies)
+
+    results = Results(1, 1, [], [], [])  # Shared between all jobs to limit memory usage
+    chunk_size = args.nb_jobs // args.nb_chunks
+    t_start = time.perf_counter()
+    for chunk in range(args.nb_chunks):
+        jobs = []
+        for i in range(chunk * chunk_size, (chunk + 1) * chunk_size):
+            # Go through all contingencies for a static id before moving to the next one, so that the number of static
+            # ids per contingency (the size of the former lists) grows with the number of jobs
+            job = Job(static_ids[(i // args.nb_contingencies) % args.nb_static_ids], i, contingencies[i % args.nb_contingencies])
+            job.results = results
+            job.elapsed_time = 1
+            job.completed = True
+            jobs.append(job)
+
+        t0 = time.perf_counter()
+        for job in jobs:
+            job_queue.store_completed_job(job, exists=True)  # exists=True to not also write all jobs to the result journal
+        delta_t = time.perf_counter() - t0
+        print(f'Jobs {chunk * chunk_size:>8} to {(chunk + 1) * chunk_size:>8}: {delta_t:.3f}s ({delta_t / chunk_size * 1e6:.2f}us per job)')
+    print(f'Total: {time.perf_counter() - t_start:.3f}s')
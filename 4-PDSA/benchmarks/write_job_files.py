@@ -0,0 +1,160 @@
+"""
+Measure the time taken to generate the input files of a job (dynawo_inputs.write_job_files()), without the caches of
+the slaves and with them. Jobs are generated for --nb-contingencies contingencies of each of the first --nb-static-ids
+static samples, the jobs of a given static sample being consecutive (as when a slave runs several jobs on the same
+sample). The files are written with ElementTree and with the streaming writer (see STREAMING_XML_WRITER). With
+--check, the files written by both writers are compared after canonicalisation instead. --check-synthetic does the same
+comparison without the static samples (no network needed), on --nb-contingencies synthetic jobs with init events and
+protections of synthetic generators and lines (all elements of a job except UFLS, random settings and hidden failures).
+
+Run from the 4-PDSA directory, e.g.
+python benchmarks/write_job_files.py --nb-static-ids 3 --nb-contingencies 10
+python benchmarks/write_job_files.py --nb-static-ids 1 --nb-contingencies 100 --check
+python benchmarks/write_job_files.py --nb-contingencies 100 --check-synthetic
+"""
+
+import argparse
+import copy
+import glob
+import os
+import random
+import tempfile
+import shutil
+import sys
+import time
+import xml.etree.ElementTree
+from pathlib import Path
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+from natsort import natsorted
+from common import *
+from contingencies import Contingency, InitEvent, InitFault
+from job import Job
+import dynawo_inputs
+import dynawo_init_events
+import dynawo_protections
+import xml_stream
+
+
+def time_jobs(jobs: list[Job]):
+    times = []
+    for job in jobs:
+        t0 = time.perf_counter()
+        dynawo_inputs.write_job_files(job)
+        times.append(time.perf_counter() - t0)
+        shutil.rmtree(job.working_dir)
+    return times
+
+
+def canonicalise(path):
+    return xml.etree.ElementTree.canonicalize(from_file=path, strip_text=True, rewrite_prefixes=True)
+
+
+def check_streaming_writer(jobs: list[Job]):
+    """
+    Check that the dyd and par files written with the streaming writer are equivalent to the ones written with ElementTree
+    """
+    nb_differences = 0
+    for job in jobs:
+        files = []
+        for streaming in [False, True]:
+            dynawo_inputs.STREAMING_XML_WRITER = streaming
+            dynawo_inputs.dyn_data_cache.clear()
+            dynawo_inputs.write_job_files(job)
+            files.append([canonicalise(os.path.join(job.working_dir, NETWORK_NAME + extension)) for extension in ['.dyd', '.par']])
+            shutil.rmtree(job.working_dir)
+        if files[0] != files[1]:
+            print(f'Files of job {job} differ')
+            nb_differences += 1
+    print(f'{len(jobs) - nb_differences}/{len(jobs)} jobs with equivalent files')
+    return nb_differences == 0
+
+
+def add_synthetic_job_elements(dyd_root, par_root, seed, nb_generators=20, nb_lines=50):
+    """
+    Add the elements of a synthetic job, as dynawo_protections.add_protections() (except UFLS) with random line settings
+    """
+    random.seed(seed)
+    init_events = [InitFault(T_INIT, INIT_EVENT_CATEGORIES.BUS_FAULT, 'BUS_{}'.format(seed), 'FAULT', 1e-4, 1e-4, T_INIT + 0.1)]
+    init_events += [InitEvent(T_INIT + 0.1, category, 'ELEMENT_{}'.format(seed)) for category in
+                    [INIT_EVENT_CATEGORIES.LINE_DISC, INIT_EVENT_CATEGORIES.GEN_DISC, INIT_EVENT_CATEGORIES.LINE_RECLOSE]]
+    dynawo_init_events.add_init_events(dyd_root, par_root, init_events)
+
+    dyd_root.append(xml_stream.etree.Comment('Generator protections'))
+    for i in range(nb_generators):
+        gen_id = 'GEN_{}'.format(i)
+        dynawo_protections.add_gen_speed_protection(dyd_root, par_root, gen_id, 0.08, 0.01)
+        dynawo_protections.add_gen_UVA_protection(dyd_root, par_root, gen_id, 0.08, 0.01)
+        dynawo_protections.add_gen_OOS_protection(dyd_root, par_root, gen_id, 0.08, 0.01)
+
+    dyd_root.append(xml_stream.etree.Comment('Line protection'))
+    protection_hidden_failures = ['LINE_{}_side1_Distance_hidden_failure_Z2'.format(seed % nb_lines), 'LINE_{}_side2_Distance_hidden_failure_Z3'.format((seed + 1) % nb_lines)]
+    for i in range(nb_lines):
+        sides = [{zone: random.uniform(0.01, 1) for zone in ['X1', 'R1', 'X2', 'R2', 'X3', 'R3', 'X4', 'R4']} for _ in range(2)]
+        line_settings = {'line_id': 'LINE_{}'.format(i), 'distance': i % 4 != 0, 'sides': sides,
+                         'blinder_reach': random.uniform(0.01, 1), 'overload_I_max': random.uniform(100, 1000)}
+        dynawo_protections.add_line_dist_protection(dyd_root, par_root, line_settings, 0.08, 0.01, seed % 2 == 0, protection_hidden_failures)
+        dynawo_protections.add_line_overload_protection(dyd_root, par_root, line_settings)
+
+
+def check_element_writer(nb_jobs):
+    """
+    Check that the dyd and par files written with xml_stream.ElementWriter are equivalent to the ones written with
+    ElementTree for synthetic jobs
+    """
+    dyd_root = xml_stream.etree.Element(xml_stream.etree.QName(DYNAWO_NAMESPACE, 'dynamicModelsArchitecture'))
+    xml_stream.etree.SubElement(dyd_root, xml_stream.etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), {'id': 'OMEGA_REF', 'lib': 'DYNModelOmegaRef', 'parFile': NETWORK_NAME + '.par', 'parId': 'OmegaRef'})
+    par_root = xml_stream.etree.Element(xml_stream.etree.QName(DYNAWO_NAMESPACE, 'parametersSet'))
+    omega_ref_set = xml_stream.etree.SubElement(par_root, xml_stream.etree.QName(DYNAWO_NAMESPACE, 'set'), {'id': 'OmegaRef'})
+    xml_stream.etree.SubElement(omega_ref_set, xml_stream.etree.QName(DYNAWO_NAMESPACE, 'par'), {'type': 'DOUBLE', 'name': 'weight_gen_0', 'value': '1'})
+    (dyd_start, dyd_end), (par_start, par_end) = xml_stream.serialise_root(dyd_root), xml_stream.serialise_root(par_root)
+
+    directory = tempfile.mkdtemp()
+    paths = {name: os.path.join(directory, name) for name in ['tree.dyd', 'tree.par', 'stream.dyd', 'stream.par']}
+    nb_differences = 0
+    for seed in range(nb_jobs):
+        job_dyd_root, job_par_root = copy.deepcopy(dyd_root), copy.deepcopy(par_root)
+        add_synthetic_job_elements(job_dyd_root, job_par_root, seed)
+        for root, path in [(job_dyd_root, paths['tree.dyd']), (job_par_root, paths['tree.par'])]:
+            tree = xml_stream.etree.ElementTree(root)
+            xml_stream.etree.indent(tree, space='\t')
+            tree.write(path, xml_declaration=True, encoding='UTF-8')
+
+        with xml_stream.ElementWriter(paths['stream.dyd'], dyd_start, dyd_end) as dyd_writer, xml_stream.ElementWriter(paths['stream.par'], par_start, par_end) as par_writer:
+            add_synthetic_job_elements(dyd_writer, par_writer, seed)
+
+        if any(canonicalise(paths['tree' + extension]) != canonicalise(paths['stream' + extension]) for extension in ['.dyd', '.par']):
+            print(f'Files of synthetic job {seed} differ')
+            nb_differences += 1
+    shutil.rmtree(directory)
+    print(f'{nb_jobs - nb_differences}/{nb_jobs} synthetic jobs with equivalent files ({dyd_writer.nb_elements} elements in the last dyd file)')
+    return nb_differences == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nb-static-ids', type=int, default=3)
+    parser.add_argument('--nb-contingencies', type=int, default=10)
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--check-synthetic', action='store_true')
+    args = parser.parse_args()
+
+    if args.check_synthetic:
+        sys.exit(0 if check_element_writer(args.nb_contingencies) else 1)
+
+    static_files = natsorted(glob.glob(f'../2-SCOPF/d-Final-dispatch/{CASE}_{NETWORK_NAME}/*.iidm'))
+    static_ids = [os.path.basename(file).split('.')[0] for file in static_files[:args.nb_static_ids]]
+    contingencies = Contingency.create_contingency_list()[:args.nb_contingencies]
+    jobs = [Job(static_id, 1, contingency) for static_id in static_ids for contingency in contingencies]
+
+    if args.check:
+        sys.exit(0 if check_streaming_writer(jobs) else 1)
+
+    cache_size = dynawo_inputs.DYN_DATA_CACHE_SIZE
+    for label, size, streaming in [('Without cache', 0, False), ('With cache', cache_size, False), ('With cache and streaming writer', cache_size, True)]:
+        dynawo_inputs.DYN_DATA_CACHE_SIZE = size
+        dynawo_inputs.STREAMING_XML_WRITER = streaming
+        dynawo_inputs.dyn_data_cache.clear()
+        times = time_jobs(jobs)
+        first_jobs = times[::len(contingencies)]  # First job of each static sample (cache miss)
+        print(f'{label}: {sum(times) / len(times):.3f}s per job (first job of a static sample: {sum(first_jobs) / len(first_jobs):.3f}s)')
@@ -16,6 +16,15 @@ class INIT_EVENT_CATEGORIES(Enum):
 DYNAWO_PATH = '/home/ulb/beams_energy/fsabot/dynawo/dynawo.sh'
 DYNAWO_NAMESPACE = 'http://www.rte-france.com/dynawo'
 WITH_LXML = False  # Use lxml instead of the default python xml handler, better looking prints but leaks memory
+STREAMING_XML_WRITER = False  # Write the job-specific parts of the dyd and par files element by element after the part common to all jobs of a static sample (faster and uses less memory, but files are not indented)
+ADAPTIVE_SOLVER_SELECTION = False  # If True, jobs start with the alternative solver (*_alt_solver.jobs) when past runs of similar jobs indicate that it is faster than starting with the default solver and retrying with the alternative one on failure
+SOLVER_SELECTION_MIN_ATTEMPTS = 10  # Minimum number of attempts of a solver on a static id (resp. base contingency) for its statistics to be used to choose the solver
+SOLVER_SELECTION_MIN_PAIR_ATTEMPTS = 3  # Same for a (base contingency, static id) pair, so that a single failure does not decide the solver of all the jobs of the pair
+SOLVER_SELECTION_EXPLORATION_PERIOD = 20  # One in this many jobs that would start with the alternative solver starts with the default solver instead, so that the statistics of the default solver keep being updated
+EARLY_TERMINATION = False  # If True, simulations are stopped before T_END when their outcome is decided (see early_termination.py), the timeline must then be written while Dynawo runs
+EARLY_TERMINATION_CRITERIA = ['blackout']  # 'blackout': all machines disconnected, 'quiet': no event during EARLY_TERMINATION_QUIET_TIME_S after T_BACKUP (only valid if no slower phenomenon acts after the quiet period)
+EARLY_TERMINATION_QUIET_TIME_S = 10  # Should be longer than the slowest protection or control acting after the fault
+EARLY_TERMINATION_POLLING_PERIOD_S = 1  # Period (wall time) at which the outputs of running simulations are read
 
 RANDOMISE_DYN_DATA = True  # Whether or not to account for protection-related uncertainty
 NETWORK_NAME = 'RTS'
@@ -35,8 +44,9 @@ elif NETWORK_NAME == 'IEEE39':
 else:
     raise NotImplementedError
 
-REUSE_RESULTS = True  # If true, don't rerun cases already simulated, note that setting this to False does not delete old versions of saved_results.pickle and saved_results_bak.pickle
-REUSE_RESULTS_FAST_FORWARD = True  # If True, load all results from saved_results.pickle even if not relevant
+REUSE_RESULTS = True  # If true, don't rerun cases already simulated, note that setting this to False does not delete old versions of saved_results.journal
+REUSE_RESULTS_FAST_FORWARD = True  # If True, load all results from saved_results.journal even if not relevant
+JOURNAL_COMPACTION_RATIO = 1.5  # The result journal is rewritten when it contains more than JOURNAL_COMPACTION_RATIO records per saved job (older records of jobs that were run again)
 WITH_SCREENING = False
 BYPASS_SCREENING = True  # If True, simulate scenarios which are deemed secure by the screening process (necessary to estimate false negative rate)
 
@@ -48,6 +58,31 @@ DOUBLE_MC_LOOP = True  # Whether to use an indicator to predict the scenarios th
 # and run multiple (MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED) MC simulations for them. Otherwise, a single sample of protection parameters
 # is taken per sample of operating conditions
 
+# Master/slave communication
+MPI_RECV_BUFFER_SIZE = 2**20  # Size (in bytes) of the buffers in which the master receives completed jobs, must be larger than any encoded job result (see job_messages.py)
+PREFETCH_DEPTH = 2  # Maximum number of jobs (running + queued) held by each slave, 1 means that slaves wait for the master between each job
+MASTER_POLLING_PERIOD_S = 1e-3  # Sleep time of the master when no message is received (avoids starving the background thread)
+HIERARCHICAL_MASTER = False  # If True, one rank per node (sub-master) relays jobs between the master and the other ranks of the node, so that the master only communicates with one rank per node (useful for 1000+ ranks)
+SUB_MASTER_RESULT_BATCH_SIZE = 32  # Maximum number of job results a sub-master sends at once to the master, sub-masters also hold this many extra jobs to keep their slaves busy while results are batched
+SUB_MASTER_FLUSH_PERIOD_S = 0.5  # Maximum time during which a sub-master holds a job result before sending it to the master
+AFFINITY_DISPATCH = True  # If True, the master preferably sends jobs to slaves that recently ran a job on the same static sample (to reuse their caches, see below). Not used with HIERARCHICAL_MASTER (the slaves of a sub-master are not tracked)
+AFFINITY_WINDOW_PER_SLAVE = 2  # Jobs are only sent out of order for affinity if they are among the next AFFINITY_WINDOW_PER_SLAVE * nb_slaves jobs of the queue (so that the longest jobs are still sent first)
+
+# Slave caches
+DYN_DATA_CACHE_SIZE = 4  # Number of static samples for which each slave keeps the dyd/par files with the dynamic data (common to all contingencies), 0 to disable
+NETWORK_CACHE_SIZE = 4  # Maximum number of static networks (iidm) kept loaded by each slave
+NETWORK_CACHE_MEMORY_MB = 2000  # Maximum (estimated) memory used by the networks kept loaded by each slave, the last used network is always kept
+STATIC_DATA_CACHE_SIZE = 16  # Number of static samples for which each slave keeps the data needed to extract the results of the jobs (total load, loads, candidate generator failures, number of synchronous machines)
+PROTECTION_SETTINGS_CACHE_SIZE = 16  # Number of network topologies for which each slave keeps the deterministic settings of the line protections
+COMPILATION_CACHE_DIR = None  # Directory (preferably node-local, e.g. '/tmp/pdsa_compilation') where the models compiled by Dynawo are kept and shared by the slaves of a node (see compilation_cache.py), None to compile them in the working directory of each job. Only useful if the dyd files define models (modelicaModel, modelTemplate), which is not the case of the cases of 3-DynData
+
+# Working directories of the jobs
+SCRATCH_BACKEND = 'shared'  # 'shared': in ./simulations, 'shm': in memory (/dev/shm), 'node_local': in SCRATCH_DIR, 'worker': a single working directory per slave in SCRATCH_DIR, reused by all its jobs
+SCRATCH_DIR = '/tmp/pdsa'  # Preferably on a local disk of the compute nodes, only used with the 'node_local' and 'worker' backends
+LINK_INPUT_FILES = True  # Hard link (or symlink) the static networks in the working directories instead of copying them (other input files are always copied, see scratch.py)
+PERSISTENT_LAUNCHER = False  # If True, Dynawo is spawned by a small launcher process started once per slave (see dynawo_launcher.py) instead of by the slave itself (not supported on Windows)
+CLEANUP_BATCH_SIZE = 16  # Working directories of completed jobs are deleted by a background thread of the slaves in batches of this size, 0 to delete them immediately
+
 if NETWORK_NAME == 'RTS':
     MAX_CONSEQUENCES = 500  # Average consequences of a full blackout, i.e. result of load_shedding_to_cost(100, average_load), with average load = 4348 MW
 elif NETWORK_NAME == 'Texas':
@@ -0,0 +1,85 @@
+from __future__ import annotations
+from common import *
+import copy
+import hashlib
+import os
+import shutil
+import tempfile
+import logger
+import xml_stream
+from xml_stream import etree
+
+"""
+Cache of the models compiled by Dynawo (compileDir of the .jobs files), shared by the slaves of a node (see
+COMPILATION_CACHE_DIR). Without it, models are compiled in the working directory of each job, which is deleted when the
+job completes. Entries are keyed by the set of models used in the dyd file (libraries of the black box models and
+structure of the Modelica models and templates, without their parameters), and by the Dynawo installation. The first
+job using a model set compiles in its working directory as usual, the result is then copied to a temporary directory
+of the cache and renamed to the entry. Renaming is atomic, so jobs either see a complete entry or no entry, and if
+several jobs populate the same entry concurrently, the first rename wins and the others discard their copy.
+
+Entries are never written by Dynawo: jobs keep their own compileDir, and the entry is only given to Dynawo as a
+directory of precompiled models (see dynawo_inputs.write_jobs_file()).
+
+Only the models defined in the dyd file (modelicaModel, modelTemplate) are compiled per job. The dyd files of the
+cases in 3-DynData only use black box models with a lib (the preassembled models are precompiled in the Dynawo
+installation), so their entries are empty and the cache does not reduce their start-up time (see
+benchmarks/dynawo_startup.py, which reports the content of the entries). It is meant for dyd files that define models.
+"""
+
+STRUCTURE_TAGS = ['modelicaModel', 'modelTemplate']
+PARAMETER_ATTRIBUTES = ['parFile', 'parId']
+
+
+def get_model_set(dyd_root) -> set[str]:
+    """
+    Return the models of a dyd root that have to be compiled (or loaded), independently of their parameters
+    """
+    model_set = set()
+    for element in dyd_root:
+        lib = element.get('lib')
+        if lib is not None:
+            model_set.add(lib)
+        if xml_stream.get_local_name(element.tag) in STRUCTURE_TAGS:
+            model_set.add(get_structure(element))
+    return model_set
+
+
+def get_structure(element) -> str:
+    element = copy.deepcopy(element)
+    for child in element.iter():
+        for attribute in PARAMETER_ATTRIBUTES:
+            child.attrib.pop(attribute, None)
+    parts = []
+    xml_stream.serialise_element(element, parts)
+    return ''.join(parts)
+
+
+def get_compile_dir(jobs_file) -> str:
+    """
+    Return the compilation directory of a .jobs file (relative paths are relative to the directory of the file)
+    """
+    modeler = next(etree.parse(jobs_file).getroot().iter(etree.QName(DYNAWO_NAMESPACE, 'modeler').text))
+    return os.path.join(os.path.dirname(os.path.abspath(jobs_file)), modeler.get('compileDir'))
+
+
+def get_entry(model_set: set[str]) -> str:
+    key = hashlib.sha1('\n'.join([DYNAWO_PATH] + sorted(model_set)).encode('utf-8')).hexdigest()
+    return os.path.abspath(os.path.join(COMPILATION_CACHE_DIR, key))
+
+
+def publish(compile_dir, entry):
+    """
+    Copy the models compiled by a job (in compile_dir) to the given cache entry, unless it was populated in the meantime
+    """
+    if os.path.isdir(entry):
+        return
+    os.makedirs(COMPILATION_CACHE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=COMPILATION_CACHE_DIR, prefix='.tmp_')
+    if os.path.isdir(compile_dir):  # Otherwise, Dynawo had nothing to compile, publish an empty entry
+        shutil.copytree(compile_dir, tmp_dir, symlinks=True, dirs_exist_ok=True)
+    try:
+        os.rename(tmp_dir, entry)
+        logger.logger.log(logger.logging.TRACE, 'Compiled models published to {}'.format(entry))
+    except OSError:  # Entry populated by another job
+        shutil.rmtree(tmp_dir, ignore_errors=True)
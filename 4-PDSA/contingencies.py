@@ -5,6 +5,7 @@ from common import *
 from dynawo_protections import get_buses_to_lines, get_adjacent_lines
 import pandas as pd
 from pathlib import Path
+import logger
 
 @dataclass
 class InitEvent:
@@ -65,6 +66,21 @@ class Contingency:
 
         return cls(id, parent.order + 1, parent.frequency * HIDDEN_FAILURE_PROBA, init_events, parent.clearing_time, parent.fault_location, parent.base_id, parent.protection_hidden_failures, generator_failures)
 
+    @classmethod
+    def from_id(cls, id, contingencies: dict[str, Contingency]):
+        """
+        Recreate a contingency created by hidden failures from its id (base_id~hidden_failure_1~...) and from the
+        contingencies indexed by their ids (that include the base contingency)
+        """
+        base_id, *hidden_failures = id.split('~')
+        contingency = contingencies[base_id]
+        for hidden_failure in hidden_failures:
+            if 'hidden_failure' in hidden_failure:
+                contingency = cls.from_parent_and_protection_failure(contingency, hidden_failure)
+            else:
+                contingency = cls.from_parent_and_generator_failure(contingency, hidden_failure)
+        return contingency
+
     """
     To limit the number of contingencies, double(/triple/...) lines are only counted once, but the associated contingencies
     have their frequency doubled(/tripled/...). This is done by doubling(/tripling/...) their lengths since the frequency is taken
@@ -106,6 +122,19 @@ class Contingency:
     """ def __eq__(self, other) -> bool:
         return set(self.events) == set(other.events) """
 
+    @staticmethod
+    def create_contingency_list() -> list[Contingency]:
+        base_contingency = Contingency.create_base_contingency()
+        if WITH_HIDDEN_FAILURES or not NEGLECT_NORMAL_FAULT_RISK:
+            N_1_contingencies = Contingency.create_N_1_contingencies(with_normal_clearing=True)
+        else:
+            N_1_contingencies = Contingency.create_N_1_contingencies(with_normal_clearing=False)
+        N_2_contingencies = Contingency.create_N_2_contingencies()
+
+        contingency_list = base_contingency + N_1_contingencies + N_2_contingencies
+        logger.logger.info('Considering {} contingencies: {} base, {} N-1, {} N-2'.format(len(contingency_list), len(base_contingency), len(N_1_contingencies), len(N_2_contingencies)))
+        return contingency_list
+
     @staticmethod
     def create_base_contingency():
         return [Contingency('Base', 0, OUTAGE_RATE_PER_KM * 10, [], 0)]  # Contingency with no events, use a relatively low frequency to avoid running it too often
@@ -3,6 +3,7 @@ if WITH_LXML:
     from lxml import etree
 else:
     import xml.etree.ElementTree as etree
+import xml_stream
 
 def add_init_events(dyd_root, par_root, init_events):
     """
@@ -29,17 +30,17 @@ def add_init_events(dyd_root, par_root, init_events):
 def add_bus_fault(dyd_root, par_root, faultID, busID, parID, t_init, t_clearing, r_fault, x_fault):
     """
     Add a bus fault to the dynawo model
-    @param dyd_root etree root of the dyd file
-    @param par_root etree root of the par file
+    @param dyd_root etree root of the dyd file (or xml_stream.ElementWriter)
+    @param par_root etree root of the par file (or xml_stream.ElementWriter)
     """
     # Add to dyd
     blackbox_attrib = {'id': faultID, 'lib': 'NodeFault', 'parFile': NETWORK_NAME + '.par', 'parId': parID}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
     connect_attrib = {'id1': faultID, 'var1': 'fault_terminal', 'id2': 'NETWORK', 'var2': busID + '_ACPIN'}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # Add to par
-    fault_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
+    fault_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
     par_attribs = [
         {'type':'DOUBLE', 'name':'fault_RPu', 'value':'{}'.format(r_fault)},
         {'type':'DOUBLE', 'name':'fault_XPu', 'value':'{}'.format(x_fault)},
@@ -47,71 +48,71 @@ def add_bus_fault(dyd_root, par_root, faultID, busID, parID, t_init, t_clearing,
         {'type':'DOUBLE', 'name':'fault_tEnd', 'value': str(t_clearing)}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(fault_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(fault_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 def add_line_disc_to_dyd(dyd_root, par_root,  lineID, t_disc, parID = 'LineDisc'):
     """
     Add a line disconnection to the dynawo model
-    @param dyd_root etree root of the dyd file
-    @param par_root etree root of the par file
+    @param dyd_root etree root of the dyd file (or xml_stream.ElementWriter)
+    @param par_root etree root of the par file (or xml_stream.ElementWriter)
     """
     # Add to dyd
     blackbox_attrib = {'id': 'DISC_' + lineID, 'lib': 'EventQuadripoleDisconnection', 'parFile': NETWORK_NAME + '.par', 'parId': parID}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
     connect_attrib = {'id1': 'DISC_' + lineID, 'var1': 'event_state1_value', 'id2': 'NETWORK', 'var2': lineID + '_state_value'}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # Add to par
-    line_disc_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
+    line_disc_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
     par_attribs = [
         {'type':'DOUBLE', 'name':'event_tEvent', 'value': str(t_disc)},
         {'type':'BOOL', 'name':'event_disconnectOrigin', 'value':'true'},
         {'type':'BOOL', 'name':'event_disconnectExtremity', 'value':'true'},
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(line_disc_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(line_disc_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 def add_line_reclose_to_dyd(dyd_root, par_root,  lineID, t_close, parID = 'LineReclose'):
     """
     Add a line reconnection to the dynawo model
-    @param dyd_root etree root of the dyd file
-    @param par_root etree root of the par file
+    @param dyd_root etree root of the dyd file (or xml_stream.ElementWriter)
+    @param par_root etree root of the par file (or xml_stream.ElementWriter)
     """
     # Add to dyd
     blackbox_attrib = {'id': 'RECLOSE_' + lineID, 'lib': 'EventQuadripoleConnection', 'parFile': NETWORK_NAME + '.par', 'parId': parID}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
     connect_attrib = {'id1': 'RECLOSE_' + lineID, 'var1': 'event_state1_value', 'id2': 'NETWORK', 'var2': lineID + '_state_value'}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # Add to par
-    line_reclose_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
+    line_reclose_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
     par_attribs = [
         {'type':'DOUBLE', 'name':'event_tEvent', 'value': str(t_close)},
         {'type':'BOOL', 'name':'event_connectOrigin', 'value':'true'},
         {'type':'BOOL', 'name':'event_connectExtremity', 'value':'true'},
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(line_reclose_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(line_reclose_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 def add_gen_disc_to_dyd(dyd_root, par_root,  genID, t_disc, parID = 'GenDisc'):
     """
     Add a generator disconnection to the dynawo model
-    @param dyd_root etree root of the dyd file
-    @param par_root etree root of the par file
+    @param dyd_root etree root of the dyd file (or xml_stream.ElementWriter)
+    @param par_root etree root of the par file (or xml_stream.ElementWriter)
     """
     blackbox_attrib = {'id': 'DISC_' + genID, 'lib': 'EventSetPointBoolean', 'parFile': NETWORK_NAME + '.par', 'parId': parID}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), blackbox_attrib)
     if '_PV_' in genID or '_RTPV_' in genID or '_WIND_' in genID:
         connect_attrib = {'id1': 'DISC_' + genID, 'var1': 'event_state1', 'id2': genID, 'var2': 'ibg_injector_switchOffSignal2'}
     else:
         connect_attrib = {'id1': 'DISC_' + genID, 'var1': 'event_state1', 'id2': genID, 'var2': 'generator_switchOffSignal2'}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # Add to par
-    gen_disc_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
+    gen_disc_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : parID})
     par_attribs = [
         {'type':'DOUBLE', 'name':'event_tEvent', 'value': f'{t_disc}'},
         {'type':'BOOL', 'name':'event_stateEvent1', 'value':'true'}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(gen_disc_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(gen_disc_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
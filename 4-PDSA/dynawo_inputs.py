@@ -5,11 +5,19 @@ if WITH_LXML:
 else:
     import xml.etree.ElementTree as etree
 import os
+import copy
+import time
 import job
+import logger
 from pathlib import Path
+from collections import OrderedDict
 import shutil
 import dynawo_protections
 import dynawo_init_events
+import xml_stream
+import network_cache
+import compilation_cache
+import scratch
 import pypowsybl as pp
 import sys
 sys.path.insert(1, str((Path(__file__).parent / '../3-DynData')))
@@ -17,17 +25,133 @@ import add_dyn_data
 
 def write_job_files(job : job.Job):
     """
-    Write the input files for a given scenario
+    Write the input files for a given scenario, return the entry of the compilation cache that the job should populate
+    (None if the cache is disabled or the entry already exists)
     """
     Path(job.working_dir).mkdir(parents=True, exist_ok=True)
 
     # Copy static file for the considered sample
-    static_data_path = os.path.join('../2-SCOPF/d-Final-dispatch', f'{CASE}_{NETWORK_NAME}')
-    iidm_file = os.path.join(static_data_path, str(job.static_id) + '.iidm')
-    shutil.copy(iidm_file, os.path.join(job.working_dir, NETWORK_NAME + '.iidm'))
+    iidm_file = network_cache.get_iidm_path(job.static_id)
+    dyn_data_path = '../3-DynData'
+    scratch.link_file(iidm_file, os.path.join(job.working_dir, NETWORK_NAME + '.iidm'))
 
     # Add data to dyd and par files
-    network = pp.network.load(iidm_file)
+    t0 = time.perf_counter()
+    network = network_cache.get_network(job.static_id)
+    dyd_path = os.path.join(job.working_dir, NETWORK_NAME + '.dyd')
+    par_path = os.path.join(job.working_dir, NETWORK_NAME + '.par')
+    if STREAMING_XML_WRITER:
+        # The part common to the static sample is written first, then the elements of the job as they are generated
+        (dyd_start, dyd_end), (par_start, par_end), model_set = get_serialised_dyn_data(job.static_id, network)
+        with xml_stream.ElementWriter(dyd_path, dyd_start, dyd_end) as dyd_writer, xml_stream.ElementWriter(par_path, par_start, par_end) as par_writer:
+            dynawo_init_events.add_init_events(dyd_writer, par_writer, job.contingency.init_events)
+            dynawo_protections.add_protections(dyd_writer, par_writer, network, job.dynamic_seed, job.contingency.protection_hidden_failures)
+        model_set = model_set | dyd_writer.libs
+    else:
+        dyd_root, par_root = get_dyn_data(job.static_id, network)
+        dynawo_init_events.add_init_events(dyd_root, par_root, job.contingency.init_events)
+        dynawo_protections.add_protections(dyd_root, par_root, network, job.dynamic_seed, job.contingency.protection_hidden_failures)
+        if COMPILATION_CACHE_DIR is not None:
+            model_set = compilation_cache.get_model_set(dyd_root)
+
+        # Write dyd and par files
+        if WITH_LXML:
+            with open(dyd_path, 'wb') as doc:
+                doc.write(etree.tostring(dyd_root, pretty_print = True, xml_declaration = True, encoding='UTF-8'))
+            with open(par_path, 'wb') as doc:
+                doc.write(etree.tostring(par_root, pretty_print = True, xml_declaration = True, encoding='UTF-8'))
+        else:
+            tree = etree.ElementTree(dyd_root)
+            etree.indent(tree, space="\t")
+            tree.write(dyd_path, xml_declaration=True, encoding='UTF-8')
+            tree = etree.ElementTree(par_root)
+            etree.indent(tree, space="\t")
+            tree.write(par_path, xml_declaration=True, encoding='UTF-8')
+    logger.logger.log(logger.logging.TRACE, 'Input files of job {} written in {:.3f}s'.format(job, time.perf_counter() - t0))
+
+    # Reuse the models compiled by previous jobs of the node if available (see compilation_cache.py)
+    precompiled_dir = None
+    compilation_entry = None
+    if COMPILATION_CACHE_DIR is not None:
+        entry = compilation_cache.get_entry(model_set)
+        if os.path.isdir(entry):
+            logger.logger.log(logger.logging.TRACE, 'Job {} uses compiled models of {}'.format(job, entry))
+            precompiled_dir = entry
+        else:
+            compilation_entry = entry
+
+    # Copy other input files
+    for jobs_file in [NETWORK_NAME + '.jobs', NETWORK_NAME + '_alt_solver.jobs']:
+        if precompiled_dir is None:
+            shutil.copy(os.path.join(dyn_data_path, jobs_file), job.working_dir)
+        else:
+            write_jobs_file(os.path.join(dyn_data_path, jobs_file), os.path.join(job.working_dir, jobs_file), precompiled_dir)
+    if os.path.isfile(os.path.join(dyn_data_path, NETWORK_NAME + '.crv')):
+        shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '.crv'), job.working_dir)
+    if os.path.isfile(os.path.join(dyn_data_path, NETWORK_NAME + '.fsv')):
+        shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '.fsv'), job.working_dir)
+    return compilation_entry
+
+
+def write_jobs_file(source, destination, precompiled_dir):
+    """
+    Copy a .jobs file, adding precompiled_dir to the directories of precompiled models of its modelers. Models found
+    there are loaded instead of being compiled, but Dynawo does not write to it (the compilation directory is unchanged)
+    """
+    etree.register_namespace('dyn', DYNAWO_NAMESPACE)
+    tree = etree.parse(source)
+    for modeler in tree.getroot().iter(etree.QName(DYNAWO_NAMESPACE, 'modeler').text):
+        precompiled_models = modeler.find(etree.QName(DYNAWO_NAMESPACE, 'precompiledModels').text)
+        if precompiled_models is None:  # Must come before modelicaModels
+            precompiled_models = etree.Element(etree.QName(DYNAWO_NAMESPACE, 'precompiledModels'), {'useStandardModels': 'true'})
+            modelica_models = modeler.find(etree.QName(DYNAWO_NAMESPACE, 'modelicaModels').text)
+            modeler.insert(len(modeler) if modelica_models is None else list(modeler).index(modelica_models), precompiled_models)
+        etree.SubElement(precompiled_models, etree.QName(DYNAWO_NAMESPACE, 'directory'), {'path': precompiled_dir, 'recursive': 'false'})
+    tree.write(destination, xml_declaration=True, encoding='UTF-8')
+
+
+# Dyd and par roots after add_dyn_data() (or their serialisation if STREAMING_XML_WRITER) for the static samples used
+# last by this process. They do not depend on the contingency nor on the dynamic seed, so only the init events and
+# protections have to be added for each job
+dyn_data_cache: OrderedDict[str, tuple] = OrderedDict()
+
+def get_dyn_data(static_id, network: pp.network.Network):
+    """
+    Return (copies of) the dyd and par roots with the dynamic data of the given static sample
+    """
+    if DYN_DATA_CACHE_SIZE == 0:
+        return create_dyn_data(static_id, network)
+    dyd_root, par_root = get_cached_dyn_data(static_id, lambda: create_dyn_data(static_id, network))
+    return copy.deepcopy(dyd_root), copy.deepcopy(par_root)
+
+
+def get_serialised_dyn_data(static_id, network: pp.network.Network):
+    """
+    Return the start and end of the dyd and par files of the given static sample (see xml_stream.serialise_root()), and
+    the models they use (see compilation_cache.get_model_set())
+    """
+    def serialise_dyn_data():
+        dyd_root, par_root = create_dyn_data(static_id, network)
+        return xml_stream.serialise_root(dyd_root), xml_stream.serialise_root(par_root), compilation_cache.get_model_set(dyd_root)
+
+    if DYN_DATA_CACHE_SIZE == 0:
+        return serialise_dyn_data()
+    return get_cached_dyn_data(static_id, serialise_dyn_data)
+
+
+def get_cached_dyn_data(static_id, create_function):
+    static_id = str(static_id)
+    if static_id in dyn_data_cache:
+        dyn_data_cache.move_to_end(static_id)
+        return dyn_data_cache[static_id]
+    dyn_data = create_function()
+    dyn_data_cache[static_id] = dyn_data
+    if len(dyn_data_cache) > DYN_DATA_CACHE_SIZE:
+        dyn_data_cache.popitem(last=False)
+    return dyn_data
+
+
+def create_dyn_data(static_id, network: pp.network.Network):
     dyn_data_path = '../3-DynData'
     base_name = "base"
     if NETWORK_NAME == "IEEE39":
@@ -48,7 +172,7 @@ def write_job_files(job : job.Job):
         elif CASE == 'july':
             motor_share = 0.5
         elif CASE == 'year':
-            if int(job.static_id) > 3600 and int(job.static_id) < 6480:  # Around June to September
+            if int(static_id) > 3600 and int(static_id) < 6480:  # Around June to September
                 motor_share = 0.5
             else:
                 motor_share = 0.3
@@ -60,28 +184,4 @@ def write_job_files(job : job.Job):
         raise NotImplementedError
 
     add_dyn_data.add_dyn_data(NETWORK_NAME, network, WITH_LXML, dyd_root, par_root, DYNAWO_NAMESPACE, motor_share, CONTINGENCY_MINIMUM_VOLTAGE_LEVEL)
-    dynawo_init_events.add_init_events(dyd_root, par_root, job.contingency.init_events)
-    dynawo_protections.add_protections(dyd_root, par_root, network, job.dynamic_seed, job.contingency.protection_hidden_failures)
-
-    # Write dyd and par files
-    if WITH_LXML:
-        with open(os.path.join(job.working_dir, NETWORK_NAME + '.dyd'), 'wb') as doc:
-            doc.write(etree.tostring(dyd_root, pretty_print = True, xml_declaration = True, encoding='UTF-8'))
-        with open(os.path.join(job.working_dir, NETWORK_NAME + '.par'), 'wb') as doc:
-            doc.write(etree.tostring(par_root, pretty_print = True, xml_declaration = True, encoding='UTF-8'))
-    else:
-        tree = etree.ElementTree(dyd_root)
-        etree.indent(tree, space="\t")
-        tree.write(os.path.join(job.working_dir, NETWORK_NAME + '.dyd'), xml_declaration=True, encoding='UTF-8')
-        tree = etree.ElementTree(par_root)
-        etree.indent(tree, space="\t")
-        tree.write(os.path.join(job.working_dir, NETWORK_NAME + '.par'), xml_declaration=True, encoding='UTF-8')
-
-
-    # Copy other input files
-    shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '.jobs'), job.working_dir)
-    shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '_alt_solver.jobs'), job.working_dir)
-    if os.path.isfile(os.path.join(dyn_data_path, NETWORK_NAME + '.crv')):
-        shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '.crv'), job.working_dir)
-    if os.path.isfile(os.path.join(dyn_data_path, NETWORK_NAME + '.fsv')):
-        shutil.copy(os.path.join(dyn_data_path, NETWORK_NAME + '.fsv'), job.working_dir)
+    return dyd_root, par_root
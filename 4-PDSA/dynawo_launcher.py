@@ -0,0 +1,114 @@
+from __future__ import annotations
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+from common import EARLY_TERMINATION_POLLING_PERIOD_S
+
+"""
+Persistent launcher of the Dynawo simulations (see PERSISTENT_LAUNCHER). Dynawo cannot be given new jobs once started,
+so a small process is started once per slave and spawns Dynawo for each job instead of the slave itself. Spawning from
+a small process avoids duplicating the (large) address space of the slave at each job, and the launcher and its
+environment are set up only once.
+
+The slave sends the command of each job as a line of JSON on the standard input of the launcher, the launcher answers
+with the pid of the Dynawo process ({"pid": ...}), then with its stderr once it exits ({"stderr": ...}). Timeouts are
+handled by the slave as in job.run_with_timeout(): Dynawo runs in its own process group, that first receives SIGINT,
+then SIGKILL after a grace period.
+"""
+
+
+class DynawoLauncher:
+    def __init__(self):
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+
+    def stop(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def read_message(self, timeout=None):
+        """
+        Return the next message of the launcher, or None if it is not received within timeout
+        """
+        if timeout is not None:
+            ready, _, _ = select.select([self.process.stdout], [], [], max(timeout, 0))
+            if not ready:
+                return None
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError('Dynawo launcher exited unexpectedly')
+        return json.loads(line)
+
+    def run_with_timeout(self, cmd, timeout, grace_period=10, monitor=None):
+        """
+        Same as job.run_with_timeout(), but Dynawo is spawned by the launcher
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        deadline = time.time() + timeout
+        self.process.stdin.write((json.dumps({'cmd': cmd}) + '\n').encode())
+        pid = self.read_message()['pid']
+
+        if monitor is None:
+            message = self.read_message(deadline - time.time())
+        else:
+            # Poll the early termination monitor while waiting (see job.communicate_with_monitor())
+            while True:
+                message = self.read_message(min(EARLY_TERMINATION_POLLING_PERIOD_S, deadline - time.time()))
+                if message is not None or time.time() >= deadline:
+                    break
+                if monitor.should_stop():
+                    try:
+                        os.killpg(pid, signal.SIGINT)
+                    except ProcessLookupError:
+                        pass
+                    message = self.read_message(grace_period)
+                    if message is None:
+                        try:
+                            os.killpg(pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                        message = self.read_message()
+                    break
+        if message is not None:
+            return False, message['stderr']
+
+        try:
+            # Terminate with ctrl+c
+            os.killpg(pid, signal.SIGINT)
+            time.sleep(grace_period)
+            # Kill whole process if does not stop itself (including process group with Dynawo)
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:  # Already stopped
+            pass
+        return True, self.read_message()['stderr']
+
+
+launcher = DynawoLauncher()  # Launcher of this process, started on first use
+
+
+def serve():
+    """
+    Main loop of the launcher process
+    """
+    for line in sys.stdin.buffer:
+        cmd = json.loads(line)['cmd']
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, start_new_session=True)
+        sys.stdout.buffer.write((json.dumps({'pid': proc.pid}) + '\n').encode())
+        sys.stdout.buffer.flush()
+        _, stderr = proc.communicate()
+        sys.stdout.buffer.write((json.dumps({'stderr': stderr.decode(errors='replace')}) + '\n').encode())
+        sys.stdout.buffer.flush()
+
+
+if __name__ == '__main__':
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+c of the user is handled by the slave
+    serve()
@@ -10,28 +10,19 @@ import pypowsybl as pp
 import os
 import csv
 import logger
-from scipy.interpolate import interp1d
-import scipy.integrate
+import network_cache
+from collections import OrderedDict
 import numpy as np
 import pypowsybl as pp
 
 
-def get_job_results(working_dir, fault_location) -> Results:
+def get_job_results(working_dir, contingency_id, fault_location, static_id, stopped_early=False) -> Results:
     """
     Estimate the consequences and read the event timeline of a given scenario based on the simulation output files (located in working_dir)
+    stopped_early is True if the simulation was interrupted by the early termination monitor (see early_termination.py)
     """
-    excited_generator_failures = []
-    network = pp.network.load(os.path.join(working_dir, NETWORK_NAME + '.iidm'))
-    gens = network.get_generators()
-    for gen_id in gens.index:
-        if gens.at[gen_id, 'bus_id'] != fault_location:  # If generator connected to same bus as the fault (also account for if generator is connected at all)
-            continue
-            # TODO: compute some sort of electrical distance between fault and generator, not just faults on same bus as generator
-        if (gens.at[gen_id, 'p']**2 + gens.at[gen_id, 'q']**2)**0.5 < GENERATOR_HIDDEN_FAILURE_MINIMUM_OUTPUT_MVA:
-            continue
-        if 'RTPV' in gen_id:  # Disconnection of DERs already modelled (not an "hidden" failure since it's common)
-            continue
-        excited_generator_failures.append(gen_id)
+    static_data = get_static_data(static_id, working_dir)
+    excited_generator_failures = list(static_data.candidate_failed_generators.get(fault_location, []))
 
     log_file = os.path.join(working_dir, 'outputs', 'logs', 'dynawo.log')  # TODO: read file name from job instead of assuming it is outputs/dynawo.log
     # TODO: while at it, can check/force for <dyn:timeline exportMode="TXT" filter="true"/>
@@ -43,8 +34,8 @@ def get_job_results(working_dir, fault_location) -> Results:
     line_number = 0
     t_end = 0
     if os.path.exists(log_file):  # Log file might not be created if it is empty (if log level set to error only)
-        for line in reversed(list(open(log_file))):  # Read file from the end, from https://stackoverflow.com/a/2301792, note that it might read the whole file instead of just the end, but it should be ok
-            if '| ERROR |' in line:
+        for line in reversed(read_last_lines(log_file, max_line_number + 1)):
+            if '| ERROR |' in line and not (stopped_early and 'simulation interrupted by external signal' in line):
                 if 'simulation interrupted by external signal' in line:
                     timeout = True  # Note: this can also occur when the whole job is stopped (e.g. SLURM time limit reached)
                 convergence_issue = True
@@ -62,34 +53,33 @@ def get_job_results(working_dir, fault_location) -> Results:
     # Read timeline
     timeline_file = os.path.join(working_dir, 'outputs', 'timeLine', 'timeline.log')
 
-    timeline = []
     trip_timeline = []
-    generator_disconnection_timeline = []
-    disconnected_models = []
+    nb_generator_disconnections = 0
+    disconnected_models = set()
     excited_hidden_failures = []
     if not os.path.exists(timeline_file):  # Might not be created if timeouts
         return Results(100.2, 0, trip_timeline, excited_hidden_failures, excited_generator_failures)
 
-    with open(os.path.join(timeline_file), 'r') as f:
-        events = f.readlines()
-        for event in events:
+    UFLS_ratio = 1
+    disconnected_load = 0
+    with open(timeline_file, 'r') as f:
+        for event in f:
             (time, model, event_description) = event.strip().split(' | ')
-            event = TimeLineEvent(float(time), model, event_description)
 
-            if 'hidden_failure' in event.model:
-                if 'trip' in event.event_description:
+            if 'hidden_failure' in model:
+                if 'trip' in event_description:
                     if float(time) < T_INIT:  # Hidden failure activated in normal operation (before fault) --> skip
-                        if 'Base' in working_dir:
+                        if contingency_id == 'Base':
                             # Only print warning for base contingency (since it will be identical for all contingencies, so avoid polluting the logs)
-                            logger.logger.warning(f'{working_dir}: {model} tripped in normal operation (before fault), so skipped')
+                            logger.logger.warning(f'Static id {static_id}, Base: {model} tripped in normal operation (before fault), so skipped')
                         continue
 
-                    if 'Distance' in event.event_description:  # Separate hidden failure depending on failure mode
-                        if event.event_description.endswith('zone 1'):
+                    if 'Distance' in event_description:  # Separate hidden failure depending on failure mode
+                        if event_description.endswith('zone 1'):
                             excited_hidden_failures.append(model + '_Z1')
-                        if event.event_description.endswith('zone 2'):
+                        if event_description.endswith('zone 2'):
                             excited_hidden_failures.append(model + '_Z2')
-                        if event.event_description.endswith('zone 3'):
+                        if event_description.endswith('zone 3'):
                             excited_hidden_failures.append(model + '_Z3')
                     else:
                         excited_hidden_failures.append(model)
@@ -97,58 +87,25 @@ def get_job_results(working_dir, fault_location) -> Results:
                 if model in disconnected_models:
                     continue  # Disregard spurious events for models that are already disconnected
 
-                timeline.append(event)
-
-                if 'trip' in event.event_description:
-                    trip_timeline.append(event)
-                    disconnected_models.append(event.model)
-                if 'UFLS step' in event.event_description and 'activated' in event.event_description:
-                    trip_timeline.append(event)
-                if 'GENERATOR : disconnecting' in event.event_description:
-                    generator_disconnection_timeline.append(event)
+                if 'trip' in event_description:
+                    trip_timeline.append(TimeLineEvent(float(time), model, event_description))
+                    disconnected_models.add(model)
+                if 'UFLS step' in event_description and 'activated' in event_description:
+                    trip_timeline.append(TimeLineEvent(float(time), model, event_description))
+                if 'GENERATOR : disconnecting' in event_description:
+                    nb_generator_disconnections += 1
+
+                # Load shedding
+                if event_description in UFLS_STEPS:
+                    UFLS_ratio += UFLS_STEPS[event_description]
+                elif event_description == 'LOAD : disconnecting':
+                    if 'Dummy' not in model:
+                        disconnected_load += static_data.loads[model]
 
     ###
     # Compute load shedding
     ###
-    n = pp.network.load(os.path.join(working_dir, NETWORK_NAME + '.iidm'))
-    loads = n.get_loads()
-    for load_id in loads.index:
-        if loads.at[load_id, 'p0'] == 0 and loads.at[load_id, 'q0'] == 0:  # Remove dummy loads
-            loads = loads.drop(load_id)
-
-    total_load = sum([loads.at[load, 'p0'] for load in loads.index])
-
-    UFLS_ratio = 1
-    disconnected_load = 0
-    for timeline_event in timeline:
-        if timeline_event.event_description == 'UFLS step 1 activated':
-            UFLS_ratio += -0.1
-        elif timeline_event.event_description == 'UFLS step 2 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 3 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 4 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 5 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 6 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 7 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 8 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 9 activated':
-            UFLS_ratio += -0.05
-        elif timeline_event.event_description == 'UFLS step 10 activated':
-            UFLS_ratio += -0.05
-
-        elif timeline_event.event_description == 'LOAD : disconnecting':
-            if 'Dummy' in timeline_event.model:
-                continue
-            disconnected_load += loads.at[timeline_event.model, 'p0']
-        else:
-            pass
-
+    total_load = static_data.total_load
     remaining_load = (total_load - disconnected_load) * UFLS_ratio
 
     load_shedding = (total_load - remaining_load) / total_load * 100
@@ -169,12 +126,9 @@ def get_job_results(working_dir, fault_location) -> Results:
         reader = csv.reader(file, delimiter=';')
         next(reader)  # Skip header
         for row in reader:
-            model = row[0]
-            variable = row[1]
-            value = float(row[2])
-            if model == 'NETWORK' and 'Upu_value' in variable:
-                if value > 0.5:
-                    full_blackout = False
+            if row[0] == 'NETWORK' and 'Upu_value' in row[1] and float(row[2]) > 0.5:
+                full_blackout = False
+                break  # One energised bus is enough
     if full_blackout:
         load_shedding = 100
 
@@ -184,10 +138,86 @@ def get_job_results(working_dir, fault_location) -> Results:
     # disconnected as full blackout instead of
     # convergence issues
     ###############################################
+    if nb_generator_disconnections == static_data.nb_machines:  # All machines are disconnected, i.e. full blackout
+        load_shedding = 100
+    elif nb_generator_disconnections > static_data.nb_machines:
+        raise RuntimeError('Working_dir {}: missing generators in "connected_machines", or some generators were reconnected during the simulation'.format(working_dir))
+
+    cost = load_shedding_to_cost(load_shedding, total_load)
+
+    return Results(load_shedding, cost, trip_timeline, excited_hidden_failures, excited_generator_failures)
+
+
+UFLS_STEPS = {'UFLS step 1 activated': -0.1}  # Share of the load shed by each UFLS step
+UFLS_STEPS.update({'UFLS step {} activated'.format(step): -0.05 for step in range(2, 11)})
+
+
+def read_last_lines(path, nb_lines, block_size=4096) -> list[str]:
+    """
+    Return the last nb_lines lines of a file (or all lines if it has less), reading it from the end
+    """
+    with open(path, 'rb') as file:
+        file_size = file.seek(0, os.SEEK_END)
+        size = 0
+        while True:
+            size = min(size + block_size, file_size)
+            file.seek(file_size - size)
+            data = file.read(size)
+            # nb_lines + 1 line breaks guarantee that the first of the last nb_lines lines is complete
+            if data.count(b'\n') > nb_lines or size == file_size:
+                break
+    return data.decode(errors='replace').splitlines(keepends=True)[-nb_lines:]
+
+
+class StaticData:
+    """
+    Data of a static sample needed to extract the results of its jobs
+    """
+    def __init__(self, static_id, working_dir):
+        network = network_cache.get_network(static_id)  # Same network as the one copied in working_dir
+        gens = network.get_generators()
+        # Generators that can fail when a fault occurs on their bus (hidden failures), indexed by bus
+        self.candidate_failed_generators: dict[str, list[str]] = {}
+        for gen_id in gens.index:
+            if (gens.at[gen_id, 'p']**2 + gens.at[gen_id, 'q']**2)**0.5 < GENERATOR_HIDDEN_FAILURE_MINIMUM_OUTPUT_MVA:
+                continue
+            if 'RTPV' in gen_id:  # Disconnection of DERs already modelled (not an "hidden" failure since it's common)
+                continue
+            # TODO: compute some sort of electrical distance between fault and generator, not just faults on same bus as generator
+            self.candidate_failed_generators.setdefault(gens.at[gen_id, 'bus_id'], []).append(gen_id)
+
+        loads = network.get_loads()
+        loads = loads[(loads['p0'] != 0) | (loads['q0'] != 0)]  # Remove dummy loads
+        self.loads: dict[str, float] = dict(zip(loads.index, loads['p0'].tolist()))
+        self.total_load = sum(self.loads.values())
+
+        # The machines connected to OMEGA_REF are defined by the dynamic data of the static sample (not by the job)
+        dyd_root = etree.parse(os.path.join(working_dir, NETWORK_NAME + '.dyd')).getroot()
+        self.nb_machines = len(get_connected_machines(dyd_root))
+
+
+# StaticData of the static samples used last by this process
+static_data_cache: OrderedDict[str, StaticData] = OrderedDict()
+
+def get_static_data(static_id, working_dir) -> StaticData:
+    static_id = str(static_id)
+    if static_id in static_data_cache:
+        static_data_cache.move_to_end(static_id)
+        return static_data_cache[static_id]
+    static_data = StaticData(static_id, working_dir)
+    static_data_cache[static_id] = static_data
+    if len(static_data_cache) > STATIC_DATA_CACHE_SIZE:
+        static_data_cache.popitem(last=False)
+    return static_data
+
+
+def get_connected_machines(dyd_root) -> list[str]:
+    """
+    Return the ids of the machines connected to the OmegaRef model in the given dyd root
+    """
     connected_machines = []
 
     # Find machines with a connection to omega_grp via a connect
-    dyd_root = etree.parse(os.path.join(working_dir, NETWORK_NAME + '.dyd')).getroot()
     for connection in dyd_root.iterfind("{{{}}}connect".format(DYNAWO_NAMESPACE)):
         if connection.get('id1') == 'OMEGA_REF' and 'omega_grp_' in connection.get('var1'):
             connected_machines.append(connection.get('id2'))
@@ -209,15 +239,15 @@ def get_job_results(working_dir, fault_location) -> Results:
                 connected_machines.append(macro_connection.get('id1'))
             else:
                 raise ValueError('OmegaRef model expected to be named "OMEGA_REF"')
+    return connected_machines
 
-    if len(generator_disconnection_timeline) == len(connected_machines):  # All machines are disconnected, i.e. full blackout
-        load_shedding = 100
-    elif len(generator_disconnection_timeline) > len(connected_machines):
-        raise RuntimeError('Working_dir {}: missing generators in "connected_machines", or some generators were reconnected during the simulation'.format(working_dir))
-
-    cost = load_shedding_to_cost(load_shedding, total_load)
 
-    return Results(load_shedding, cost, trip_timeline, excited_hidden_failures, excited_generator_failures)
+VOLL_TIME = np.array([1/60, 20/60, 1, 4, 8, 24])  # Duration of the interruption (h)
+VOLL_COST = np.array([571, 61, 39, 30, 27, 13]) * 1000  # Value of lost load for this duration (from $/kWh to $/MWh)
+# VoLL(t) = VOLL_INTERCEPT[i] + VOLL_SLOPE[i] * t between VOLL_BOUNDS[i] and VOLL_BOUNDS[i+1] (linear interpolation, constant outside VOLL_TIME)
+VOLL_BOUNDS = np.concatenate(([0], VOLL_TIME, [np.inf]))
+VOLL_SLOPE = np.concatenate(([0], np.diff(VOLL_COST) / np.diff(VOLL_TIME), [0]))
+VOLL_INTERCEPT = np.concatenate(([VOLL_COST[0]], VOLL_COST[:-1] - VOLL_SLOPE[1:-1] * VOLL_TIME[:-1], [VOLL_COST[-1]]))
 
 
 def load_shedding_to_cost(load_shedding, total_load):
@@ -225,23 +255,26 @@ def load_shedding_to_cost(load_shedding, total_load):
     Compute Value of Lost Load (VoLL)
     Derived from Pierre Henneaux and  Daniel S. Kirschen, "Probabilistic Security
     Analysis of Optimal Transmission Switching"
+    The expected cost of the interruption, integral from 0 to H of k/H*exp(-k*t/H) * t * VoLL(t), is computed in closed
+    form on each linear segment of VoLL. load_shedding and total_load can be numpy arrays (an array is then returned)
     """
-    time = [1/60, 20/60, 1, 4, 8, 24]
-    cost = [571, 61, 39, 30, 27, 13]
-    for i in range(len(cost)):
-        cost[i] *= 1000 # from kWh to MWh
-
-    def interpolVoLL(t):
-        if t >= time[0]:
-            return interp1d(time, cost)(t)
-        else:
-            return interp1d(time, cost)(time[0])
-
+    load_shedding = np.asarray(load_shedding, dtype=float)
     H = 0.1419 * load_shedding + 0.6482
     load_shedding_MW = load_shedding / 100 * total_load
 
     k = 3
-    return scipy.integrate.quad(lambda t: k/H*np.exp(-k*t/H) * t * interpolVoLL(t), 0, H, epsabs=1e-4, epsrel=1e-4)[0] * load_shedding_MW / 1e6  # To Millions of euros/dollars
+    c = k / H
+    t = np.minimum.outer(H, VOLL_BOUNDS)  # Segment bounds, truncated to [0, H]
+    c = c[..., np.newaxis]
+    exp = np.exp(-c * t)
+    primitive_t = -exp * (t + 1/c)  # Primitive of c*exp(-c*t) * t
+    primitive_t2 = -exp * (t**2 + 2*t/c + 2/c**2)  # Primitive of c*exp(-c*t) * t**2
+    integral = np.sum(VOLL_INTERCEPT * np.diff(primitive_t, axis=-1) + VOLL_SLOPE * np.diff(primitive_t2, axis=-1), axis=-1)
+
+    cost = integral * load_shedding_MW / 1e6  # To Millions of euros/dollars
+    if cost.ndim == 0:
+        return float(cost)
+    return cost
 
 
 def get_job_results_special(working_dir):
@@ -256,9 +289,8 @@ def get_job_results_special(working_dir):
     if not os.path.exists(timeline_file):  # Might not be created if timeouts
         return False, False
 
-    with open(os.path.join(timeline_file), 'r') as f:
-        events = f.readlines()
-        for event in events:
+    with open(timeline_file, 'r') as f:
+        for event in f:
             try:
                 (time, model, event_description) = event.strip().split(' | ')
             except ValueError as e:
@@ -276,50 +308,8 @@ def get_job_results_special(working_dir):
             if 'trip' in event.event_description:
                 trip_timeline.append(event)
 
-    slow_trip_timeline = [timeline_event for timeline_event in trip_timeline if 'tripped zone 2' in timeline_event.event_description or 'tripped zone 3' in timeline_event.event_description]
-    fast_trip_timeline = [timeline_event for timeline_event in trip_timeline if 'tripped zone 1' in timeline_event.event_description or 'tripped zone 4' in timeline_event.event_description]
+    return compare_trip_timelines(trip_timeline)
 
-    for i, timeline_event in enumerate(fast_trip_timeline):
-        if timeline_event.event_description == 'Distance protection tripped zone 1':  # Translate fast timeline events into slow equivalents for easier matching
-            fast_trip_timeline[i] = TimeLineEvent(timeline_event.time, timeline_event.model, "Distance protection tripped zone 2")
-        if timeline_event.event_description == 'Distance protection tripped zone 4':
-            fast_trip_timeline[i] = TimeLineEvent(timeline_event.time, timeline_event.model, "Distance protection tripped zone 3")
-
-    same_order = True
-    index = 0
-    for slow_timeline_event in slow_trip_timeline:
-        time = float(slow_timeline_event.time)
-        for following_timeline_event in slow_trip_timeline[index+1:]:
-            for fast_timeline_event in fast_trip_timeline:
-                if timeline_events_match(fast_timeline_event, following_timeline_event):
-                    fast_time = float(fast_timeline_event.time)
-                    if fast_time + 0.07 < time:  # check if they can occur before the considered event (with more than min CB time difference)
-                        same_order = False
-                    break
-        index += 1
-
-    missing_events = False
-    for fast_timeline_event in fast_trip_timeline:
-        found = False
-        for slow_timeline_event in slow_trip_timeline:
-            if timeline_events_match(fast_timeline_event, slow_timeline_event):
-                found = True
-                break
-        if not found:
-            missing_events = True
-            break
-    # Search event in slow that is not in fast (not possible if both are derived from a single simulation, and probably rare even if computed from two separate simulations)
-    for slow_timeline_event in slow_trip_timeline:
-        found = False
-        for fast_timeline_event in fast_trip_timeline:
-            if timeline_events_match(fast_timeline_event, slow_timeline_event):
-                found = True
-                break
-        if not found:
-            missing_events = True
-            break
-
-    return not same_order, missing_events
 
 @dataclass(frozen=True)
 class TimeLineEvent:
@@ -342,3 +332,41 @@ def timeline_events_match(timeline_event_1: TimeLineEvent, timeline_event_2: Tim
         return True
     else:
         return False
+
+
+def compare_trip_timelines(trip_timeline: list[TimeLineEvent]) -> tuple[bool, bool]:
+    """
+    Compare the trips of the slow (zones 2 and 3) and fast (zones 1 and 4) distance protections of a special job, return
+    whether the order of the trips can change (a later slow trip can occur before an earlier one with fast protections)
+    and whether some trips are only in one of the timelines. Events are matched by (model, description), with fast
+    descriptions translated into their slow equivalents, in O(n)
+    """
+    slow_trip_timeline = [timeline_event for timeline_event in trip_timeline if 'tripped zone 2' in timeline_event.event_description or 'tripped zone 3' in timeline_event.event_description]
+
+    first_fast_times = {}  # Time of the first fast trip of each (model, slow equivalent description)
+    for timeline_event in trip_timeline:
+        if 'tripped zone 1' not in timeline_event.event_description and 'tripped zone 4' not in timeline_event.event_description:
+            continue
+        event_description = timeline_event.event_description
+        if event_description == 'Distance protection tripped zone 1':  # Translate fast timeline events into slow equivalents for easier matching
+            event_description = 'Distance protection tripped zone 2'
+        if event_description == 'Distance protection tripped zone 4':
+            event_description = 'Distance protection tripped zone 3'
+        first_fast_times.setdefault((timeline_event.model, event_description), float(timeline_event.time))
+
+    # The order changes if the fast equivalent of a slow trip can occur before (with more than min CB time difference)
+    # any of the slow trips that precede it, i.e. before the latest of them
+    same_order = True
+    latest_time = -float('inf')
+    for slow_timeline_event in slow_trip_timeline:
+        fast_time = first_fast_times.get((slow_timeline_event.model, slow_timeline_event.event_description))
+        if fast_time is not None and fast_time + 0.07 < latest_time:
+            same_order = False
+            break
+        latest_time = max(latest_time, float(slow_timeline_event.time))
+
+    # Events in fast that are not in slow, or in slow that are not in fast (not possible if both are derived from a
+    # single simulation, and probably rare even if computed from two separate simulations)
+    missing_events = first_fast_times.keys() != {(timeline_event.model, timeline_event.event_description) for timeline_event in slow_trip_timeline}
+
+    return not same_order, missing_events
@@ -3,10 +3,13 @@ if WITH_LXML:
     from lxml import etree
 else:
     import xml.etree.ElementTree as etree
+import xml_stream
 import pypowsybl as pp
 from math import pi
 import random
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
 
 
 def add_protections(dyd_root, par_root, network: pp.network.Network, seed, protection_hidden_failures: list[str]):
@@ -23,7 +26,6 @@ def add_protections(dyd_root, par_root, network: pp.network.Network, seed, prote
     random.seed(seed)
 
     # Read iidm
-    lines = network.get_lines()
     gens = network.get_generators()
 
     # Generator protections
@@ -46,21 +48,116 @@ def add_protections(dyd_root, par_root, network: pp.network.Network, seed, prote
 
     # Line/distance protection
     dyd_root.append(etree.Comment('Line protection'))
+    for line_settings in get_line_protection_settings(network):
+        add_line_dist_protection(dyd_root, par_root, line_settings, CB_time, CB_max_error, special, protection_hidden_failures)
+        add_line_overload_protection(dyd_root, par_root, line_settings)
+
+
+# Deterministic settings of the line protections for the topologies used last by this process (see get_line_protection_settings())
+line_protection_settings_cache: OrderedDict[tuple, list[dict]] = OrderedDict()
+
+def get_line_protection_settings(network: pp.network.Network) -> list[dict]:
+    """
+    Return the settings of the protections of all lines (in the order of branch.csv) that do not depend on the
+    dynamic seed. They only depend on the line parameters and ratings, and on which lines are connected to which
+    buses, so they are computed once per topology
+    """
+    lines = network.get_lines()
+    topology = (tuple(lines.index), tuple(lines['bus1_id']), tuple(lines['bus2_id']))
+    if topology in line_protection_settings_cache:
+        line_protection_settings_cache.move_to_end(topology)
+        return line_protection_settings_cache[topology]
+
+    settings = create_line_protection_settings(network, lines)
+    line_protection_settings_cache[topology] = settings
+    if len(line_protection_settings_cache) > PROTECTION_SETTINGS_CACHE_SIZE:
+        line_protection_settings_cache.popitem(last=False)
+    return settings
+
+
+def create_line_protection_settings(network: pp.network.Network, lines) -> list[dict]:
     bus2lines = get_buses_to_lines(network)
     lines_csv = pd.read_csv(f'../{NETWORK_NAME}-Data/branch.csv').to_dict()
-
     voltage_levels = network.get_voltage_levels()
+
+    line_ids = []
+    line_ratings = []
     for i in range(len(lines_csv['UID'])):
-        line_id = lines_csv['UID'][i]
-        line_rating = lines_csv['Cont Rating'][i]
         if lines_csv['Tr Ratio'][i] != 0:
             continue  # Consider lines, not transformers
-
+        line_rating = lines_csv['Cont Rating'][i]
         if NETWORK_NAME == 'Texas':
             line_rating *= 1.5  # Necessary for OPF to converge during summer
+        line_ids.append(lines_csv['UID'][i])
+        line_ratings.append(line_rating)
 
-        add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2lines, line_id, line_rating, CB_time, CB_max_error, special, protection_hidden_failures)
-        add_line_overload_protection(dyd_root, par_root, lines, voltage_levels, line_id, line_rating)
+    line_rating = np.array(line_ratings, dtype=float)
+    Ub = np.array([float(voltage_levels.at[lines.at[line_id, 'voltage_level1_id'], 'nominal_v']) for line_id in line_ids]) * 1000
+    Sb = 100e6  # 100MW is the default base in Dynawo
+    Zb = Ub**2/Sb
+    X = np.array([lines.at[line_id, 'x'] for line_id in line_ids], dtype=float) / Zb
+    # R = lines.at[line_id, 'r'] / Zb
+
+    # Distance protection
+    X1 = 0.8 * X
+    R1 = X1
+
+    # Only the adjacent lines that can be "seen" from a forward looking distance relay, i.e. lines connected to the opposite side
+    distance = Ub >= DISTANCE_PROTECTION_MINIMUM_VOLTAGE_LEVEL
+    max_adj_X = np.zeros((len(line_ids), 2))
+    min_adj_X = np.zeros((len(line_ids), 2))
+    has_adj_lines = np.zeros((len(line_ids), 2), dtype=bool)
+    for i, line_id in enumerate(line_ids):
+        if not distance[i]:
+            continue
+        for side in [1, 2]:
+            adj_lines_X = [lines.at[adj_line, 'x'] for adj_line in get_adjacent_lines(bus2lines, lines, line_id, 3 - side)]
+            if not adj_lines_X: # is empty
+                adj_lines_X = [0]
+            max_adj_X[i, side - 1] = max(adj_lines_X)
+            min_adj_X[i, side - 1] = min(adj_lines_X)
+            has_adj_lines[i, side - 1] = adj_lines_X != [0]
+    X = X[:, np.newaxis]
+    max_adj_X /= Zb[:, np.newaxis]
+    min_adj_X /= Zb[:, np.newaxis]
+
+    X2 = np.maximum(0.9*(X + 0.85*min_adj_X), 1.15*X)
+    R2 = X2
+
+    X3 = (X + 1.15 * max_adj_X)
+    R3 = X3
+
+    X4 = X3 * 1.2  # X4 is only used to signal when apparent impedance is close to entering zone 3, not used for actual tripping
+    R4 = R3 * 1.2
+
+    # Load blinder taken as 1.5 times the nominal current at 0.85pu voltage with power factor of 30 degrees following NERC recommandations
+    I_max = line_rating / 100
+    blinder_reach = 0.85 / (1.5 * I_max)
+
+    # Overload protection (lines without distance protection)
+    P_max = 1.5 * line_rating
+    overload_I_max = (P_max * 1e6) / (Ub * 3**0.5)
+
+    # Python floats (str() of NumPy floats can differ)
+    X1, R1, X2, R2, X3, R3, X4, R4 = [array.tolist() for array in np.broadcast_arrays(X1[:, np.newaxis], R1[:, np.newaxis], X2, R2, X3, R3, X4, R4)]
+    blinder_reach = blinder_reach.tolist()
+    overload_I_max = overload_I_max.tolist()
+    settings = []
+    for i, line_id in enumerate(line_ids):
+        sides = []
+        for j in range(2):
+            zones = {'X1': X1[i][j], 'R1': R1[i][j], 'X2': X2[i][j], 'R2': R2[i][j], 'X3': X3[i][j], 'R3': R3[i][j], 'X4': X4[i][j], 'R4': R4[i][j]}
+            if not has_adj_lines[i, j]:  # No adjacent lines
+                zones.update({'X3': 0, 'R3': 0, 'X4': 0, 'R4': 0})  # Zone 2 and zone 3 would be identical -> remove zone 3
+            sides.append(zones)
+        settings.append({
+            'line_id': line_id,
+            'distance': bool(distance[i]),
+            'sides': sides,
+            'blinder_reach': blinder_reach[i],
+            'overload_I_max': overload_I_max[i],
+        })
+    return settings
 
 
 def get_buses_to_lines(network):
@@ -101,14 +198,14 @@ def add_gen_speed_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error,
     """
     protection_id = gen_id + '_Speed'
     speed_attrib = {'id': protection_id, 'lib': 'SpeedProtection', 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), speed_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), speed_attrib)
 
     connect_attribs = [
         {'id1': protection_id, 'var1': 'speedProtection_omegaMonitoredPu', 'id2': gen_id, 'var2': 'generator_omegaPu_value'},
         {'id1': protection_id, 'var1': 'speedProtection_switchOffSignal', 'id2': gen_id, 'var2': 'generator_switchOffSignal2'}
     ]
     for connect_attrib in connect_attribs:
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     if RANDOMISE_DYN_DATA:
         rand_omegaMax = random.uniform(-omega_max_error, omega_max_error)
@@ -119,14 +216,14 @@ def add_gen_speed_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error,
         rand_omegaMin = 0
         rand_CB = 0
 
-    speed_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
+    speed_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
     par_attribs = [
         {'type':'DOUBLE', 'name':'speedProtection_OmegaMaxPu', 'value':str(1.05 + rand_omegaMax)},
         {'type':'DOUBLE', 'name':'speedProtection_OmegaMinPu', 'value':str(0.95 + rand_omegaMin)},
         {'type':'DOUBLE', 'name':'speedProtection_tLagAction', 'value':str(0.02 + CB_time + rand_CB)}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(speed_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(speed_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
 def add_gen_UVA_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error):
@@ -135,14 +232,14 @@ def add_gen_UVA_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error):
     """
     protection_id = gen_id + '_UVA'
     uva_attrib = {'id': protection_id, 'lib': 'UnderVoltageAutomaton', 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), uva_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), uva_attrib)
 
     connect_attribs = [
         {'id1': protection_id, 'var1': 'underVoltageAutomaton_UMonitoredPu', 'id2': 'NETWORK', 'var2': '@' + gen_id + '@@NODE@_Upu_value'},
         {'id1': protection_id, 'var1': 'underVoltageAutomaton_switchOffSignal', 'id2': gen_id, 'var2': 'generator_switchOffSignal2'}
     ]
     for connect_attrib in connect_attribs:
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     if RANDOMISE_DYN_DATA:
         rand_UMin = random.uniform(-0.05, 0)
@@ -151,13 +248,13 @@ def add_gen_UVA_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error):
         rand_UMin = 0
         rand_CB = 0
 
-    uva_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
+    uva_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
     par_attribs = [
         {'type':'DOUBLE', 'name':'underVoltageAutomaton_UMinPu', 'value':str(0.85 + rand_UMin)},
         {'type':'DOUBLE', 'name':'underVoltageAutomaton_tLagAction', 'value':str(1.5 + CB_time + rand_CB)}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(uva_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(uva_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
 def add_gen_OOS_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error, angle_max_error=10):
@@ -166,14 +263,14 @@ def add_gen_OOS_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error, an
     """
     protection_id = gen_id + '_InternalAngle'
     oos_attrib = {'id': protection_id, 'lib': 'LossOfSynchronismProtection', 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), oos_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), oos_attrib)
 
     connect_attribs = [
         {'id1': protection_id, 'var1': 'lossOfSynchronismProtection_thetaMonitored',  'id2': gen_id, 'var2': 'generator_thetaInternal_value'},
         {'id1': protection_id, 'var1': 'lossOfSynchronismProtection_switchOffSignal', 'id2': gen_id, 'var2': 'generator_switchOffSignal2'}
     ]
     for connect_attrib in connect_attribs:
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     if RANDOMISE_DYN_DATA:
         rand_thetaMin = random.uniform(-angle_max_error, angle_max_error) * pi/180
@@ -182,13 +279,13 @@ def add_gen_OOS_protection(dyd_root, par_root, gen_id, CB_time, CB_max_error, an
         rand_thetaMin = 0
         rand_CB = 0
 
-    oos_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
+    oos_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
     par_attribs = [
         {'type':'DOUBLE', 'name':'lossOfSynchronismProtection_ThetaMax', 'value':str(7/8 * pi + rand_thetaMin)},
         {'type':'DOUBLE', 'name':'lossOfSynchronismProtection_tLagAction', 'value':str(0.02 + CB_time + rand_CB)}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(oos_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(oos_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
 def add_UFLS(dyd_root, par_root, network):
@@ -197,7 +294,7 @@ def add_UFLS(dyd_root, par_root, network):
     """
     protection_id = 'UFLS'
     ufls_attrib = {'id': protection_id, 'lib': 'UFLS10Steps', 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), ufls_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), ufls_attrib)
 
     connect_attribs = [
         {'id1': protection_id, 'var1': 'ufls_omegaMonitoredPu',  'id2': 'OMEGA_REF', 'var2': 'omegaRef_0_value'}
@@ -210,10 +307,10 @@ def add_UFLS(dyd_root, par_root, network):
                 {'id1': protection_id, 'var1': 'ufls_deltaPQfiltered', 'id2': load_id, 'var2': 'load_deltaQ'}
             ]
     for connect_attrib in connect_attribs:
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # UFLS parameters
-    ufls_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
+    ufls_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
     par_attribs = [
         {'type':'DOUBLE', 'name':'ufls_UFLSStep_0_', 'value':'0.1'},
         {'type':'DOUBLE', 'name':'ufls_UFLSStep_1_', 'value':'0.05'},
@@ -238,28 +335,25 @@ def add_UFLS(dyd_root, par_root, network):
         {'type':'DOUBLE', 'name':'ufls_tLagAction', 'value':'0.1'}
     ]
     for par_attrib in par_attribs:
-        etree.SubElement(ufls_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(ufls_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
-def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2lines, line_id, line_rating, CB_time, CB_max_error, special,
+def add_line_dist_protection(dyd_root, par_root, line_settings: dict, CB_time, CB_max_error, special,
                              protection_hidden_failures: list[str], measurement_max_error = 0.1):
     """
-    Add line distance protection model to Dynawo input files
+    Add line distance protection model to Dynawo input files, line_settings are the settings of the line computed by get_line_protection_settings()
     """
-    voltage_level = lines.at[line_id, 'voltage_level1_id']
-    Ub = float(voltage_levels.at[voltage_level, 'nominal_v']) * 1000
-    Sb = 100e6  # 100MW is the default base in Dynawo
-    Zb = Ub**2/Sb
-
-    if Ub < DISTANCE_PROTECTION_MINIMUM_VOLTAGE_LEVEL:
+    if not line_settings['distance']:
         return
+    line_id = line_settings['line_id']
+    blinder_reach = line_settings['blinder_reach']
+    blinder_angle = 45 * (pi/180)  # 45 instead of 30 due to high reactive flows in some lines (mainly interconnections I believe)
 
     for side in [1,2]:
-        opposite_side = 3-side  # 2 if side == 1, 1 if side == 2
         protection_id = line_id + '_side{}'.format(side) + '_Distance'
         lib = 'DistanceProtectionLineFourZonesWithBlinder'
         dist_attrib = {'id': protection_id, 'lib': lib, 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
 
         connect_attribs = [
             {'id1': protection_id, 'var1': 'distance_UMonitoredPu', 'id2': 'NETWORK', 'var2': line_id + '_U{}_value'.format(side)},
@@ -268,43 +362,13 @@ def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2line
             {'id1': protection_id, 'var1': 'distance_lineState', 'id2': 'NETWORK', 'var2': line_id + '_state'}
         ]
         for connect_attrib in connect_attribs:
-            etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+            xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
         # Parameters
-        dist_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
-
-        X = lines.at[line_id, 'x'] / Zb
-        # R = lines.at[line_id, 'r'] / Zb
-
-        X1 = 0.8 * X
-        R1 = X1
+        dist_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
 
-        adj_lines = get_adjacent_lines(bus2lines, lines, line_id, opposite_side)  # Only the adjacent lines that can be "seen" from a forward looking distance relay
-        adj_lines_X = [lines.at[adj_line, 'x'] for adj_line in adj_lines]
-        if not adj_lines_X: # is empty
-            adj_lines_X = [0]
-        max_adj_X = max(adj_lines_X) / Zb
-        min_adj_X = min(adj_lines_X) / Zb
-
-        X2 = max(0.9*(X + 0.85*min_adj_X), 1.15*X)
-        R2 = X2
-
-        X3 = (X + 1.15 * max_adj_X)
-        R3 = X3
-
-        X4 = X3 * 1.2  # X4 is only used to signal when apparent impedance is close to entering zone 3, not used for actual tripping
-        R4 = R3 * 1.2
-
-        # Load blinder taken as 1.5 times the nominal current at 0.85pu voltage with power factor of 30 degrees following NERC recommandations
-        I_max = line_rating / 100
-        blinder_reach = 0.85 / (1.5 * I_max)
-        blinder_angle = 45 * (pi/180)  # 45 instead of 30 due to high reactive flows in some lines (mainly interconnections I believe)
-
-        if adj_lines_X == [0]: # No adjacent lines
-            X3 = 0  # Zone 2 and zone 3 would be identical -> remove zone 3
-            R3 = 0
-            X4 = 0
-            R4 = 0
+        zones = line_settings['sides'][side - 1]
+        X1, R1, X2, R2, X3, R3, X4, R4 = [zones[zone] for zone in ['X1', 'R1', 'X2', 'R2', 'X3', 'R3', 'X4', 'R4']]
 
         if RANDOMISE_DYN_DATA:
             rand_measurement_ratio = 1 + random.uniform(-measurement_max_error, measurement_max_error)
@@ -360,7 +424,7 @@ def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2line
                 {'type':'BOOL', 'name':'distance_TrippingZone_3_', 'value': 'false'},
             ]
         for par_attrib in par_attribs:
-            etree.SubElement(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+            xml_stream.sub_element(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
         if WITH_HIDDEN_FAILURES:
@@ -370,7 +434,7 @@ def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2line
                     hidden_failure_id += '_activated'
 
             dist_attrib = {'id': hidden_failure_id, 'lib': lib, 'parFile': NETWORK_NAME + '.par', 'parId': hidden_failure_id}
-            etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
+            xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
 
             connect_attribs = [
                 {'id1': hidden_failure_id, 'var1': 'distance_UMonitoredPu', 'id2': 'NETWORK', 'var2': line_id + '_U{}_value'.format(side)},
@@ -379,10 +443,10 @@ def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2line
                 {'id1': hidden_failure_id, 'var1': 'distance_lineState', 'id2': 'NETWORK', 'var2': line_id + '_state'}
             ]
             for connect_attrib in connect_attribs:
-                etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+                xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
             # Parameters
-            dist_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : hidden_failure_id})
+            dist_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : hidden_failure_id})
 
             par_attribs = [
                 {'type':'INT', 'name':'distance_LineSide', 'value':str(side)},
@@ -417,23 +481,21 @@ def add_line_dist_protection(dyd_root, par_root, lines, voltage_levels, bus2line
                         par_attribs[-2] = {'type':'BOOL', 'name':'distance_TrippingZone_2_', 'value': 'true'}
 
             for par_attrib in par_attribs:
-                etree.SubElement(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+                xml_stream.sub_element(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
 
 
-def add_line_overload_protection(dyd_root, par_root, lines, voltage_levels, line_id, line_rating):
+def add_line_overload_protection(dyd_root, par_root, line_settings: dict):
     """
-    Add line distance protection model to Dynawo input files
+    Add line overload protection model to Dynawo input files (for lines without distance protection)
     """
-    voltage_level = lines.at[line_id, 'voltage_level1_id']
-    Ub = float(voltage_levels.at[voltage_level, 'nominal_v']) * 1000
-
-    if Ub >= DISTANCE_PROTECTION_MINIMUM_VOLTAGE_LEVEL:  # Use distance protection instead
+    if line_settings['distance']:  # Use distance protection instead
         return
 
+    line_id = line_settings['line_id']
     protection_id = line_id + '_Overload'
     lib = 'CurrentLimitAutomaton'
     dist_attrib = {'id': protection_id, 'lib': lib, 'parFile': NETWORK_NAME + '.par', 'parId': protection_id}
-    etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
+    xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'blackBoxModel'), dist_attrib)
 
     connect_attribs = [
         {'id1': protection_id, 'var1': 'currentLimitAutomaton_IMonitored', 'id2': 'NETWORK', 'var2': line_id + '_iSide1'},
@@ -441,12 +503,11 @@ def add_line_overload_protection(dyd_root, par_root, lines, voltage_levels, line
         {'id1': protection_id, 'var1': 'currentLimitAutomaton_AutomatonExists', 'id2': 'NETWORK', 'var2': line_id + '_desactivate_currentLimits'}
     ]
     for connect_attrib in connect_attribs:
-        etree.SubElement(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
+        xml_stream.sub_element(dyd_root, etree.QName(DYNAWO_NAMESPACE, 'connect'), connect_attrib)
 
     # Parameters
-    dist_par_set = etree.SubElement(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
-    P_max = 1.5 * line_rating
-    I_max = (P_max * 1e6) / (Ub * 3**0.5)
+    dist_par_set = xml_stream.sub_element(par_root, etree.QName(DYNAWO_NAMESPACE, 'set'), {'id' : protection_id})
+    I_max = line_settings['overload_I_max']
 
     par_attribs = [
 
@@ -457,4 +518,4 @@ def add_line_overload_protection(dyd_root, par_root, lines, voltage_levels, line
     ]
 
     for par_attrib in par_attribs:
-        etree.SubElement(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
+        xml_stream.sub_element(dist_par_set, etree.QName(DYNAWO_NAMESPACE, 'par'), par_attrib)
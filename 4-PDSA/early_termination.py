@@ -0,0 +1,108 @@
+from __future__ import annotations
+from common import *
+if WITH_LXML:
+    from lxml import etree
+else:
+    import xml.etree.ElementTree as etree
+import os
+import dynawo_outputs
+
+"""
+Early termination of the Dynawo simulations whose outcome is already decided (see EARLY_TERMINATION). While Dynawo runs,
+the monitor reads the new lines of the timeline and of the log (for the current simulation time), and the simulation
+is interrupted (SIGINT, as for timeouts, Dynawo then writes its outputs) when one of the EARLY_TERMINATION_CRITERIA is met:
+- 'blackout': all synchronous machines are disconnected, the load shedding is then 100% whatever happens afterwards
+- 'quiet': no event in the timeline during the last EARLY_TERMINATION_QUIET_TIME_S seconds (simulation time) after
+  T_BACKUP, i.e. the system is assumed to have settled. The load shedding is identical only if no slower phenomenon
+  (e.g. protections with long delays) acts after the quiet period, so it should be longer than the slowest of them.
+The interruption is then not considered as a timeout or convergence issue by dynawo_outputs.get_job_results().
+
+Note: the timeline has to be written while Dynawo runs (and not only at the end) for the monitor to see the events. The
+jobs files of the cases only export it at the end of the simulation, so the criteria are only armed once the timeline
+has grown and the simulation time has advanced after that (otherwise, 'quiet' would stop all simulations at
+T_BACKUP + EARLY_TERMINATION_QUIET_TIME_S whatever happens afterwards).
+"""
+
+CRITERIA = ['blackout', 'quiet']
+
+
+class TimelineMonitor:
+    def __init__(self, working_dir):
+        self.working_dir = working_dir
+        self.timeline_file = os.path.join(working_dir, 'outputs', 'timeLine', 'timeline.log')
+        self.log_file = os.path.join(working_dir, 'outputs', 'logs', 'dynawo.log')
+        self.offsets = {self.timeline_file: 0, self.log_file: 0}
+        self.time = 0  # Current simulation time
+        self.last_event_time = T_BACKUP
+        self.disconnected_generators = set()
+        self.tripped_models = set()  # Later events of these models are disregarded (as in dynawo_outputs.get_job_results())
+        self.nb_machines = None
+        self.timeline_growth_time = None  # Simulation time when the timeline was first seen growing during this run
+        self.timeline_streamed = False  # True once the timeline is known to be written while Dynawo runs
+        self.criterion = None  # Criterion that stopped the simulation
+
+    def read_new_lines(self, path) -> list[str]:
+        """
+        Return the lines (complete only) written to path since the last call
+        """
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as file:
+            file.seek(self.offsets[path])
+            data = file.read()
+        end = data.rfind(b'\n') + 1
+        self.offsets[path] += end
+        return data[:end].decode(errors='replace').splitlines()
+
+    def update(self):
+        timeline_lines = self.read_new_lines(self.timeline_file)
+        for line in timeline_lines:
+            line_split = line.strip().split(' | ')
+            if len(line_split) != 3:
+                continue
+            time, model, event_description = line_split
+            self.last_event_time = max(self.last_event_time, float(time))
+            if 'hidden_failure' in model or model in self.tripped_models:
+                continue
+            if 'trip' in event_description:
+                self.tripped_models.add(model)
+            if 'GENERATOR : disconnecting' in event_description:
+                self.disconnected_generators.add(model)
+        for line in self.read_new_lines(self.log_file):
+            line_split = line.split(' | ')
+            if len(line_split) > 3:
+                try:
+                    self.time = max(self.time, float(line_split[2]))
+                except ValueError:
+                    pass
+        if self.timeline_growth_time is not None and self.time > self.timeline_growth_time:
+            self.timeline_streamed = True
+        if self.timeline_growth_time is None and len(timeline_lines) > 0:
+            self.timeline_growth_time = self.time
+
+    def get_nb_machines(self):
+        if self.nb_machines is None:
+            dyd_root = etree.parse(os.path.join(self.working_dir, NETWORK_NAME + '.dyd')).getroot()
+            self.nb_machines = len(dynawo_outputs.get_connected_machines(dyd_root))
+        return self.nb_machines
+
+    def should_stop(self) -> bool:
+        """
+        Read the new outputs of Dynawo and return True if the simulation can be stopped (criterion is then set)
+        """
+        self.update()
+        if not self.timeline_streamed:
+            return False
+        if 'blackout' in EARLY_TERMINATION_CRITERIA and len(self.disconnected_generators) > 0 and len(self.disconnected_generators) >= self.get_nb_machines():
+            self.criterion = 'blackout'
+        elif 'quiet' in EARLY_TERMINATION_CRITERIA and self.time >= self.last_event_time + EARLY_TERMINATION_QUIET_TIME_S:
+            self.criterion = 'quiet'
+        return self.criterion is not None
+
+    def get_saved_time(self, elapsed_time) -> float:
+        """
+        Estimate the computation time saved by stopping the simulation, assuming a constant simulation speed
+        """
+        if self.criterion is None or self.time <= 0:
+            return 0
+        return elapsed_time * max(T_END - self.time, 0) / self.time
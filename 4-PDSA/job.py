@@ -9,17 +9,22 @@ import subprocess
 import signal
 import time
 import dynawo_inputs
+import dynawo_launcher
 from dynawo_outputs import get_job_results, get_job_results_special
 from results import Results
 import logger
 import shutil
 import screening
-import pypowsybl as pp
+import network_cache
+import compilation_cache
+import scratch
+import early_termination
 
-def run_with_timeout(cmd, timeout, grace_period=10):
+def run_with_timeout(cmd, timeout, grace_period=10, monitor=None):
     """
     Run a command with a timeout, capturing stderr.
     Terminates the process safely on both Linux/macOS and Windows.
+    If an early termination monitor is given, the process is also interrupted when it asks to (not reported as timed out)
     """
     is_windows = os.name == "nt"
     timed_out = False
@@ -30,7 +35,10 @@ def run_with_timeout(cmd, timeout, grace_period=10):
         proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, start_new_session=True)
 
     try:
-        _, stderr = proc.communicate(timeout=timeout)
+        if monitor is None:
+            _, stderr = proc.communicate(timeout=timeout)
+        else:
+            _, stderr = communicate_with_monitor(proc, timeout, grace_period, monitor)
         return timed_out, stderr.decode(errors="replace")
 
     except subprocess.TimeoutExpired:
@@ -53,6 +61,51 @@ def run_with_timeout(cmd, timeout, grace_period=10):
         return timed_out, stderr.decode(errors="replace")
 
 
+def communicate_with_monitor(proc: subprocess.Popen, timeout, grace_period, monitor):
+    """
+    Same as proc.communicate(timeout=timeout), but poll the early termination monitor every
+    EARLY_TERMINATION_POLLING_PERIOD_S, and interrupt the process when it asks to (killed if it does not stop within
+    grace_period)
+    """
+    is_windows = os.name == "nt"
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return proc.communicate(timeout=min(EARLY_TERMINATION_POLLING_PERIOD_S, max(deadline - time.time(), 0)))
+        except subprocess.TimeoutExpired:
+            if time.time() >= deadline:
+                raise
+            if monitor.should_stop():
+                break
+
+    if is_windows:
+        proc.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        os.killpg(os.getpgid(proc.pid), signal.SIGINT)
+    try:
+        return proc.communicate(timeout=grace_period)
+    except subprocess.TimeoutExpired:
+        if is_windows:
+            proc.kill()
+        else:
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+        return proc.communicate()
+
+
+DEFAULT_SOLVER = 0
+ALT_SOLVER = 1
+JOBS_FILES = [NETWORK_NAME + '.jobs', NETWORK_NAME + '_alt_solver.jobs']  # Jobs file of each solver
+
+
+def run_dynawo(cmd, timeout, monitor=None):
+    """
+    Run Dynawo with run_with_timeout(), or through the persistent launcher of the process if PERSISTENT_LAUNCHER
+    """
+    if PERSISTENT_LAUNCHER and os.name != "nt":
+        return dynawo_launcher.launcher.run_with_timeout(cmd, timeout, monitor=monitor)
+    return run_with_timeout(cmd, timeout, monitor=monitor)
+
+
 class Job:
     _ids = count(0)
     def __init__(self, static_id, dynamic_seed, contingency: Contingency):
@@ -62,7 +115,11 @@ class Job:
         self.contingency = contingency
         self.completed = False
         self.timed_out = False
-        self.working_dir = os.path.join('./simulations', f'{CASE}_{NETWORK_NAME}', str(self.static_id), str(self.dynamic_seed), self.contingency.id)
+        self.working_dir = scratch.get_working_dir(self.static_id, self.dynamic_seed, self.contingency.id)
+        self.first_solver = DEFAULT_SOLVER  # Chosen by the master (see SolverSelector)
+        self.solver_attempts: list[tuple[int, bool, float]] = []  # (solver, succeeded, time) of each Dynawo run
+        self.early_termination = None  # Criterion with which the simulation was stopped early (see early_termination.py)
+        self.early_termination_saved_time = 0  # Estimated computation time saved by stopping early
 
     @classmethod
     def from_parent_and_protection_failure(cls, parent: Job, protection_hidden_failure):
@@ -76,9 +133,9 @@ class Job:
 
     def complete(self, elapsed_time):
         self.elapsed_time = elapsed_time
-        self.results = get_job_results(self.working_dir, self.contingency.fault_location)
+        self.results = get_job_results(self.working_dir, self.contingency.id, self.contingency.fault_location, self.static_id, self.early_termination is not None)
         self.completed = True
-        shutil.rmtree(self.working_dir, ignore_errors=True)
+        scratch.remove_dir(self.working_dir)
         if NEGLECT_NORMAL_FAULT_RISK:
             if self.contingency.order < 2 and ('DELAYED' not in self.contingency.id and '~' not in self.contingency.id):
                 self.results.load_shedding = 0
@@ -103,27 +160,46 @@ class Job:
     def call_dynawo(self):
         t0 = time.time()
 
-        dynawo_inputs.write_job_files(self)
-
-        # Launch cmd and interrupt it if last longer than JOB_TIMEOUT_S
-        cmd = [DYNAWO_PATH, 'jobs', os.path.join(self.working_dir, NETWORK_NAME + '.jobs')]
-        self.timed_out, stderr = run_with_timeout(cmd, timeout=JOB_TIMEOUT_S)
-
-        if ('Error' in stderr or self.timed_out) and NETWORK_NAME != 'Texas':  # Simulation failed, so retry with another solver (not for Texas case because IDA not performant enough on large networks)
-            # Delete output files of failed attempt
-            output_dir = os.path.join(self.working_dir, 'outputs')
-            shutil.rmtree(output_dir, ignore_errors=True)
-            # Retry with another solver
-            cmd = [DYNAWO_PATH, 'jobs', os.path.join(self.working_dir, NETWORK_NAME + '_alt_solver.jobs')]
-            logger.logger.log(logger.logging.TRACE, 'Launching job %s with alternative solver' % self)
-            self.timed_out, stderr = run_with_timeout(cmd, timeout=JOB_TIMEOUT_S)
+        compilation_entry = dynawo_inputs.write_job_files(self)
+
+        # Launch cmd and interrupt it if last longer than JOB_TIMEOUT_S. If the simulation fails, retry with the other solver
+        # (not for Texas case because IDA not performant enough on large networks)
+        solvers = [self.first_solver, 1 - self.first_solver]
+        if NETWORK_NAME == 'Texas':
+            solvers = solvers[:1]
+        self.solver_attempts = []
+        for solver in solvers:
+            if len(self.solver_attempts) > 0:
+                # Delete output files of failed attempt
+                output_dir = os.path.join(self.working_dir, 'outputs')
+                shutil.rmtree(output_dir, ignore_errors=True)
+                logger.logger.log(logger.logging.TRACE, 'Launching job %s with %s solver' % (self, 'alternative' if solver == ALT_SOLVER else 'default'))
+            t_dynawo = time.time()
+            cmd = [DYNAWO_PATH, 'jobs', os.path.join(self.working_dir, JOBS_FILES[solver])]
+            monitor = early_termination.TimelineMonitor(self.working_dir) if EARLY_TERMINATION else None
+            self.timed_out, stderr = run_dynawo(cmd, timeout=JOB_TIMEOUT_S, monitor=monitor)
+            stopped_early = monitor is not None and monitor.criterion is not None
+            succeeded = stopped_early or not ('Error' in stderr or self.timed_out)
+            self.solver_attempts.append((solver, succeeded, time.time() - t_dynawo))
+            if succeeded:
+                if stopped_early:
+                    self.early_termination = monitor.criterion
+                    self.early_termination_saved_time = monitor.get_saved_time(self.solver_attempts[-1][2])
+                    logger.logger.log(logger.logging.TRACE, 'Job {} stopped at t = {}s ({})'.format(self, monitor.time, monitor.criterion))
+                break
+        if COMPILATION_CACHE_DIR is not None:
+            cache_status = 'compilation cache miss' if compilation_entry is not None else 'compilation cache hit'
+            logger.logger.log(logger.logging.TRACE, 'Dynawo runs of job {} took {:.1f}s ({})'.format(self, sum([attempt[2] for attempt in self.solver_attempts]), cache_status))
+
+        if compilation_entry is not None and self.solver_attempts[-1][1]:
+            jobs_file = os.path.join(self.working_dir, JOBS_FILES[self.solver_attempts[-1][0]])
+            compilation_cache.publish(compilation_cache.get_compile_dir(jobs_file), compilation_entry)
 
         delta_t = time.time() - t0
         self.complete(delta_t)
 
     def stability_screening(self):
-        network_path = os.path.join('../2-SCOPF/d-Final-dispatch', f'{CASE}_{NETWORK_NAME}', str(self.static_id) + '.iidm')
-        network = pp.network.load(network_path)
+        network = network_cache.get_network(self.static_id)
         disconnected_elements = [event.element for event in self.contingency.init_events if not isinstance(event, contingencies.InitFault)]
         lines = network.get_lines()
         disconnected_lines = [disconnected_element for disconnected_element in disconnected_elements if disconnected_element in lines.index]
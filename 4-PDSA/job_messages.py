@@ -0,0 +1,235 @@
+from __future__ import annotations
+from common import *
+from contingencies import Contingency
+from job import Job, SpecialJob, ALT_SOLVER
+from results import Results
+import early_termination
+import numpy as np
+import struct
+
+"""
+Compact binary encoding of the jobs exchanged between the master and the slaves (sent with buffer-based Send/Recv).
+Job requests only contain the contingency id, static id and dynamic seed of the job, the slaves recreate the
+contingency from its id. Job results contain the outputs of Job.run() with the trip timeline packed in arrays.
+The ticket identifies the job on the master (Job.id of the master's Job object). The solver attempts and early
+termination are written at the end of the job results, they are optional so that results saved before they were added
+can still be decoded.
+"""
+
+WIRE_FORMAT_VERSION = 1
+
+REQUEST_HEADER = struct.Struct('<BBqq')  # Version, flags, ticket, dynamic seed
+RESULT_HEADER = struct.Struct('<BBqdddI')  # Version, flags, ticket, elapsed time, load shedding, cost, number of trip events
+SCREENING_VALUES = struct.Struct('<dddd')  # shc_ratio, cct, RoCoF, power_loss_over_reserve
+SOLVER_ATTEMPT = struct.Struct('<B?d')  # Solver, succeeded, time
+NB_SOLVER_ATTEMPTS = struct.Struct('<B')
+EARLY_TERMINATION_VALUES = struct.Struct('<Bd')  # Criterion (0 if not stopped early, index in early_termination.CRITERIA + 1 otherwise), saved time
+STRING_LENGTH = struct.Struct('<I')
+
+# Request flags
+SPECIAL = 1
+ALT_SOLVER_FIRST = 2
+# Result flags
+COMPLETED = 1
+TIMED_OUT = 2
+VARIABLE_ORDER = 4
+MISSING_EVENTS = 8
+VOLTAGE_STABLE = 16
+TRANSIENT_STABLE = 32
+FREQUENCY_STABLE = 64
+WITH_SCREENING_VALUES = 128
+
+
+def pack_string(string: str) -> bytes:
+    encoded = string.encode('utf-8')
+    return STRING_LENGTH.pack(len(encoded)) + encoded
+
+def unpack_string(buffer, offset) -> tuple[str, int]:
+    length, = STRING_LENGTH.unpack_from(buffer, offset)
+    offset += STRING_LENGTH.size
+    return bytes(buffer[offset:offset + length]).decode('utf-8'), offset + length
+
+def pack_string_list(strings: list[str]) -> bytes:
+    return STRING_LENGTH.pack(len(strings)) + pack_string('\n'.join(strings))  # Ids and event descriptions never contain line breaks
+
+def unpack_string_list(buffer, offset) -> tuple[list[str], int]:
+    nb_strings, = STRING_LENGTH.unpack_from(buffer, offset)
+    string, offset = unpack_string(buffer, offset + STRING_LENGTH.size)
+    if nb_strings == 0:
+        return [], offset
+    return string.split('\n'), offset
+
+def check_version(buffer):
+    if buffer[0] != WIRE_FORMAT_VERSION:
+        raise ValueError('Unsupported job message version {} (expected {})'.format(buffer[0], WIRE_FORMAT_VERSION))
+
+
+def encode_job_request(job: Job) -> bytearray:
+    flags = SPECIAL if isinstance(job, SpecialJob) else 0
+    if job.first_solver == ALT_SOLVER:
+        flags |= ALT_SOLVER_FIRST
+    message = bytearray(REQUEST_HEADER.pack(WIRE_FORMAT_VERSION, flags, job.id, job.dynamic_seed))
+    message += pack_string(str(job.static_id))
+    message += pack_string(job.contingency.id)
+    return message
+
+def decode_job_request(buffer, contingencies: dict[str, Contingency]) -> tuple[int, Job]:
+    """
+    Return the ticket of the job and the job itself. contingencies maps the contingency ids to the known contingencies,
+    contingencies created by hidden failures are added to it the first time they are seen
+    """
+    check_version(buffer)
+    _, flags, ticket, dynamic_seed = REQUEST_HEADER.unpack_from(buffer, 0)
+    offset = REQUEST_HEADER.size
+    static_id, offset = unpack_string(buffer, offset)
+    contingency_id, offset = unpack_string(buffer, offset)
+
+    if contingency_id not in contingencies:
+        contingencies[contingency_id] = Contingency.from_id(contingency_id, contingencies)
+    contingency = contingencies[contingency_id]
+
+    if flags & SPECIAL:
+        job = SpecialJob(static_id, dynamic_seed, contingency)
+    else:
+        job = Job(static_id, dynamic_seed, contingency)
+    if flags & ALT_SOLVER_FIRST:
+        job.first_solver = ALT_SOLVER
+    return ticket, job
+
+
+def decode_job_request_contingency_id(buffer) -> str:
+    check_version(buffer)
+    _, offset = unpack_string(buffer, REQUEST_HEADER.size)  # Static id
+    contingency_id, _ = unpack_string(buffer, offset)
+    return contingency_id
+
+def decode_job_request_key(buffer) -> tuple[str, str, int]:
+    """
+    Return (contingency id, static id, dynamic seed) without recreating the job
+    """
+    check_version(buffer)
+    dynamic_seed = REQUEST_HEADER.unpack_from(buffer, 0)[3]
+    static_id, offset = unpack_string(buffer, REQUEST_HEADER.size)
+    contingency_id, _ = unpack_string(buffer, offset)
+    return contingency_id, static_id, dynamic_seed
+
+
+def encode_job_result(job: Job, ticket: int) -> bytearray:
+    results = job.results
+    flags = 0
+    if job.completed:
+        flags |= COMPLETED
+    if job.timed_out:
+        flags |= TIMED_OUT
+    if isinstance(job, SpecialJob):
+        if job.variable_order:
+            flags |= VARIABLE_ORDER
+        if job.missing_events:
+            flags |= MISSING_EVENTS
+    if WITH_SCREENING:
+        flags |= WITH_SCREENING_VALUES
+        if job.voltage_stable:
+            flags |= VOLTAGE_STABLE
+        if job.transient_stable:
+            flags |= TRANSIENT_STABLE
+        if job.frequency_stable:
+            flags |= FREQUENCY_STABLE
+
+    times, models, event_descriptions = results.get_trip_columns()
+    message = bytearray(RESULT_HEADER.pack(WIRE_FORMAT_VERSION, flags, ticket, job.elapsed_time, results.load_shedding, results.cost, len(times)))
+    message += times.astype('<f8').tobytes()
+    message += pack_string_list(models)
+    message += pack_string_list(event_descriptions)
+    message += pack_string_list(results.excited_hidden_failures)
+    message += pack_string_list(results.excited_generator_failures)
+    if WITH_SCREENING:
+        message += SCREENING_VALUES.pack(job.shc_ratio, job.cct, job.RoCoF, job.power_loss_over_reserve)
+    message += NB_SOLVER_ATTEMPTS.pack(len(job.solver_attempts))
+    for attempt in job.solver_attempts:
+        message += SOLVER_ATTEMPT.pack(*attempt)
+    criterion = 0 if job.early_termination is None else early_termination.CRITERIA.index(job.early_termination) + 1
+    message += EARLY_TERMINATION_VALUES.pack(criterion, job.early_termination_saved_time)
+    return message
+
+def decode_job_result_ticket(buffer) -> int:
+    check_version(buffer)
+    return RESULT_HEADER.unpack_from(buffer, 0)[2]
+
+def decode_job_result_completed(buffer) -> bool:
+    check_version(buffer)
+    return bool(RESULT_HEADER.unpack_from(buffer, 0)[1] & COMPLETED)
+
+def decode_job_result(buffer, job: Job):
+    """
+    Write the results contained in buffer to job (the job that was sent to the slave)
+    """
+    check_version(buffer)
+    _, flags, _, elapsed_time, load_shedding, cost, nb_trip_events = RESULT_HEADER.unpack_from(buffer, 0)
+    offset = RESULT_HEADER.size
+    times = np.frombuffer(buffer, dtype='<f8', count=nb_trip_events, offset=offset)
+    offset += 8 * nb_trip_events
+    models, offset = unpack_string_list(buffer, offset)
+    event_descriptions, offset = unpack_string_list(buffer, offset)
+    excited_hidden_failures, offset = unpack_string_list(buffer, offset)
+    excited_generator_failures, offset = unpack_string_list(buffer, offset)
+
+    job.results = Results.from_columns(load_shedding, cost, times, models, event_descriptions, excited_hidden_failures, excited_generator_failures)
+    job.elapsed_time = elapsed_time
+    job.completed = bool(flags & COMPLETED)
+    job.timed_out = bool(flags & TIMED_OUT)
+    if isinstance(job, SpecialJob):
+        job.variable_order = bool(flags & VARIABLE_ORDER)
+        job.missing_events = bool(flags & MISSING_EVENTS)
+    if flags & WITH_SCREENING_VALUES:
+        job.voltage_stable = bool(flags & VOLTAGE_STABLE)
+        job.transient_stable = bool(flags & TRANSIENT_STABLE)
+        job.frequency_stable = bool(flags & FREQUENCY_STABLE)
+        job.shc_ratio, job.cct, job.RoCoF, job.power_loss_over_reserve = SCREENING_VALUES.unpack_from(buffer, offset)
+        offset += SCREENING_VALUES.size
+    job.solver_attempts = []
+    if offset < len(buffer):
+        nb_attempts, = NB_SOLVER_ATTEMPTS.unpack_from(buffer, offset)
+        offset += NB_SOLVER_ATTEMPTS.size
+        for _ in range(nb_attempts):
+            job.solver_attempts.append(SOLVER_ATTEMPT.unpack_from(buffer, offset))
+            offset += SOLVER_ATTEMPT.size
+    job.early_termination, job.early_termination_saved_time = None, 0
+    if offset < len(buffer):
+        criterion, job.early_termination_saved_time = EARLY_TERMINATION_VALUES.unpack_from(buffer, offset)
+        if criterion > 0:
+            job.early_termination = early_termination.CRITERIA[criterion - 1]
+
+
+READY_MESSAGE = struct.Struct('<I')  # Number of job slots of the slave
+
+def encode_ready_message(nb_slots: int) -> bytearray:
+    return bytearray(READY_MESSAGE.pack(nb_slots))
+
+def decode_ready_message(buffer) -> int:
+    return READY_MESSAGE.unpack_from(buffer, 0)[0]
+
+
+def encode_batch(messages: list) -> bytearray:
+    """
+    Concatenate several job requests or job results in a single message (START and DONE messages are always batches)
+    """
+    batch = bytearray(STRING_LENGTH.pack(len(messages)))
+    for message in messages:
+        batch += STRING_LENGTH.pack(len(message))
+        batch += message
+    return batch
+
+def decode_batch(buffer) -> list[memoryview]:
+    view = memoryview(buffer)
+    nb_messages, = STRING_LENGTH.unpack_from(view, 0)
+    offset = STRING_LENGTH.size
+    messages = []
+    for _ in range(nb_messages):
+        length, = STRING_LENGTH.unpack_from(view, offset)
+        offset += STRING_LENGTH.size
+        messages.append(view[offset:offset + length])
+        offset += length
+    return messages
+
+def get_batch_size(messages: list) -> int:
+    return STRING_LENGTH.size * (len(messages) + 1) + sum([len(message) for message in messages])
@@ -3,17 +3,18 @@ import hashlib
 import os
 import pickle
 import random
-import shutil
 import time
-from collections import defaultdict
+import heapq
+from collections import defaultdict, deque
 from math import sqrt, ceil
 
 import numpy as np
 import logger
 from natsort import natsorted
 
-from job import Job, SpecialJob
+from job import Job, SpecialJob, DEFAULT_SOLVER, ALT_SOLVER
 from contingencies import Contingency
+from result_journal import ResultJournal
 from common import *
 
 if WITH_LXML:
@@ -29,7 +30,7 @@ class ContingencyLaunched:
 
     def add_job(self, job: Job):
         static_id = job.static_id
-        if static_id in self.static_ids:
+        if static_id in self.dynamic_seeds:  # Dict lookup, static_ids is only used to keep track of the launch order
             self.dynamic_seeds[static_id].append(job.dynamic_seed)
         else:
             self.static_ids.append(static_id)
@@ -37,36 +38,77 @@ class ContingencyLaunched:
 
 
 class ContingencyResults:
+    """
+    Results of the jobs of a contingency. Statistics per static id are stored in NumPy arrays (columns) so that
+    statistics over all static ids can be computed without Python loops. The i-th element of each column corresponds
+    to static_ids[i] (static_id_indices gives i from the static id), columns are overallocated and grown by doubling
+    """
     def __init__(self):
         self.static_ids = []
+        self.static_id_indices: dict[str, int] = {}
         self.jobs: dict[int, list[Job]]
         self.jobs = {}
-        self.sum_load_shedding = {}
-        self.sum_load_shedding_squared = {}
-        self.sum_cost = {}
-        self.sum_cost_squared = {}
-        self.elapsed_time = {}
+        self.n = np.zeros(16, dtype=int)  # Number of jobs per static id
+        self.sum_load_shedding = np.zeros(16)
+        self.sum_load_shedding_squared = np.zeros(16)
+        self.sum_cost = np.zeros(16)
+        self.sum_cost_squared = np.zeros(16)
+        self.elapsed_time = np.zeros(16)
+        self.with_dynamic_runs = np.zeros(16, dtype=bool)  # True if the first (special) job of the static id has variable_order or missing_events
         self.total_elapsed_time = 0
+        # Sums over static ids of the average load shedding (resp. cost) per static id, updated incrementally
+        self.sum_mean_load_shedding = 0
+        self.sum_mean_cost = 0
+
+    def grow_columns(self):
+        for name in ['n', 'sum_load_shedding', 'sum_load_shedding_squared', 'sum_cost', 'sum_cost_squared', 'elapsed_time', 'with_dynamic_runs']:
+            column = getattr(self, name)
+            new_column = np.zeros(2 * len(column), dtype=column.dtype)
+            new_column[:len(column)] = column
+            setattr(self, name, new_column)
 
     def add_job(self, job: Job):
         static_id = job.static_id
-        if static_id in self.static_ids:
+        if static_id in self.static_id_indices:
+            i = self.static_id_indices[static_id]
+            self.sum_mean_load_shedding -= self.sum_load_shedding[i] / self.n[i]
+            self.sum_mean_cost -= self.sum_cost[i] / self.n[i]
             self.jobs[static_id].append(job)
-            self.sum_load_shedding[static_id] += job.results.load_shedding
-            self.sum_load_shedding_squared[static_id] += job.results.load_shedding ** 2
-            self.sum_cost[static_id] += job.results.cost
-            self.sum_cost_squared[static_id] += job.results.cost ** 2
-            self.elapsed_time[static_id] += job.elapsed_time
         else:
+            i = len(self.static_ids)
+            if i == len(self.n):
+                self.grow_columns()
             self.static_ids.append(static_id)
+            self.static_id_indices[static_id] = i
             self.jobs[static_id] = [job]
-            self.sum_load_shedding[static_id] = job.results.load_shedding
-            self.sum_load_shedding_squared[static_id] = job.results.load_shedding ** 2
-            self.sum_cost[static_id] = job.results.cost
-            self.sum_cost_squared[static_id] = job.results.cost ** 2
-            self.sum_cost[static_id] = job.results.cost
-            self.elapsed_time[static_id] = job.elapsed_time
+            self.with_dynamic_runs[i] = isinstance(job, SpecialJob) and (job.variable_order or job.missing_events)
+        self.n[i] += 1
+        self.sum_load_shedding[i] += job.results.load_shedding
+        self.sum_load_shedding_squared[i] += job.results.load_shedding ** 2
+        self.sum_cost[i] += job.results.cost
+        self.sum_cost_squared[i] += job.results.cost ** 2
+        self.elapsed_time[i] += job.elapsed_time
         self.total_elapsed_time += job.elapsed_time
+        self.sum_mean_load_shedding += self.sum_load_shedding[i] / self.n[i]
+        self.sum_mean_cost += self.sum_cost[i] / self.n[i]
+
+    def get_average_load_shedding_per_static_id_array(self) -> np.ndarray:
+        nb_static_ids = len(self.static_ids)
+        return self.sum_load_shedding[:nb_static_ids] / self.n[:nb_static_ids]
+
+    def get_average_cost_per_static_id_array(self) -> np.ndarray:
+        nb_static_ids = len(self.static_ids)
+        return self.sum_cost[:nb_static_ids] / self.n[:nb_static_ids]
+
+    def get_completed_static_ids_mask(self) -> np.ndarray:
+        """
+        Return a mask of the static ids whose dynamic runs are all completed (i.e. that do not need MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED
+        runs or that already have them)
+        """
+        nb_static_ids = len(self.static_ids)
+        if not DOUBLE_MC_LOOP:
+            return np.ones(nb_static_ids, dtype=bool)
+        return ~self.with_dynamic_runs[:nb_static_ids] | (self.n[:nb_static_ids] >= MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED)
 
     def get_cost_variance_per_static_id_no_error(self, static_id):
         """
@@ -82,9 +124,10 @@ class ContingencyResults:
         else:
             logger.logger.warn("First job for a given static id should always be a special job")
 
-        sum_ = self.sum_cost[static_id]
-        sum_sq = self.sum_cost_squared[static_id]
-        n = len(self.jobs[static_id])
+        i = self.static_id_indices[static_id]
+        sum_ = float(self.sum_cost[i])
+        sum_sq = float(self.sum_cost_squared[i])
+        n = int(self.n[i])
         variance = (sum_sq - (sum_**2) / n) / (n - 1)
         if variance < 0 and variance > -1e-3:  # Avoids negative values caused by numerical errors
             variance = 0
@@ -108,32 +151,186 @@ class ContingencyResults:
             return self.get_cost_variance_per_static_id_no_error(static_id)
 
     def get_average_load_shedding_per_static_id(self, static_id):
-        return self.sum_load_shedding[static_id] / len(self.jobs[static_id])
+        i = self.static_id_indices[static_id]
+        return self.sum_load_shedding[i] / self.n[i]
 
     def get_average_load_shedding(self):
-        average_load_shedding_per_static_id = [self.get_average_load_shedding_per_static_id(static_id) for static_id in self.static_ids]
-        if len(average_load_shedding_per_static_id) > 0:
-            return np.mean(average_load_shedding_per_static_id)
+        if len(self.static_ids) > 0:
+            return np.mean(self.get_average_load_shedding_per_static_id_array())
         else:
             return 0
 
     def get_maximum_load_shedding(self):
-        average_load_shedding_per_static_id = [self.get_average_load_shedding_per_static_id(static_id) for static_id in self.static_ids]
-        if len(average_load_shedding_per_static_id) > 0:
-            return max(average_load_shedding_per_static_id)
+        if len(self.static_ids) > 0:
+            return np.max(self.get_average_load_shedding_per_static_id_array())
         else:
             return 0
 
     def get_average_cost_per_static_id(self, static_id):
-        return self.sum_cost[static_id] / len(self.jobs[static_id])
+        i = self.static_id_indices[static_id]
+        return self.sum_cost[i] / self.n[i]
 
     def get_average_cost(self):
-        average_cost_per_static_id = [self.get_average_cost_per_static_id(static_id) for static_id in self.static_ids]
-        if len(average_cost_per_static_id) > 0:
-            return np.mean(average_cost_per_static_id)
+        if len(self.static_ids) > 0:
+            return np.mean(self.get_average_cost_per_static_id_array())
         else:
             return 0
 
+    def get_average_elapsed_time_per_static_id(self, static_id):
+        i = self.static_id_indices[static_id]
+        return self.elapsed_time[i] / self.n[i]
+
+
+class RuntimePredictor:
+    """
+    Predict the computation time of jobs from the elapsed times stored in ContingencyResults. Jobs of an already
+    simulated (contingency, static_id) pair are expected to take the average time of this pair. Otherwise, a
+    multiplicative model is used: average time of the contingency (or of its base contingency for hidden/generator
+    failures) times the average time of the static_id (over all contingencies) divided by the global average.
+    """
+    def __init__(self, simulation_results: defaultdict[str, ContingencyResults]):
+        self.simulation_results = simulation_results
+        self.nb_jobs_per_contingency = defaultdict(int)
+        self.elapsed_time_per_static_id = defaultdict(float)
+        self.nb_jobs_per_static_id = defaultdict(int)
+        self.total_elapsed_time = 0
+        self.nb_jobs = 0
+
+    def add_job(self, job: Job):
+        self.nb_jobs_per_contingency[job.contingency.id] += 1
+        self.elapsed_time_per_static_id[job.static_id] += job.elapsed_time
+        self.nb_jobs_per_static_id[job.static_id] += 1
+        self.total_elapsed_time += job.elapsed_time
+        self.nb_jobs += 1
+
+    def get_contingency_average(self, contingency_id):
+        if self.nb_jobs_per_contingency.get(contingency_id, 0) == 0:
+            return None
+        return self.simulation_results[contingency_id].total_elapsed_time / self.nb_jobs_per_contingency[contingency_id]
+
+    def predict(self, job: Job) -> float:
+        if self.nb_jobs == 0:
+            return JOB_TIMEOUT_S  # No information, all jobs are equivalent
+        global_average = self.total_elapsed_time / self.nb_jobs
+        contingency_id = job.contingency.id
+        static_id = job.static_id
+
+        if contingency_id in self.simulation_results:  # Membership test, does not create an entry in the defaultdict
+            contingency_results = self.simulation_results[contingency_id]
+            if static_id in contingency_results.static_id_indices:
+                return contingency_results.get_average_elapsed_time_per_static_id(static_id)
+
+        contingency_average = self.get_contingency_average(contingency_id)
+        if contingency_average is None:
+            contingency_average = self.get_contingency_average(job.contingency.base_id)
+        if contingency_average is None:
+            contingency_average = global_average
+
+        if self.nb_jobs_per_static_id.get(static_id, 0) == 0 or global_average == 0:
+            return contingency_average
+        static_id_average = self.elapsed_time_per_static_id[static_id] / self.nb_jobs_per_static_id[static_id]
+        return contingency_average * static_id_average / global_average
+
+    def sort_jobs(self, jobs: list[Job], nb_workers: int):
+        """
+        Sort jobs by decreasing expected computation time (longest processing time first) so that long jobs do not
+        delay the end of the batch, and log the expected makespan of the batch
+        """
+        if len(jobs) == 0:
+            return
+        expected_times = {job.id: self.predict(job) for job in jobs}
+        jobs.sort(key=lambda job: expected_times[job.id], reverse=True)
+
+        worker_loads = [0.0] * max(nb_workers, 1)
+        for job in jobs:  # Greedy list scheduling, i.e. what the master does if predictions are correct
+            heapq.heapreplace(worker_loads, worker_loads[0] + expected_times[job.id])
+        total_time = sum(expected_times.values())
+        lower_bound = max(total_time / len(worker_loads), expected_times[jobs[0].id])
+        logger.logger.info('Batch of {} jobs: expected total time {:.0f}s, longest job {:.0f}s, expected makespan {:.0f}s on {} workers (lower bound {:.0f}s)'.format(
+            len(jobs), total_time, expected_times[jobs[0].id], max(worker_loads), len(worker_loads), lower_bound))
+
+
+class SolverSelector:
+    """
+    Choose the solver with which each job starts (see ADAPTIVE_SOLVER_SELECTION) from the attempts of past jobs. For
+    each solver, the probability of success and the average time of successful and failed attempts are estimated on
+    the (base contingency, static_id) pair of the job if it already had a failed attempt or used the alternative solver
+    (and SOLVER_SELECTION_MIN_PAIR_ATTEMPTS attempts), otherwise on its static_id, base contingency, or all jobs,
+    depending on which has SOLVER_SELECTION_MIN_ATTEMPTS attempts. The job starts with the solver that minimises its
+    expected time, including the retry with the other solver if the first attempt fails, except for one in
+    SOLVER_SELECTION_EXPLORATION_PERIOD jobs that would start with the alternative solver (exploration).
+    """
+    def __init__(self):
+        # Statistics are [nb_attempts, nb_failures, time of successful attempts, time of failed attempts] per solver
+        self.statistics: dict[tuple, list[list[float]]] = {}
+        self.nb_jobs = 0
+        self.nb_first_attempt_failures = 0
+        self.nb_alt_solver_first = 0  # Jobs started with the alternative solver
+        self.nb_explored_jobs = 0  # Jobs started with the default solver although the alternative one was expected to be faster
+        self.expected_avoided_failures = 0
+        self.expected_saved_time = 0
+
+    def get_keys(self, job: Job):
+        return [('pair', job.contingency.base_id, job.static_id), ('static_id', job.static_id), ('contingency', job.contingency.base_id), ('all',)]
+
+    def add_job(self, job: Job):
+        if len(job.solver_attempts) == 0:
+            return  # Skipped, or saved before solver attempts were recorded
+        self.nb_jobs += 1
+        if not job.solver_attempts[0][1]:
+            self.nb_first_attempt_failures += 1
+        keys = self.get_keys(job)
+        if keys[0] not in self.statistics and all([succeeded and solver == DEFAULT_SOLVER for solver, succeeded, _ in job.solver_attempts]):
+            keys = keys[1:]  # Only keep statistics of the pairs that are difficult for the default solver
+        for key in keys:
+            statistics = self.statistics.setdefault(key, [[0, 0, 0, 0], [0, 0, 0, 0]])
+            for solver, succeeded, time in job.solver_attempts:
+                statistics[solver][0] += 1
+                if succeeded:
+                    statistics[solver][2] += time
+                else:
+                    statistics[solver][1] += 1
+                    statistics[solver][3] += time
+
+    def estimate(self, job: Job, solver) -> tuple[float, float, float]:
+        """
+        Return the probability of success, average time of successful attempts and average time of failed attempts of
+        the given solver for the given job, or None if the solver was never tried
+        """
+        for key in self.get_keys(job):
+            if key not in self.statistics:
+                continue
+            nb_attempts, nb_failures, success_time, failure_time = self.statistics[key][solver]
+            min_attempts = SOLVER_SELECTION_MIN_PAIR_ATTEMPTS if key[0] == 'pair' else SOLVER_SELECTION_MIN_ATTEMPTS
+            if nb_attempts == 0 or (nb_attempts < min_attempts and key[0] != 'all'):
+                continue
+            p_success = (nb_attempts - nb_failures + 1) / (nb_attempts + 2)  # Laplace smoothing
+            average_success_time = success_time / (nb_attempts - nb_failures) if nb_attempts > nb_failures else JOB_TIMEOUT_S
+            average_failure_time = failure_time / nb_failures if nb_failures > 0 else JOB_TIMEOUT_S
+            return p_success, average_success_time, average_failure_time
+        return None
+
+    def select_solvers(self, jobs: list[Job]):
+        nb_alt_solver_first = 0
+        for job in jobs:
+            default = self.estimate(job, DEFAULT_SOLVER)
+            alt = self.estimate(job, ALT_SOLVER)
+            if default is None or alt is None:
+                continue
+            default_first_time = default[0] * default[1] + (1 - default[0]) * (default[2] + alt[0] * alt[1] + (1 - alt[0]) * alt[2])
+            alt_first_time = alt[0] * alt[1] + (1 - alt[0]) * (alt[2] + default[0] * default[1] + (1 - default[0]) * default[2])
+            if alt_first_time < default_first_time:
+                if (self.nb_alt_solver_first + nb_alt_solver_first + self.nb_explored_jobs) % SOLVER_SELECTION_EXPLORATION_PERIOD == SOLVER_SELECTION_EXPLORATION_PERIOD - 1:
+                    self.nb_explored_jobs += 1
+                    continue
+                job.first_solver = ALT_SOLVER
+                nb_alt_solver_first += 1
+                self.expected_avoided_failures += (1 - default[0]) - (1 - alt[0])
+                self.expected_saved_time += default_first_time - alt_first_time
+        self.nb_alt_solver_first += nb_alt_solver_first
+        logger.logger.info('Solver selection: {}/{} jobs of the batch start with the alternative solver ({} since the start, expected to avoid {:.0f} first-attempt failures and save {:.0f}s, {} started with the default solver for exploration), {} first-attempt failures in {} completed jobs'.format(
+            nb_alt_solver_first, len(jobs), self.nb_alt_solver_first, self.expected_avoided_failures, self.expected_saved_time, self.nb_explored_jobs, self.nb_first_attempt_failures, self.nb_jobs))
+
 
 class JobQueue:
     # Note that in the current implementation, it is assumed that all contingencies "make sense" for all static samples,
@@ -141,9 +338,10 @@ class JobQueue:
     # configurations). Otherwise, one should first check for each contingency, for which static samples this
     # contingency is possible, and only samples from those + weigth the probability of the contingency accordingly
 
-    def __init__(self, contingencies: list[Contingency]):
+    def __init__(self, contingencies: list[Contingency], nb_workers: int = 1):
         self.contingencies = contingencies
-        self.contingencies_skipped = []
+        self.nb_workers = nb_workers  # Number of ranks running jobs, only used to estimate the makespan of batches
+        self.contingencies_skipped: set[Contingency] = set()
 
         self.static_samples = []
         static_files = natsorted(glob.glob(f'../2-SCOPF/d-Final-dispatch/{CASE}_{NETWORK_NAME}/*.iidm'))  # glob gives files in arbitrary order, sort them to be deterministic
@@ -158,122 +356,156 @@ class JobQueue:
 
         self.simulation_results: defaultdict[str, ContingencyResults] = defaultdict(ContingencyResults)
         self.simulations_launched : dict[str, ContingencyLaunched] = defaultdict(ContingencyLaunched)
+        self.runtime_predictor = RuntimePredictor(self.simulation_results)
+        self.solver_selector = SolverSelector()
+        self.early_termination_statistics = defaultdict(lambda: [0, 0, 0.0])  # Per contingency class: number of jobs run, number of jobs stopped early, estimated saved time
+        self.contingencies_by_id = {contingency.id: contingency for contingency in self.contingencies}
+        self.child_contingency_ids: defaultdict[str, list[str]] = defaultdict(list)  # Contingencies created by hidden failures, indexed by the id of their base contingency
+        # The total risk (and cost) is the sum of the contributions of each base contingency and its children. For each base
+        # contingency, the sum of the sum_mean_load_shedding (resp. sum_mean_cost) of the base contingency and of its
+        # children weighted by HIDDEN_FAILURE_PROBA ** order is kept, so that contributions can be updated in constant time
+        self.weighted_sums: defaultdict[str, list[float]] = defaultdict(lambda: [0, 0])
+        self.risk_contributions: dict[str, tuple[float, float]] = {}
         self._total_risk = 0
         self._total_cost = 0
-        self._total_risk_is_updated = True
 
         # To make the algorithm deterministic (in an MPI context), a seed is given to each set of (contingency, static_id, number of runs for this contingency and static id)
         self.dynamic_seed_counters = defaultdict(lambda: {static_sample: hash(static_sample) for static_sample in self.static_samples})
 
-        self.priority_queue: list[Job]
-        self.priority_queue = []
+        self.priority_queue: deque[Job] = deque()
 
+        # Results of past runs are only read from the journal when needed, contingencies is a copy as child contingencies are added to it
+        self.saved_results_journal = ResultJournal('saved_results.journal', dict(self.contingencies_by_id))
+        # Saved results of older versions, converted to a journal on the first run
         self.saved_results_path = 'saved_results.pickle'
         self.saved_results_backup_path = 'saved_results_bak.pickle'
         self.load_saved_results()
 
     def get_total_risk(self):
-        if not self._total_risk_is_updated:
-            self.update_total_risk()
         return self._total_risk
 
     def get_total_cost(self):
-        if not self._total_risk_is_updated:
-            self.update_total_risk()
         return self._total_cost
 
     def get_saved_job(self, job: Job) -> Job:
         """
-        Return job results if they exist in self.job_queue.saved_results, otherwise return None
+        Return job results if they exist in the saved results and the job was completed, otherwise return None
         """
-        if job.contingency.id in self.saved_results:
-            if job.static_id in self.saved_results[job.contingency.id]:
-                if job.dynamic_seed in self.saved_results[job.contingency.id][job.static_id]:
-                    if self.saved_results[job.contingency.id][job.static_id][job.dynamic_seed].completed:
-                        return self.saved_results[job.contingency.id][job.static_id][job.dynamic_seed]
-        return None
+        return self.saved_results_journal.get_job(job.contingency.id, job.static_id, job.dynamic_seed, completed_only=True)
 
     def load_saved_results(self):
         """
-        Load results of past runs from the saved_results.pickle file to self.saved_results
+        Open the saved_results.journal file containing the results of past runs (saved results are then read when needed)
         If REUSE_RESULTS_FAST_FORWARD, those results are directly included in the results of the analysis,
-        otherwise, they are only included if the master requests to perform a job that exists in saved_results
-        """
-        self.saved_results: dict[str, dict[int, dict[int, Job]]]
-        if os.path.exists(self.saved_results_path):
-            with open(self.saved_results_path, 'rb') as file:
-                try:
-                    self.saved_results = pickle.load(file)
-                except pickle.UnpicklingError:
-                    with open(self.saved_results_backup_path, 'rb') as backup_file:
-                        self.saved_results = pickle.load(backup_file)
-        else:
-            self.saved_results = {}
+        otherwise, they are only included if the master requests to perform a job that exists in the saved results
+        """
+        t0 = time.time()
+        if not self.saved_results_journal.exists() and os.path.exists(self.saved_results_path):
+            self.convert_saved_results_pickle()
+        logger.logger.info('Indexed {} saved results in {}s'.format(self.saved_results_journal.get_nb_jobs(), time.time() - t0))
 
         if REUSE_RESULTS_FAST_FORWARD:
             self.fast_forward_load_job_results()
             self.write_analysis_output()
 
+    def convert_saved_results_pickle(self):
+        """
+        Convert the saved_results.pickle file of older versions to a result journal (the pickle file is not deleted)
+        """
+        logger.logger.info('Converting {} to {}'.format(self.saved_results_path, self.saved_results_journal.path))
+        with open(self.saved_results_path, 'rb') as file:
+            try:
+                saved_results = pickle.load(file)
+            except pickle.UnpicklingError:
+                with open(self.saved_results_backup_path, 'rb') as backup_file:
+                    saved_results = pickle.load(backup_file)
+        for jobs_per_static_id in saved_results.values():
+            for jobs in jobs_per_static_id.values():
+                for job in jobs.values():
+                    # Attributes added to jobs since the pickle file was written
+                    job.first_solver = getattr(job, 'first_solver', DEFAULT_SOLVER)
+                    job.solver_attempts = getattr(job, 'solver_attempts', [])
+                    job.early_termination = getattr(job, 'early_termination', None)
+                    job.early_termination_saved_time = getattr(job, 'early_termination_saved_time', 0)
+                    self.saved_results_journal.append(job)
+        self.saved_results_journal.flush()
+
     def write_saved_results(self):
+        """
+        Write the results completed since the last call to the journal, and compact the journal if it contains many
+        results that were overwritten (jobs that were run again)
+        """
         t0 = time.time()
-        # Pickle to a temp file to guarantee one correct version always exists if the program is interrupted
-        with open(self.saved_results_backup_path, 'wb') as file:
-            pickle.dump(self.saved_results, file, protocol=pickle.HIGHEST_PROTOCOL)
-        shutil.copyfile(self.saved_results_backup_path, self.saved_results_path)
+        self.saved_results_journal.flush()
+        nb_saved_jobs = self.saved_results_journal.get_nb_jobs()
+        if self.saved_results_journal.nb_records > JOURNAL_COMPACTION_RATIO * nb_saved_jobs:
+            logger.logger.info('Compacting result journal ({} records for {} jobs)'.format(self.saved_results_journal.nb_records, nb_saved_jobs))
+            self.saved_results_journal.compact()
         delta_t = time.time() - t0
         logger.logger.info('Write saved results completed in {}s'.format(delta_t))
 
     def fast_forward_load_job_results(self):
         for contingency in self.contingencies:  # Only fast-forward base contingencies, not hidden-failures (otherwise can generate duplicate + allows to change MAX_TOTAL_HIDDEN_FAILURES and other similar parameters)
-            if contingency.id in self.saved_results:
+            saved_jobs = self.saved_results_journal.get_jobs(contingency.id)
+            if len(saved_jobs) > 0:
                 logger.logger.info('Fast forward load of contingency {}'.format(contingency.id))
-                for static_id in self.saved_results[contingency.id].values():
-                    for saved_job in static_id.values():
-                        self.simulations_launched[saved_job.contingency.id].add_job(saved_job)  # Emulate an actual job launch
-                        self.store_completed_job(saved_job, exists=True)
+                for saved_job in saved_jobs:
+                    self.simulations_launched[saved_job.contingency.id].add_job(saved_job)  # Emulate an actual job launch
+                    self.store_completed_job(saved_job, exists=True)
 
     def add_job_to_priority_queue(self, job: Job):
         self.priority_queue.append(job)
         self.simulations_launched[job.contingency.id].add_job(job)
 
 
-    def update_total_risk(self):
-        self._total_risk = 0
-        self._total_cost = 0
-
-        for contingency in self.contingencies:
-            self._total_risk += contingency.frequency * self.simulation_results[contingency.id].get_average_load_shedding()
-            self._total_cost += contingency.frequency * self.simulation_results[contingency.id].get_average_cost()
-
-            # Compute additional risk from hidden failures activated by this contingency
-            base_contingency = contingency
-            for sub_contingency_id in self.simulation_results:
-                if '~' not in sub_contingency_id:
-                    continue  # Normal contingency (not generated by hidden failure)
-
-                base_contingency_id = sub_contingency_id.split('~')[0]
-                if base_contingency_id != base_contingency.id:
-                    continue  # Child contingency (hidden failure) from another parent contingency
-
-                total_cases_base = len(self.simulation_results[base_contingency.id].static_ids)
-                total_cases = len(self.simulation_results[sub_contingency_id].static_ids)
-                conditional_probability = total_cases / total_cases_base if total_cases_base > 0 else 0
-                frequency = base_contingency.frequency * HIDDEN_FAILURE_PROBA ** (len(sub_contingency_id.split('~')) - 1) * conditional_probability
-
-                self._total_risk += frequency * self.simulation_results[sub_contingency_id].get_average_load_shedding()
-                self._total_cost += frequency * self.simulation_results[sub_contingency_id].get_average_cost()
-
-        self._total_risk_is_updated = True
+    def update_total_risk(self, contingency_id, delta_load_shedding, delta_cost):
+        """
+        Update the total risk after the sum_mean_load_shedding (resp. sum_mean_cost) of the given contingency changed
+        by delta_load_shedding (resp. delta_cost). The risk of a base contingency is frequency * average load shedding,
+        and the risk of a child contingency is frequency * HIDDEN_FAILURE_PROBA ** order * conditional probability *
+        average load shedding, with conditional probability = number of static ids of the child / number of static ids
+        of the base contingency. The contribution of a base contingency and its children is thus frequency / number of
+        static ids of the base contingency * weighted sum of the sum_mean_load_shedding
+        """
+        base_contingency_id = contingency_id.split('~')[0]
+        if base_contingency_id not in self.contingencies_by_id:
+            return  # Not one of the considered contingencies
+        order = len(contingency_id.split('~')) - 1
+        weighted_sums = self.weighted_sums[base_contingency_id]
+        weighted_sums[0] += HIDDEN_FAILURE_PROBA ** order * delta_load_shedding
+        weighted_sums[1] += HIDDEN_FAILURE_PROBA ** order * delta_cost
+
+        nb_static_ids = len(self.simulation_results[base_contingency_id].static_ids)
+        if nb_static_ids > 0:
+            frequency = self.contingencies_by_id[base_contingency_id].frequency
+            risk, cost = frequency * weighted_sums[0] / nb_static_ids, frequency * weighted_sums[1] / nb_static_ids
+        else:
+            risk, cost = 0, 0
+        old_risk, old_cost = self.risk_contributions.get(base_contingency_id, (0, 0))
+        self._total_risk += risk - old_risk
+        self._total_cost += cost - old_cost
+        self.risk_contributions[base_contingency_id] = (risk, cost)
 
 
     def store_completed_job(self, job: Job, exists=False):
-        self._total_risk_is_updated = False  # Marks the fact that the total risk should be recomputed now that additional results are available
         if not exists:
-            self.saved_results.setdefault(job.contingency.id, {})
-            self.saved_results[job.contingency.id].setdefault(job.static_id, {})
-            self.saved_results[job.contingency.id][job.static_id][job.dynamic_seed] = job
-
-        self.simulation_results[job.contingency.id].add_job(job)
+            self.saved_results_journal.append(job)
+            if EARLY_TERMINATION and len(job.solver_attempts) > 0:
+                statistics = self.early_termination_statistics[get_contingency_class(job.contingency)]
+                statistics[0] += 1
+                if job.early_termination is not None:
+                    statistics[1] += 1
+                    statistics[2] += job.early_termination_saved_time
+
+        contingency_id = job.contingency.id
+        if '~' in contingency_id and contingency_id not in self.simulation_results:
+            self.child_contingency_ids[contingency_id.split('~')[0]].append(contingency_id)
+        contingency_results = self.simulation_results[contingency_id]
+        sum_mean_load_shedding, sum_mean_cost = contingency_results.sum_mean_load_shedding, contingency_results.sum_mean_cost
+        contingency_results.add_job(job)
+        self.update_total_risk(contingency_id, contingency_results.sum_mean_load_shedding - sum_mean_load_shedding, contingency_results.sum_mean_cost - sum_mean_cost)
+        self.runtime_predictor.add_job(job)
+        self.solver_selector.add_job(job)
 
         if isinstance(job, SpecialJob):
             if job.variable_order or job.missing_events:
@@ -285,9 +517,8 @@ class JobQueue:
                         dynamic_seed = self.dynamic_seed_counters[job.contingency.id][job.static_id]
                         self.dynamic_seed_counters[job.contingency.id][job.static_id] += 1
 
-                        saved_job = self.saved_results.get(job.contingency.id, {}).get(job.static_id, {}).get(dynamic_seed, None)
+                        saved_job = self.saved_results_journal.get_job(job.contingency.id, job.static_id, dynamic_seed)
                         if saved_job is not None:
-                            saved_job = self.saved_results[job.contingency.id][job.static_id][dynamic_seed]
                             self.store_completed_job(saved_job, exists=True)
                         else:
                             self.add_job_to_priority_queue(Job(job.static_id, dynamic_seed, job.contingency))
@@ -320,10 +551,15 @@ class JobQueue:
                     self.launch_hidden_failure_job(job, new_job)
 
 
+    def log_early_termination_statistics(self):
+        for contingency_class, (nb_jobs, nb_stopped, saved_time) in sorted(self.early_termination_statistics.items()):
+            logger.logger.info('Early termination ({}): {}/{} jobs stopped early, {:.2f} CPU-hours saved (estimated)'.format(contingency_class, nb_stopped, nb_jobs, saved_time / 3600))
+
+
     def launch_hidden_failure_job(self, parent_job: Job, hidden_failure_job: Job):
         # Search in launched simulations if same job does not already exists (e.g. job created with hidden failure A then B, vs. B then A are equivalent)
         job_already_exists = False
-        if hidden_failure_job.static_id in self.simulations_launched[hidden_failure_job.contingency.id].static_ids:
+        if hidden_failure_job.static_id in self.simulations_launched[hidden_failure_job.contingency.id].dynamic_seeds:
             if hidden_failure_job.dynamic_seed in self.simulations_launched[hidden_failure_job.contingency.id].dynamic_seeds[hidden_failure_job.static_id]:
                 job_already_exists = True
 
@@ -333,7 +569,7 @@ class JobQueue:
             pass  # Only allow special jobs to create jobs with additional hidden failures (avoid duplicates and remaining cases are a bit too specific (hidden failure activated only when the path of the cascade is affected by small protection uncertainties))
         else:
             if REUSE_RESULTS_FAST_FORWARD:
-                saved_job = self.saved_results.get(hidden_failure_job.contingency.id, {}).get(hidden_failure_job.static_id, {}).get(hidden_failure_job.dynamic_seed, None)
+                saved_job = self.saved_results_journal.get_job(hidden_failure_job.contingency.id, hidden_failure_job.static_id, hidden_failure_job.dynamic_seed)
                 if saved_job is not None:
                     self.simulations_launched[saved_job.contingency.id].add_job(saved_job)  # Emulate an actual job launch
                     self.store_completed_job(saved_job, exists=True)
@@ -350,12 +586,23 @@ class JobQueue:
 
 
     def get_next_jobs(self, init: bool) -> tuple[list[Job], bool]:
+        """
+        Return the next batch of jobs, sorted by decreasing expected computation time, and whether the master should
+        wait for more results before asking for new jobs
+        """
+        jobs, wait_for_data = self.create_next_jobs(init)
+        self.runtime_predictor.sort_jobs(jobs, self.nb_workers)
+        if ADAPTIVE_SOLVER_SELECTION:
+            self.solver_selector.select_solvers(jobs)
+        return jobs, wait_for_data
+
+    def create_next_jobs(self, init: bool) -> tuple[list[Job], bool]:
         t0 = time.time()
         jobs = []
         nb_priority_jobs = len(self.priority_queue)
         logger.logger.info(("{} jobs in priority queue".format(nb_priority_jobs)))
         while len(jobs) < NB_RUNS_PER_INDICATOR_EVALUATION and len(self.priority_queue) > 0:
-            jobs.append(self.priority_queue.pop(0))
+            jobs.append(self.priority_queue.popleft())
 
         if len(jobs) == NB_RUNS_PER_INDICATOR_EVALUATION:
             logger.logger.info(("##############################################"))
@@ -381,7 +628,7 @@ class JobQueue:
                         job = self.create_job(contingency, static_sample)
 
                     if REUSE_RESULTS_FAST_FORWARD:
-                        if job.static_id in self.simulations_launched[contingency.id].static_ids:
+                        if job.static_id in self.simulations_launched[contingency.id].dynamic_seeds:
                             if job.dynamic_seed in self.simulations_launched[contingency.id].dynamic_seeds[job.static_id]:
                                 continue  # Init job already included in saved results, so don't relaunch it
 
@@ -398,6 +645,7 @@ class JobQueue:
             # Run simulations until requested statistical accuracy is reached
             contingencies_to_run = []
             contingencies_waiting = []  # Wait for the NB_MIN_RUNS of each contingency to be done before evaluating statistical indicators
+            contingencies_initialised = []
             logger.logger.info("##############################################")
             logger.logger.info("# Contingency convergence")
             logger.logger.info("##############################################")
@@ -425,7 +673,13 @@ class JobQueue:
 
                 if not init_completed:
                     continue
-                if self.is_statistical_accuracy_reached(contingency):
+                contingencies_initialised.append(contingency)
+
+            # Evaluate the statistical indicators of all initialised contingencies at once
+            all_indicators = self.get_statistical_indicators_all(contingencies_initialised)
+            indicators_per_contingency = {contingency.id: indicators for contingency, indicators in zip(contingencies_initialised, all_indicators)}
+            for contingency in contingencies_initialised:
+                if self.is_statistical_accuracy_reached(contingency, indicators_per_contingency[contingency.id]):
                     continue
 
                 contingencies_to_run.append(contingency)
@@ -464,7 +718,7 @@ class JobQueue:
                 # not converged yet, to avoid unecessary simulations (e.g. avoid running simulations that are barely above
                 # the convergence threshold, as the threshold might decrease if the total risk estimation decreases), and
                 # to increase the speed at which the estimate of the total risk decreases.
-                distances_from_statistical_accuracy = self.get_distances_from_statistical_accuracy(contingency)
+                distances_from_statistical_accuracy = self.get_distances_from_statistical_accuracy(contingency, indicators_per_contingency[contingency.id])
                 # Only consider the statistical indicator that is the furthest from being satisfied
                 limiting_indicator = np.argmax(distances_from_statistical_accuracy)
                 weigth = max(distances_from_statistical_accuracy)
@@ -489,7 +743,7 @@ class JobQueue:
                 weigth = global_derivative / cost_per_new_static_id
 
                 run_static_ids = contingency_results.static_ids
-                cost_per_new_dynamic_id = [contingency_results.elapsed_time[static_id] / len(contingency_results.jobs[static_id]) for static_id in run_static_ids]
+                cost_per_new_dynamic_id = [contingency_results.get_average_elapsed_time_per_static_id(static_id) for static_id in run_static_ids]
                 weigth_per_static_id = list(np.array(derivative_per_static_id) / np.array(cost_per_new_dynamic_id)
 
                 allocations = JobQueue.allocation([weigth] + weigth_per_static_id, nb_runs)
@@ -502,7 +756,7 @@ class JobQueue:
                 for i in range(1, static_allocation + 1):
                     if nb_static_ids + i >= len(self.static_samples):
                         logger.logger.critical("Contingency {} running out of static samples, skipping".format(contingency.id))
-                        self.contingencies_skipped.append(contingency)
+                        self.contingencies_skipped.add(contingency)
                         break
 
                     static_sample = self.static_samples_per_contingency[contingency.id][nb_static_ids + i]
@@ -535,14 +789,8 @@ class JobQueue:
         cost_per_contingency = {}
         for contingency in self.contingencies:
             cost_per_contingency[contingency] = contingency.frequency * self.simulation_results[contingency.id].get_average_load_shedding()
-        worst_contingency_ids = [key for key, _ in sorted(cost_per_contingency.items(), key = lambda item:item[1], reverse=True)]
         worst_contingencies: list[Contingency]
-        worst_contingencies = []
-        for worst_contingency_id in worst_contingency_ids:
-            for contingency in self.contingencies:
-                if contingency.id == worst_contingency_id:
-                    worst_contingencies.append(contingency)
-                    break
+        worst_contingencies = [key for key, _ in sorted(cost_per_contingency.items(), key = lambda item:item[1], reverse=True)]
 
         for critical_contingency in worst_contingencies[:10]:
             nb_static_ids_launched = len(self.simulations_launched[critical_contingency.id].static_ids)
@@ -564,6 +812,7 @@ class JobQueue:
                     job = self.create_job(critical_contingency, static_sample)
                 self.simulations_launched[critical_contingency.id].add_job(job)
                 jobs.append(job)
+        self.runtime_predictor.sort_jobs(jobs, self.nb_workers)
         return jobs
 
 
@@ -581,17 +830,17 @@ class JobQueue:
             total_computation_time += contingency_results.total_elapsed_time
         root.set('total_computation_time', str(total_computation_time))
 
-        for contingency in self.contingencies:
+        all_indicators = self.get_statistical_indicators_all(self.contingencies)
+        for contingency, indicators in zip(self.contingencies, all_indicators):
             contingency_results = self.simulation_results[contingency.id]
             mean = contingency_results.get_average_load_shedding()
             max_shedding = contingency_results.get_maximum_load_shedding()
             mean_cost = contingency_results.get_average_cost()
-            N = sum([len(contingency_results.jobs[static_id]) for static_id in contingency_results.static_ids])
+            N = int(np.sum(contingency_results.n[:len(contingency_results.static_ids)]))
             N_static = len(contingency_results.static_ids)
-            indicators = self.get_statistical_indicators(contingency)
             total_cases = len(contingency_results.static_ids)
-            cases_unsecure = sum([1 if any(len([event for event in job.results.trip_timeline if "RTPV" not in event.model]) > 0 for job in contingency_results.jobs[static_id]) else 0 for static_id in contingency_results.static_ids])
-            cases_with_cost = sum([1 if contingency_results.get_average_cost_per_static_id(static_id) > 0 else 0 for static_id in contingency_results.static_ids])
+            cases_unsecure = sum([1 if any(job.results.has_non_rtpv_trips for job in contingency_results.jobs[static_id]) else 0 for static_id in contingency_results.static_ids])
+            cases_with_cost = np.count_nonzero(contingency_results.get_average_cost_per_static_id_array() > 0)
             contingency_attrib = {'id': contingency.id,
                                   'frequency': '{:.6g}'.format(contingency.frequency),
                                   'mean_load_shed': '{:.4g}'.format(mean),
@@ -615,24 +864,17 @@ class JobQueue:
             risk_hidden = 0
             cost_hidden = 0
             base_contingency = contingency
-            for sub_contingency_id in self.simulation_results:
-                if '~' not in sub_contingency_id:
-                    continue  # Normal contingency (not generated by hidden failure)
-
-                base_contingency_id = sub_contingency_id.split('~')[0]
-                if base_contingency_id != contingency.id:
-                    continue  # Child contingency (hidden failure) from another parent contingency
-
+            for sub_contingency_id in self.child_contingency_ids[contingency.id]:
                 contingency_results = self.simulation_results[sub_contingency_id]
                 mean = contingency_results.get_average_load_shedding()
                 max_shedding = contingency_results.get_maximum_load_shedding()
                 mean_cost = contingency_results.get_average_cost()
-                N = sum([len(contingency_results.jobs[static_id]) for static_id in contingency_results.static_ids])
+                N = int(np.sum(contingency_results.n[:len(contingency_results.static_ids)]))
                 N_static = len(contingency_results.static_ids)
                 total_cases_parent = len(self.simulation_results[base_contingency.id].static_ids)
                 total_cases = len(contingency_results.static_ids)
-                cases_unsecure = sum([1 if any(len([event for event in job.results.trip_timeline if "RTPV" not in event.model]) > 0 for job in contingency_results.jobs[static_id]) else 0 for static_id in contingency_results.static_ids])
-                cases_with_cost = sum([1 if contingency_results.get_average_cost_per_static_id(static_id) > 0 else 0 for static_id in contingency_results.static_ids])
+                cases_unsecure = sum([1 if any(job.results.has_non_rtpv_trips for job in contingency_results.jobs[static_id]) else 0 for static_id in contingency_results.static_ids])
+                cases_with_cost = np.count_nonzero(contingency_results.get_average_cost_per_static_id_array() > 0)
                 frequency = base_contingency.frequency * HIDDEN_FAILURE_PROBA ** (len(sub_contingency_id.split('~')) - 1) * (total_cases / total_cases_parent)
                 risk_hidden += frequency * mean
                 cost_hidden += frequency * mean_cost
@@ -707,15 +949,10 @@ class JobQueue:
                 static_id_attrib['missing_events'] = str(special_job.missing_events)
 
             job = contingency_results.jobs[static_id][0]
-            tripped_models = job.results.get_sanitised_tripped_models()
 
             # Write first 3 elements to trip
-            index = 0
-            for tripped_model in tripped_models:
+            for index, tripped_model in enumerate(job.results.first_tripped_models):
                 static_id_attrib['trip_{}'.format(index)] = tripped_model
-                index += 1
-                if index >= 3:
-                    break
 
             static_id_element = etree.SubElement(contingency_element, 'StaticId', static_id_attrib)
 
@@ -743,13 +980,8 @@ class JobQueue:
                             max_power_loss_over_reserve = job.power_loss_over_reserve
 
                 # Write first 3 elements to trip
-                tripped_models = job.results.get_sanitised_tripped_models()
-                index = 0
-                for tripped_model in tripped_models:
+                for index, tripped_model in enumerate(job.results.first_tripped_models):
                     job_attrib['trip_{}'.format(index)] = tripped_model
-                    index += 1
-                    if index >= 3:
-                        break
                 etree.SubElement(static_id_element, 'Job', job_attrib)
 
             if WITH_SCREENING:
@@ -762,8 +994,12 @@ class JobQueue:
                 static_id_element.set('dP_over_reserves', '{:.4g}'.format(max_power_loss_over_reserve))
 
 
-    def is_statistical_accuracy_reached(self, contingency: Contingency) -> bool:
-        indicators = self.get_statistical_indicators(contingency)
+    def is_statistical_accuracy_reached(self, contingency: Contingency, indicators=None) -> bool:
+        """
+        indicators are the statistical indicators of the contingency, computed if not given
+        """
+        if indicators is None:
+            indicators = self.get_statistical_indicators(contingency)
 
         accuracy_reached = True
         for i, indicator in enumerate(indicators):
@@ -782,45 +1018,58 @@ class JobQueue:
 
 
     def get_statistical_indicators(self, contingency: Contingency):
-        contingency_results = self.simulation_results[contingency.id]
-        static_ids = contingency_results.static_ids.copy()
+        return tuple(self.get_statistical_indicators_all([contingency])[0])
 
-        if DOUBLE_MC_LOOP:
-            for static_id in static_ids.copy():
-                special_job = contingency_results.jobs[static_id][0]
-                if (special_job.variable_order or special_job.missing_events) and len(contingency_results.jobs[static_id]) < MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED:
-                    static_ids.remove(static_id)  # A static id is considered to be not yet run if if does not yet have MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED already finished (avoids div by 0)
-
-        N = len(static_ids)
+    def get_statistical_indicators_all(self, contingencies: list[Contingency]) -> np.ndarray:
+        """
+        Return the statistical indicators 1 to 3 (columns) of all given contingencies (rows), computed in a single
+        vectorised pass over the average cost per static id of all contingencies
+        """
+        nb_contingencies = len(contingencies)
+        mean_per_static_id = []
+        for contingency in contingencies:
+            contingency_results = self.simulation_results[contingency.id]
+            # A static id is considered to be not yet run if if does not yet have MIN_NUMBER_DYNAMIC_RUNS_PER_STATIC_SEED already finished (avoids div by 0)
+            mean_per_static_id.append(contingency_results.get_average_cost_per_static_id_array()[contingency_results.get_completed_static_ids_mask()])
+        N = np.array([len(means) for means in mean_per_static_id], dtype=int)
+        contingency_indices = np.repeat(np.arange(nb_contingencies), N)
+        if nb_contingencies > 0:
+            mean_per_static_id = np.concatenate(mean_per_static_id)
+        else:
+            mean_per_static_id = np.zeros(0)
 
-        mean_per_static_id = np.array([contingency_results.get_average_cost_per_static_id(static_id) for static_id in static_ids])
-        mean = np.mean(mean_per_static_id)
-        std_dev = sqrt(np.var(mean_per_static_id))  # TODO: add sqrt(N/(N-1)) factor and handle div by 0 in this case
+        with np.errstate(invalid='ignore', divide='ignore'):  # Contingencies without results have nan indicators (mean of empty arrays)
+            mean = np.bincount(contingency_indices, weights=mean_per_static_id, minlength=nb_contingencies) / N
+            deviations = mean_per_static_id - mean[contingency_indices]
+            std_dev = np.sqrt(np.bincount(contingency_indices, weights=deviations**2, minlength=nb_contingencies) / N)  # TODO: add sqrt(N/(N-1)) factor and handle div by 0 in this case
         # TODO: account for hidden failures
 
-        if N == 0:
-            N += 1
-            logger.logger.warn('Division by 0')
+        nb_empty_contingencies = np.count_nonzero(N == 0)
+        if nb_empty_contingencies > 0:
+            logger.logger.warning('Division by 0: {} contingencies without completed static ids (e.g. {})'.format(nb_empty_contingencies, contingencies[np.argmax(N == 0)].id))
+        N = np.maximum(N, 1)
+        frequency = np.array([contingency.frequency for contingency in contingencies])
 
         # SE from sample variance
-        indicator_1 = contingency.frequency * sqrt(std_dev**2 / N)
+        indicator_1 = frequency * np.sqrt(std_dev**2 / N)
 
         # SE of risk from unobserved samples with 99% confidence
-        max_consequences = MAX_CONSEQUENCES
-        if contingency.order < 2 and 'DELAYED' not in contingency.id:
-            max_consequences /= 10  # Be less conservative for simple N-1 contingencies to avoid wasting computation time
+        max_consequences = np.array([MAX_CONSEQUENCES / 10 if contingency.order < 2 and 'DELAYED' not in contingency.id else MAX_CONSEQUENCES
+                                     for contingency in contingencies])  # Be less conservative for simple N-1 contingencies to avoid wasting computation time
         p = 1 - 0.01**(1/N)
-        b = max((max_consequences-mean)**2, (mean-0)**2)
-        indicator_2 = contingency.frequency * sqrt(p*b/N)
+        b = np.maximum((max_consequences - mean)**2, (mean - 0)**2)
+        indicator_2 = frequency * np.sqrt(p*b/N)
 
         # Total SE
-        indicator_3 = sqrt(indicator_1**2 + indicator_2**2)
+        indicator_3 = np.sqrt(indicator_1**2 + indicator_2**2)
 
-        return indicator_1, indicator_2, indicator_3
+        return np.column_stack([indicator_1, indicator_2, indicator_3])
 
-    def get_distances_from_statistical_accuracy(self, contingency: Contingency):
+    def get_distances_from_statistical_accuracy(self, contingency: Contingency, indicators=None):
+        if indicators is None:
+            indicators = self.get_statistical_indicators(contingency)
         total_cost = self.get_total_cost()
-        return [indicator - 0.01 * total_cost for indicator in self.get_statistical_indicators(contingency)]
+        return [indicator - 0.01 * total_cost for indicator in indicators]
 
 
     def get_statistical_indicator_derivatives(self, contingency: Contingency):
@@ -891,6 +1140,21 @@ class JobQueue:
         return list(allocations)
 
 
+def get_contingency_class(contingency: Contingency) -> str:
+    """
+    Class of a contingency for statistics: order of the base contingency, normal or delayed clearing, with or without hidden failures
+    """
+    if contingency.id == 'Base':
+        return 'Base'
+    base_order = contingency.order - len(contingency.protection_hidden_failures) - len(contingency.generator_failures)
+    contingency_class = 'N-{}'.format(base_order)
+    if 'DELAYED' in contingency.base_id:
+        contingency_class += ' delayed'
+    if contingency.id != contingency.base_id:
+        contingency_class += ' with hidden failures'
+    return contingency_class
+
+
 def hash(string):
     """
     Deterministic hashing function, implementation does not really matter
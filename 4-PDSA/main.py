@@ -1,7 +1,9 @@
 from common import *
 from mpi4py import MPI
+from contingencies import Contingency
 from master import Master
 from slave import Slave
+from sub_master import SubMaster, get_hierarchical_topology
 import logger
 import signal
 import os
@@ -25,13 +27,31 @@ def main():
         signal.signal(signal.SIGUSR1, terminate)
         signal.signal(signal.SIGUSR2, terminate)
 
-    if rank == 0:
-        Master(slaves=range(1, size))
+    # The contingency list is created once (reads the network data) and sent to the other ranks
+    contingency_list = MPI.COMM_WORLD.bcast(Contingency.create_contingency_list() if rank == 0 else None, root=0)
+
+    if HIERARCHICAL_MASTER:
+        run_hierarchical(rank, contingency_list)
+    elif rank == 0:
+        Master(slaves=range(1, size), contingency_list=contingency_list)
     else:
-        Slave()
+        Slave(contingency_list)
 
     logger.logger.debug('Task completed (rank %d)' % (rank))
 
+def run_hierarchical(rank, contingency_list: list[Contingency]):
+    node_comm, master_slaves, sub_masters, sub_master, local_slaves = get_hierarchical_topology()
+    if rank == 0:
+        logger.logger.info('Hierarchical master with {} sub-masters and {} slaves without sub-master'.format(len(sub_masters), len(master_slaves) - len(sub_masters)))
+        nb_workers = MPI.COMM_WORLD.Get_size() - 1 - len(sub_masters)
+        Master(slaves=master_slaves, contingency_list=contingency_list, hierarchical=True, nb_workers=nb_workers)
+    elif rank in sub_masters:
+        SubMaster(node_comm, slaves=local_slaves)
+    elif sub_master is None:
+        Slave(contingency_list)  # Alone on its node (or with the master only), directly attached to the master
+    else:
+        Slave(contingency_list, comm=node_comm, master=sub_master)
+
 def terminate(*args):
     raise KeyboardInterrupt
 
@@ -2,80 +2,73 @@ from __future__ import annotations
 from mpi4py import MPI
 from common import *
 from contingencies import Contingency
+from job import Job
 from job_queue import JobQueue
+import job_messages
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 
 import os
+import time
 import logger
 # from pympler import asizeof
 
 class Master:
-    def __init__(self, slaves: list[int]):
+    def __init__(self, slaves: list[int], job_queue: JobQueue = None, hierarchical=False, contingency_list: list[Contingency] = None, nb_workers: int = None):
+        """
+        slaves are the ranks of the slaves, or of the sub-masters if hierarchical (see HIERARCHICAL_MASTER). The job
+        queue is created from contingency_list if not given (contingency list created here if neither is given).
+        nb_workers is the number of ranks that run jobs (all ranks but the master by default, sub-masters do not run jobs)
+        """
         if len(slaves) == 0:
             raise ValueError('Need at least one slave')
 
         self.comm = MPI.COMM_WORLD
         self.slaves = set(slaves)
-        self.slaves_state = {slave: 'Waiting' for slave in self.slaves}
-        self.contingency_list = Master.create_contingency_list()
-        self.job_queue = JobQueue(self.contingency_list)
-        self.run()
+        if job_queue is None:
+            if contingency_list is None:
+                contingency_list = Contingency.create_contingency_list()
+            if nb_workers is None:
+                nb_workers = self.comm.Get_size() - 1
+            job_queue = JobQueue(contingency_list, nb_workers=nb_workers)
+        self.job_queue = job_queue
+        self.contingency_list = self.job_queue.contingencies
 
-    @staticmethod
-    def create_contingency_list() -> list[Contingency]:
-        base_contingency = Contingency.create_base_contingency()
-        if WITH_HIDDEN_FAILURES or not NEGLECT_NORMAL_FAULT_RISK:
-            N_1_contingencies = Contingency.create_N_1_contingencies(with_normal_clearing=True)
-        else:
-            N_1_contingencies = Contingency.create_N_1_contingencies(with_normal_clearing=False)
-        N_2_contingencies = Contingency.create_N_2_contingencies()
+        # Dispatch state, only accessed by the main thread
+        self.jobs_to_run = PendingJobs()
+        self.slave_credits = {slave: 0 for slave in self.slaves}  # Maximum number of jobs that a slave (or sub-master) can hold (sent with its READY message)
+        self.outstanding_jobs = {slave: 0 for slave in self.slaves}  # Number of jobs sent to a slave that are not completed yet
+        # Slaves that can receive a job, indexed by their number of outstanding jobs (dicts are used as ordered sets)
+        self.available_slaves: list[dict[int, None]] = [{}]
+        self.send_requests: list[tuple[MPI.Request, bytearray]] = []  # Send buffers must be kept alive until the send completes
+        self.jobs_in_flight: dict[int, Job] = {}  # Jobs sent to slaves, indexed by their ticket (Job.id)
+        self.completed_jobs: list[Job] = []  # Jobs returned by slaves that are not yet stored in the job queue
+        self.receive_requests: list[MPI.Request] = []
+        self.request_owners: list[tuple[int, MPI_TAGS]] = []
+        self.receive_buffers: list[bytearray] = []
+        # Static samples of the last jobs sent to each slave (most recent last), used to send jobs to slaves that have the sample in cache (see AFFINITY_DISPATCH)
+        # Not tracked for sub-masters, as the master does not know which of their slaves runs each job
+        self.track_static_ids = not hierarchical
+        self.recent_static_ids = {slave: OrderedDict() for slave in self.slaves}
+        self.affinity_window = AFFINITY_WINDOW_PER_SLAVE * len(self.slaves)
+        self.nb_dispatched_jobs = 0
+        self.nb_affine_jobs = 0  # Jobs sent to a slave that recently ran a job on the same static sample
 
-        contingency_list = base_contingency + N_1_contingencies + N_2_contingencies
-        logger.logger.info('Considering {} contingencies: {} base, {} N-1, {} N-2'.format(len(contingency_list), len(base_contingency), len(N_1_contingencies), len(N_2_contingencies)))
-        return contingency_list
+        # While a background task is running, the job queue is only accessed by the background thread. This allows
+        # slaves to be served while statistical indicators are updated and results are written to disk
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.background_task: Future = None
+        self.run()
 
     def run(self):
-        init = True
-        jobs_to_run, _ = self.job_queue.get_next_jobs(init=True)
-        logger.logger.info(f"Launching first {len(jobs_to_run)} simulations for initialisation")
-        n_iter = 0
+        self.post_receives()
+        jobs, _ = self.job_queue.get_next_jobs(init=True)
+        self.jobs_to_run.extend(self.filter_saved_jobs(jobs))
+        logger.logger.info(f"Launching first {len(self.jobs_to_run)} simulations for initialisation")
         try:
-            while True:
-                if len(jobs_to_run) == 0:  # No more jobs in queue, so repopulate it with get_next_jobs()
-                    if init:
-                        logger.logger.info('Launched all NB_MIN_RUNS jobs')
-                        init = False
-                    n_iter += 1
-                    jobs_to_run, wait_for_data = self.job_queue.get_next_jobs(init=False)
-                    logger.logger.info("")
-                    logger.logger.info(f"Launching batch {n_iter} of simulations (with {len(jobs_to_run)} jobs)")
-
-                    while wait_for_data:
-                        self.comm.probe(source=MPI.ANY_SOURCE, tag=MPI_TAGS.DONE.value, status=status)
-                        self.get_data_from_slave(status)
-                        jobs_to_run, wait_for_data = self.job_queue.get_next_jobs(init=False)
-
-                    if len(jobs_to_run) == 0:  # No more jobs to run and not waiting for data just after call to get_next_job call(), so stop
-                        break
-
-                status = MPI.Status()
-                self.comm.probe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-                tag = status.Get_tag()
-
-                if tag == MPI_TAGS.READY.value:
-                    job = jobs_to_run.pop(0)
-                    self.send_work_to_slave(job, status)
-                elif tag == MPI_TAGS.DONE.value:
-                    self.get_data_from_slave(status)
-                else:
-                    raise NotImplementedError("Unexpected tag:", tag)
-
-                if os.name == 'nt':
-                    if os.path.exists("stop.txt"):  # MS MPI does not pass signals to processes (https://stackoverflow.com/a/39399235)
-                        print("Interrupted", flush=True)
-                        # So, as cringe as it may seem, to gracefully interrupt the simulation, we must create a "stop.txt" file
-                        os.remove("stop.txt")
-                        raise KeyboardInterrupt
+            self.dispatch(with_next_jobs=True)
 
+            self.wait_background_task()
             self.job_queue.write_saved_results()
             self.job_queue.write_analysis_output()
 
@@ -84,32 +77,121 @@ class Master:
             logger.logger.info(("# additional samples for critical contingencies"))
             logger.logger.info(("##############################################"))
 
-            jobs_to_run = self.job_queue.get_additional_jobs()
-            while len(jobs_to_run) > 0:
-                status = MPI.Status()
-                self.comm.probe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-                tag = status.Get_tag()
-
-                if tag == MPI_TAGS.READY.value:
-                    job = jobs_to_run.pop(0)
-                    self.send_work_to_slave(job, status)
-                elif tag == MPI_TAGS.DONE.value:
-                    self.get_data_from_slave(status)
-                else:
-                    raise NotImplementedError("Unexpected tag:", tag)
+            self.jobs_to_run.extend(self.filter_saved_jobs(self.job_queue.get_additional_jobs()))
+            self.dispatch(with_next_jobs=False)
 
+            self.wait_background_task()
             self.terminate_slaves()
+            self.log_dispatch_statistics()
+            self.job_queue.log_early_termination_statistics()
             self.job_queue.write_saved_results()
             self.job_queue.write_analysis_output(done=True)
             # self.show_memory_usage()
         except KeyboardInterrupt:
             logger.logger.warning("Simulation interrupted by user")
+            self.wait_background_task()
             self.job_queue.write_saved_results()
             self.job_queue.write_analysis_output()
             # self.show_memory_usage()
             if os.name == 'nt':  # With MS MPI, only the master gets interrupted, so abort to stop the other processes
                 MPI.COMM_WORLD.Abort(1)
 
+    def dispatch(self, with_next_jobs: bool):
+        """
+        Serve the slaves until all jobs are launched. If with_next_jobs, the job queue is repopulated with
+        JobQueue.get_next_jobs() until it reports that statistical accuracy is reached. Completed jobs are stored
+        and new jobs are computed in a background thread while the main thread keeps answering the slaves. New
+        jobs are requested before the queue is empty (when less jobs than slave job slots remain) so that slaves
+        never have to wait for the indicators to be updated.
+        """
+        init = with_next_jobs
+        n_iter = 0
+        new_results = True  # Whether new results have been stored since the last call to get_next_jobs()
+        while True:
+            self.receive_messages()
+            self.send_work_to_available_slaves()
+
+            if self.background_task is not None and self.background_task.done():
+                next_jobs = self.background_task.result()  # Also raises exceptions from the background thread
+                self.background_task = None
+                if next_jobs is not None:
+                    jobs, wait_for_data = next_jobs
+                    if len(jobs) == 0 and not wait_for_data and len(self.jobs_to_run) == 0:
+                        break  # No more jobs to run and not waiting for data, so stop
+                    if len(jobs) > 0:
+                        n_iter += 1
+                        logger.logger.info("")
+                        logger.logger.info(f"Launching batch {n_iter} of simulations (with {len(jobs)} jobs)")
+                        self.jobs_to_run.extend(jobs)
+                        self.send_work_to_available_slaves()
+
+            if init and len(self.jobs_to_run) == 0:
+                logger.logger.info('Launched all NB_MIN_RUNS jobs')
+                init = False
+
+            if self.background_task is None:
+                if with_next_jobs and len(self.jobs_to_run) <= sum(self.slave_credits.values()) and (new_results or len(self.completed_jobs) > 0):
+                    self.background_task = self.executor.submit(self.update_job_queue, self.completed_jobs, get_next_jobs=True)
+                    self.completed_jobs = []
+                    new_results = False
+                elif len(self.completed_jobs) > 0:
+                    self.background_task = self.executor.submit(self.update_job_queue, self.completed_jobs, get_next_jobs=False)
+                    self.completed_jobs = []
+                    new_results = True
+                elif not with_next_jobs and len(self.jobs_to_run) == 0:
+                    break
+
+            if os.name == 'nt':
+                if os.path.exists("stop.txt"):  # MS MPI does not pass signals to processes (https://stackoverflow.com/a/39399235)
+                    print("Interrupted", flush=True)
+                    # So, as cringe as it may seem, to gracefully interrupt the simulation, we must create a "stop.txt" file
+                    os.remove("stop.txt")
+                    raise KeyboardInterrupt
+
+    def update_job_queue(self, completed_jobs: list[Job], get_next_jobs: bool):
+        """
+        Store completed jobs in the job queue and, if get_next_jobs, compute the next batch of jobs (minus the jobs
+        that have saved results). Executed in the background thread.
+        """
+        for job in completed_jobs:
+            self.job_queue.store_completed_job(job)
+        if not get_next_jobs:
+            return None
+
+        while True:
+            jobs, wait_for_data = self.job_queue.get_next_jobs(init=False)
+            jobs_to_run = self.filter_saved_jobs(jobs)
+            if len(jobs_to_run) > 0 or len(jobs) == 0:
+                return jobs_to_run, wait_for_data
+            # All jobs of the batch were already simulated, directly compute the next batch
+
+    def wait_background_task(self):
+        if self.background_task is not None:
+            self.background_task.result()
+            self.background_task = None
+        for job in self.completed_jobs:
+            self.job_queue.store_completed_job(job)
+        self.completed_jobs = []
+
+    def filter_saved_jobs(self, jobs: list[Job]) -> list[Job]:
+        """
+        Store the results of the jobs that have already been simulated in past runs and return the other ones
+        """
+        if not REUSE_RESULTS:
+            return jobs
+
+        jobs_to_run = []
+        for job in jobs:
+            saved_job = self.job_queue.get_saved_job(job)
+            if saved_job is not None:  # If save of job exist
+                if saved_job.results.load_shedding <= 100.1:
+                    self.job_queue.store_completed_job(saved_job, exists=True)
+                    continue  # Don't rerun job
+                else:
+                    pass  # Rerun timeouts and cancelled jobs
+            jobs_to_run.append(job)
+        return jobs_to_run
+
     """ def show_memory_usage(self):
         print('1  Job queue', asizeof.asizeof(self.job_queue) / 1e6)
         print('2  Job queue', asizeof.asizeof(self.job_queue.contingencies) / 1e6)
@@ -120,9 +202,9 @@ class Master:
         print('7  Job queue', asizeof.asizeof(self.job_queue.simulations_launched) / 1e6)
         print('9  Job queue', asizeof.asizeof(self.job_queue.dynamic_seed_counters) / 1e6)
         print('10 Job queue', asizeof.asizeof(self.job_queue.priority_queue) / 1e6)
-        print('11 Job queue', asizeof.asizeof(self.job_queue.saved_results) / 1e6)
+        print('11 Job queue', asizeof.asizeof(self.job_queue.saved_results_journal.pending_jobs) / 1e6)
         print('12 Contingency list', asizeof.asizeof(self.contingency_list) / 1e6)
-        print('13 Slave state', asizeof.asizeof(self.slaves_state) / 1e6)
+        print('13 Slave state', asizeof.asizeof(self.outstanding_jobs) / 1e6)
 
         for contingency_result in self.job_queue.simulation_results.values():
             for jobs in contingency_result.jobs.values():
@@ -138,42 +220,224 @@ class Master:
             break """
 
 
+    def post_receives(self):
+        """
+        Post a non-blocking receive for the READY and DONE messages of each slave
+        """
+        for slave in sorted(self.slaves):
+            for tag in [MPI_TAGS.DONE, MPI_TAGS.READY]:
+                if tag == MPI_TAGS.DONE:
+                    buffer = bytearray(MPI_RECV_BUFFER_SIZE)
+                else:
+                    buffer = bytearray(job_messages.READY_MESSAGE.size)
+                self.request_owners.append((slave, tag))
+                self.receive_buffers.append(buffer)
+                self.receive_requests.append(MPI.REQUEST_NULL)
+                self.post_receive(len(self.receive_requests) - 1)
+
+    def post_receive(self, index):
+        """
+        (Re)post the receive of the given index, the buffer is reused as messages are decoded as soon as they are received
+        """
+        slave, tag = self.request_owners[index]
+        self.receive_requests[index] = self.comm.Irecv([self.receive_buffers[index], MPI.BYTE], source=slave, tag=tag.value)
+
+    def receive_messages(self):
+        indices = MPI.Request.Testsome(self.receive_requests)
+        if not indices:
+            time.sleep(MASTER_POLLING_PERIOD_S)
+            return
+
+        for index in indices:
+            slave, tag = self.request_owners[index]
+            buffer = self.receive_buffers[index]
+            if tag == MPI_TAGS.DONE:
+                self.get_data_from_slave(slave, buffer)
+                self.post_receive(index)
+            elif tag == MPI_TAGS.READY:
+                # READY is only sent once, then each DONE message gives one job slot back to the master
+                self.slave_credits[slave] = job_messages.decode_ready_message(buffer)
+                while len(self.available_slaves) <= self.slave_credits[slave]:
+                    self.available_slaves.append({})
+                self.set_outstanding_jobs(slave, self.outstanding_jobs[slave])
+                self.receive_requests[index] = MPI.REQUEST_NULL
+            else:
+                raise NotImplementedError("Unexpected tag:", tag)
+
+
     def terminate_slaves(self):
         """
-        Wait for slaves to finish their current job then kill them
+        Wait for slaves to finish their current (and prefetched) jobs then kill them
         """
-        for slave in self.slaves_state.keys():
-            # Wait for slaves to finish running jobs
-            if self.slaves_state[slave] == 'Working':
-                status = MPI.Status()
-                self.comm.probe(source=slave, tag=MPI_TAGS.DONE.value, status=status)
-                self.get_data_from_slave(status)
+        while sum(self.outstanding_jobs.values()) > 0:
+            self.receive_messages()
+        for job in self.completed_jobs:
+            self.job_queue.store_completed_job(job)
+        self.completed_jobs = []
 
-            # Terminate slaves
-            self.comm.send(obj=None, dest=slave, tag=MPI_TAGS.EXIT.value)
-            self.comm.recv(source=slave, tag=MPI_TAGS.EXIT.value)
+        for index, (slave, tag) in enumerate(self.request_owners):
+            request = self.receive_requests[index]
+            if tag == MPI_TAGS.READY:
+                request.Wait()  # No-op except for slaves that never sent their READY message
+            else:
+                request.Cancel()
+                request.Wait()
+        MPI.Request.Waitall([request for request, _ in self.send_requests])
+        self.send_requests = []
 
+        # Terminate slaves
+        for slave in self.slaves:
+            self.comm.Send([bytearray(0), MPI.BYTE], dest=slave, tag=MPI_TAGS.EXIT.value)
+            self.comm.Recv([bytearray(0), MPI.BYTE], source=slave, tag=MPI_TAGS.EXIT.value)
 
-    def send_work_to_slave(self, job, status: MPI.Status):
-        if REUSE_RESULTS:
-            saved_job = self.job_queue.get_saved_job(job)
-            if saved_job is not None:  # If save of job exist
-                if saved_job.results.load_shedding <= 100.1:
-                    self.job_queue.store_completed_job(saved_job, exists=True)
-                    return  # Don't rerun job
-                else:
-                    pass  # Rerun timeouts and cancelled jobs
 
-        slave = status.Get_source()
-        self.comm.recv(source=slave, tag=MPI_TAGS.READY.value, status=status)
-        logger.logger.log(logger.logging.TRACE, 'Master: sending input job {} to slave {}'.format(job, slave))
-        self.comm.send(obj=job, dest=slave, tag=MPI_TAGS.START.value)
-        self.slaves_state[slave] = 'Working'
+    def send_work_to_available_slaves(self):
+        while len(self.jobs_to_run) > 0:
+            slave = self.get_available_slave()
+            if slave is None:
+                break
+            # Send several jobs at once to slaves that can hold many (i.e. sub-masters), but only if there are enough jobs for all slaves
+            nb_jobs = min(self.slave_credits[slave] - self.outstanding_jobs[slave], -(-len(self.jobs_to_run) // len(self.slaves)))
+            self.send_work_to_slave(self.get_jobs_for_slave(slave, nb_jobs), slave)
+
+        if len(self.send_requests) > len(self.slaves):  # Release the buffers of the jobs that were received by the slaves
+            self.send_requests = [(request, buffer) for request, buffer in self.send_requests if not request.Test()]
+
+    def get_jobs_for_slave(self, slave, nb_jobs) -> list[Job]:
+        """
+        Take nb_jobs jobs from jobs_to_run for the given slave. If AFFINITY_DISPATCH, jobs on the static samples the
+        slave ran last are preferred (the slave then reuses its cached network and input files) if they are close to the
+        head of the queue (see AFFINITY_WINDOW_PER_SLAVE), otherwise the jobs are taken in order
+        """
+        if not self.track_static_ids:
+            self.nb_dispatched_jobs += nb_jobs
+            return [self.jobs_to_run.popleft() for _ in range(nb_jobs)]
+
+        recent_static_ids = self.recent_static_ids[slave]
+        jobs = []
+        for _ in range(nb_jobs):
+            job = None
+            if AFFINITY_DISPATCH:
+                for static_id in reversed(recent_static_ids):
+                    job = self.jobs_to_run.pop_static_id(static_id, self.affinity_window)
+                    if job is not None:
+                        break
+            if job is None:
+                job = self.jobs_to_run.popleft()
+
+            static_id = str(job.static_id)
+            if static_id in recent_static_ids:
+                self.nb_affine_jobs += 1
+                recent_static_ids.move_to_end(static_id)
+            else:
+                recent_static_ids[static_id] = None
+                if len(recent_static_ids) > NETWORK_CACHE_SIZE:
+                    recent_static_ids.popitem(last=False)
+            jobs.append(job)
+        self.nb_dispatched_jobs += nb_jobs
+        return jobs
+
+    def log_dispatch_statistics(self):
+        if self.nb_dispatched_jobs > 0 and self.track_static_ids:
+            logger.logger.info('{}/{} jobs ({:.1%}) sent to a slave that recently ran a job on the same static sample'.format(
+                self.nb_affine_jobs, self.nb_dispatched_jobs, self.nb_affine_jobs / self.nb_dispatched_jobs))
+
+    def get_available_slave(self):
+        """
+        Return the slave with the least outstanding jobs that can receive a new one, or None if all slaves are full
+        """
+        for slaves in self.available_slaves:
+            if len(slaves) > 0:
+                return next(iter(slaves))
+        return None
+
+    def set_outstanding_jobs(self, slave, nb_jobs):
+        self.available_slaves[self.outstanding_jobs[slave]].pop(slave, None)
+        self.outstanding_jobs[slave] = nb_jobs
+        if nb_jobs < self.slave_credits[slave]:
+            self.available_slaves[nb_jobs][slave] = None
+
+    def send_work_to_slave(self, jobs: list[Job], slave):
+        for job in jobs:
+            logger.logger.log(logger.logging.TRACE, 'Master: sending input job {} to slave {}'.format(job, slave))
+            self.jobs_in_flight[job.id] = job
+        # Non-blocking, the slave only receives the jobs once it has completed its previous ones
+        buffer = job_messages.encode_batch([job_messages.encode_job_request(job) for job in jobs])
+        self.send_requests.append((self.comm.Isend([buffer, MPI.BYTE], dest=slave, tag=MPI_TAGS.START.value), buffer))
+        self.set_outstanding_jobs(slave, self.outstanding_jobs[slave] + len(jobs))
+
+
+    def get_data_from_slave(self, slave, buffer: bytearray):
+        results = job_messages.decode_batch(buffer)
+        for result in results:
+            job = self.jobs_in_flight.pop(job_messages.decode_job_result_ticket(result))
+            job_messages.decode_job_result(result, job)
+            logger.logger.log(logger.logging.TRACE, 'Master: slave {} returned {}'.format(slave, job))
+            self.completed_jobs.append(job)
+        self.set_outstanding_jobs(slave, self.outstanding_jobs[slave] - len(results))
+
 
+class PendingJobs:
+    """
+    Jobs waiting to be sent to the slaves, in the order in which they should be sent, with an index by static sample
+    so that jobs on a given sample can be sent first to slaves that have it in cache. Jobs taken through the index
+    are removed lazily from the main queue. Jobs are stored with their position in the queue (number of jobs added
+    before them), so that only the jobs close to the head can be taken through the index
+    """
+    def __init__(self):
+        self.jobs: deque[tuple[int, Job]] = deque()
+        self.jobs_per_static_id: dict[str, deque[tuple[int, Job]]] = {}
+        self.taken_job_ids: set[int] = set()  # Jobs taken through the index that are still in self.jobs
+        self.nb_jobs = 0
+        self.nb_added_jobs = 0
+
+    def __len__(self):
+        return self.nb_jobs
+
+    def extend(self, jobs: list[Job]):
+        if self.nb_jobs == 0:
+            self.jobs.clear()
+            self.taken_job_ids.clear()
+        for job in jobs:
+            entry = (self.nb_added_jobs, job)
+            self.nb_added_jobs += 1
+            self.jobs.append(entry)
+            self.jobs_per_static_id.setdefault(str(job.static_id), deque()).append(entry)
+        self.nb_jobs += len(jobs)
+
+    def remove_taken_jobs(self):
+        """
+        Remove the jobs taken through the index from the head of the main queue (there must be a job left)
+        """
+        while self.jobs[0][1].id in self.taken_job_ids:
+            self.taken_job_ids.remove(self.jobs.popleft()[1].id)
+
+    def popleft(self) -> Job:
+        self.remove_taken_jobs()
+        _, job = self.jobs.popleft()
+        # Jobs are taken from the left of both queues, so job is also the first job of its static sample
+        self.remove_from_index(str(job.static_id))
+        self.nb_jobs -= 1
+        return job
+
+    def pop_static_id(self, static_id: str, window: int) -> Job:
+        """
+        Return the first job on the given static sample if it is less than window positions away from the head of the
+        queue, or None if there is none
+        """
+        if static_id not in self.jobs_per_static_id:
+            return None
+        self.remove_taken_jobs()
+        if self.jobs_per_static_id[static_id][0][0] - self.jobs[0][0] >= window:
+            return None
+        job = self.remove_from_index(static_id)
+        self.taken_job_ids.add(job.id)
+        self.nb_jobs -= 1
+        return job
 
-    def get_data_from_slave(self, status: MPI.Status):
-        slave = status.Get_source()
-        job = self.comm.recv(source=slave, tag=MPI_TAGS.DONE.value)
-        self.slaves_state[slave] = 'Waiting'
-        logger.logger.log(logger.logging.TRACE, 'Master: slave {} returned {}'.format(slave, job))
-        self.job_queue.store_completed_job(job)
+    def remove_from_index(self, static_id: str) -> Job:
+        jobs = self.jobs_per_static_id[static_id]
+        _, job = jobs.popleft()
+        if len(jobs) == 0:
+            del self.jobs_per_static_id[static_id]
+        return job
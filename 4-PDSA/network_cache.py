@@ -0,0 +1,84 @@
+from __future__ import annotations
+from common import *
+from collections import OrderedDict
+import os
+import pypowsybl as pp
+import logger
+
+"""
+Cache of the static networks (iidm files of 2-SCOPF) used last by this process, shared by all steps of a job (input
+files, screening, results) and by consecutive jobs on the same static sample. The DataFrames of the networks
+(get_generators(), get_lines()...) are also cached, they are shared and must not be modified in place. Networks are
+evicted in least-recently-used order when there are more than NETWORK_CACHE_SIZE networks, or when their estimated
+memory usage exceeds NETWORK_CACHE_MEMORY_MB (the last used network is always kept).
+"""
+
+CACHED_DATAFRAMES = ['get_generators', 'get_lines', 'get_loads', 'get_buses', 'get_voltage_levels', 'get_2_windings_transformers']
+
+
+class CachedNetwork:
+    """
+    Read-only wrapper of a pypowsybl network that computes each of the CACHED_DATAFRAMES once
+    """
+    def __init__(self, network: pp.network.Network, file_size):
+        self.network = network
+        self.dataframes = {}
+        self.memory_usage = file_size  # Rough estimate of the size of the network itself
+
+    def __getattr__(self, name):
+        if name not in CACHED_DATAFRAMES:
+            return getattr(self.network, name)
+
+        def get_dataframe(*args, **kwargs):
+            if args or kwargs:
+                return getattr(self.network, name)(*args, **kwargs)
+            if name not in self.dataframes:
+                self.dataframes[name] = getattr(self.network, name)()
+                self.memory_usage += int(self.dataframes[name].memory_usage(deep=True).sum())
+                evict()
+            return self.dataframes[name]
+        return get_dataframe
+
+
+network_cache: OrderedDict[str, CachedNetwork] = OrderedDict()
+nb_hits = 0
+nb_misses = 0
+
+
+def get_iidm_path(static_id):
+    return os.path.join('../2-SCOPF/d-Final-dispatch', f'{CASE}_{NETWORK_NAME}', str(static_id) + '.iidm')
+
+
+def get_network(static_id) -> CachedNetwork:
+    global nb_hits, nb_misses
+    static_id = str(static_id)
+    if static_id in network_cache:
+        nb_hits += 1
+        network_cache.move_to_end(static_id)
+        evict()
+        return network_cache[static_id]
+
+    nb_misses += 1
+    iidm_file = get_iidm_path(static_id)
+    network = CachedNetwork(pp.network.load(iidm_file), os.path.getsize(iidm_file))
+    network_cache[static_id] = network
+    evict()
+    return network
+
+
+def evict():
+    """
+    Remove the least recently used networks until the cache is within its limits
+    """
+    while len(network_cache) > 1:
+        memory_usage = sum([network.memory_usage for network in network_cache.values()])
+        if len(network_cache) <= NETWORK_CACHE_SIZE and memory_usage <= NETWORK_CACHE_MEMORY_MB * 1e6:
+            break
+        static_id, _ = network_cache.popitem(last=False)
+        logger.logger.log(logger.logging.TRACE, 'Network {} evicted from cache'.format(static_id))
+
+
+def get_hit_rate():
+    if nb_hits + nb_misses == 0:
+        return 0
+    return nb_hits / (nb_hits + nb_misses)
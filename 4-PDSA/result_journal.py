@@ -0,0 +1,262 @@
+from __future__ import annotations
+from common import *
+from contingencies import Contingency
+from job import Job
+import job_messages
+import logger
+import os
+import sqlite3
+import struct
+import zlib
+
+"""
+Append-only journal of completed jobs (replaces the saved_results.pickle files). Each completed job is written as one
+record containing the job request and job result in the format of job_messages.py, preceded by its length and CRC32.
+Records are appended in memory and written + fsync'd in batches (flush()). If the program is interrupted while
+writing, the last record is incomplete or has an invalid checksum, and is discarded the next time the journal is
+opened. A record with an invalid checksum that is followed by other records is not the result of an interrupted write
+(the file is corrupted): it is skipped with an error, and the journal is never truncated after it. A job that is run
+again (e.g. after a timeout) is appended again, the last record of a given (contingency_id, static_id, dynamic_seed) is
+the valid one. compact() rewrites the journal without the overwritten records.
+
+The position of the valid record of each job is kept in an SQLite index next to the journal, so that past results
+are only read (and decoded) when they are needed. The position of the first record of each job is also kept, so that
+saved jobs are returned in the order in which they were first saved (as with the former nested dicts of saved
+results, in which the special job of a static sample comes first), even if some of them were saved again. The index also stores the size of the journal it covers and the
+inode of the journal: records written after the last index update are indexed when the journal is opened, and the
+index is rebuilt if the journal was replaced (e.g. compaction interrupted before the index was updated).
+"""
+
+JOURNAL_MAGIC = b'PDSAJRN1'
+RECORD_HEADER = struct.Struct('<II')  # Length of the record, CRC32 of the record
+
+
+def encode_record(job: Job) -> bytes:
+    payload = job_messages.encode_batch([job_messages.encode_job_request(job), job_messages.encode_job_result(job, 0)])
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def decode_record(payload, contingencies: dict[str, Contingency]) -> Job:
+    request, result = job_messages.decode_batch(payload)
+    contingency_id = job_messages.decode_job_request_contingency_id(request)
+    base_id = contingency_id.split('~')[0]
+    if base_id not in contingencies:
+        # Contingency list changed since the results were saved, use a placeholder contingency (the journal only contains the id)
+        logger.logger.warning('Saved results of unknown contingency {}'.format(base_id))
+        contingencies[base_id] = Contingency(base_id, 1, 0, [], 0)
+    _, job = job_messages.decode_job_request(request, contingencies)
+    job_messages.decode_job_result(result, job)
+    return job
+
+def get_key(job: Job):
+    return job.contingency.id, str(job.static_id), job.dynamic_seed
+
+
+class ResultJournal:
+    def __init__(self, path, contingencies: dict[str, Contingency]):
+        """
+        contingencies maps the ids of the known contingencies to the contingencies, it is used to recreate the
+        contingencies of the saved jobs (contingencies created by hidden failures are added to it)
+        """
+        self.path = path
+        self.index_path = path + '.index'
+        self.contingencies = contingencies
+        self.pending_records: list[bytes] = []
+        self.pending_jobs: dict[tuple[str, str, int], Job] = {}  # Jobs of the pending records (not yet in the journal and index)
+        self.read_file = None
+
+        # The index is accessed by the main thread and the background thread of the master, but never concurrently
+        self.index = sqlite3.connect(self.index_path, check_same_thread=False)
+        columns = [row[1] for row in self.index.execute('PRAGMA table_info(results)')]
+        if len(columns) > 0 and 'first_offset' not in columns:  # Index created by a previous version, rebuilt from the journal
+            self.index.execute('DROP TABLE results')
+            self.index.execute('DROP TABLE IF EXISTS journal')
+        self.index.execute('CREATE TABLE IF NOT EXISTS results (contingency_id TEXT, static_id TEXT, dynamic_seed INTEGER, offset INTEGER, completed INTEGER, first_offset INTEGER, PRIMARY KEY (contingency_id, static_id, dynamic_seed)) WITHOUT ROWID')
+        self.index.execute('CREATE TABLE IF NOT EXISTS journal (inode INTEGER, indexed_size INTEGER, nb_records INTEGER)')
+        self.index.commit()
+        self.update_index()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get_indexed_state(self):
+        row = self.index.execute('SELECT inode, indexed_size, nb_records FROM journal').fetchone()
+        if row is None:
+            return None, len(JOURNAL_MAGIC), 0
+        return row
+
+    def set_indexed_state(self, indexed_size, nb_records):
+        self.index.execute('DELETE FROM journal')
+        self.index.execute('INSERT INTO journal VALUES (?, ?, ?)', (os.stat(self.path).st_ino, indexed_size, nb_records))
+
+    def read_records(self, offset):
+        """
+        Yield (offset, length, payload) for all records of the journal starting at offset. Stop at the first record that
+        is incomplete, or that has an invalid checksum and ends at the end of the journal (interrupted write). The
+        payload of other records with an invalid checksum (corrupted) is None
+        """
+        journal_size = os.path.getsize(self.path)
+        with open(self.path, 'rb') as file:
+            if file.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+                raise ValueError('{} is not a result journal'.format(self.path))
+            file.seek(offset)
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                end = offset + RECORD_HEADER.size + length
+                if end > journal_size:
+                    break
+                payload = file.read(length)
+                if zlib.crc32(payload) != crc:
+                    if end == journal_size:
+                        break
+                    payload = None
+                yield offset, length, payload
+                offset = end
+
+    def update_index(self):
+        """
+        Index the records written since the last index update (or all records if the journal was replaced), and
+        discard the incomplete record at the end of the journal if any (only if no corrupted record was found before it,
+        otherwise the end of the journal might be valid records misread after a corrupted length)
+        """
+        self.close_read_file()
+        if not self.exists():
+            self.index.execute('DELETE FROM results')
+            self.index.execute('DELETE FROM journal')
+            self.index.commit()
+            self.nb_records = 0
+            return
+
+        inode, indexed_size, self.nb_records = self.get_indexed_state()
+        journal_size = os.path.getsize(self.path)
+        if inode != os.stat(self.path).st_ino or indexed_size > journal_size:
+            logger.logger.info('Rebuilding index of {}'.format(self.path))
+            self.index.execute('DELETE FROM results')
+            indexed_size, self.nb_records = len(JOURNAL_MAGIC), 0
+
+        if indexed_size < journal_size:
+            nb_corrupted_records = 0
+            for offset, length, payload in self.read_records(indexed_size):
+                if payload is None:
+                    logger.logger.error('Skipping corrupted record (invalid checksum) at offset {} of {}'.format(offset, self.path))
+                    nb_corrupted_records += 1
+                else:
+                    self.index_record(offset, payload)
+                indexed_size = offset + RECORD_HEADER.size + length
+                self.nb_records += 1
+            if indexed_size < journal_size:
+                if nb_corrupted_records == 0:
+                    logger.logger.warning('Discarding incomplete record(s) at the end of {} (interrupted write)'.format(self.path))
+                    with open(self.path, 'r+b') as file:
+                        file.truncate(indexed_size)
+                else:
+                    logger.logger.error('Could not read the end of {} after corrupted record(s) (from offset {}), it is kept but not indexed'.format(self.path, indexed_size))
+        self.set_indexed_state(indexed_size, self.nb_records)
+        self.index.commit()
+
+    def index_record(self, offset, payload):
+        request, result = job_messages.decode_batch(payload)
+        key = job_messages.decode_job_request_key(request)
+        self.index.execute('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (contingency_id, static_id, dynamic_seed) DO UPDATE SET offset = excluded.offset, completed = excluded.completed',
+                           key + (offset, job_messages.decode_job_result_completed(result), offset))
+
+    def close_read_file(self):
+        if self.read_file is not None:
+            self.read_file.close()
+            self.read_file = None
+
+    def read_job(self, offset) -> Job:
+        if self.read_file is None:
+            self.read_file = open(self.path, 'rb')
+        self.read_file.seek(offset)
+        length, _ = RECORD_HEADER.unpack(self.read_file.read(RECORD_HEADER.size))
+        return decode_record(self.read_file.read(length), self.contingencies)
+
+    def get_nb_jobs(self) -> int:
+        """
+        Number of jobs in the journal (not counting overwritten records and pending records)
+        """
+        return self.index.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def get_job(self, contingency_id, static_id, dynamic_seed, completed_only=False) -> Job:
+        """
+        Return the saved job with the given key, or None if it does not exist (or is not completed if completed_only)
+        """
+        key = (contingency_id, str(static_id), dynamic_seed)
+        if key in self.pending_jobs:
+            job = self.pending_jobs[key]
+            return job if job.completed or not completed_only else None
+        row = self.index.execute('SELECT offset, completed FROM results WHERE contingency_id = ? AND static_id = ? AND dynamic_seed = ?', key).fetchone()
+        if row is None or (completed_only and not row[1]):
+            return None
+        return self.read_job(row[0])
+
+    def get_jobs(self, contingency_id) -> list[Job]:
+        """
+        Return the saved jobs of a contingency, grouped by static id (in the order in which the static ids were first saved),
+        the jobs of a static id being in the order in which they were first saved
+        """
+        self.flush()
+        offsets_per_static_id: dict[str, list[int]] = {}
+        for static_id, offset in self.index.execute('SELECT static_id, offset FROM results WHERE contingency_id = ? ORDER BY first_offset', (contingency_id,)):
+            offsets_per_static_id.setdefault(static_id, []).append(offset)
+        return [self.read_job(offset) for offsets in offsets_per_static_id.values() for offset in offsets]
+
+    def append(self, job: Job):
+        self.pending_records.append(encode_record(job))
+        self.pending_jobs[get_key(job)] = job
+
+    def flush(self):
+        """
+        Write the pending records, make sure they are on disk, then index them
+        """
+        if len(self.pending_records) == 0:
+            return
+        new_file = not self.exists()
+        with open(self.path, 'ab') as file:
+            if new_file:
+                file.write(JOURNAL_MAGIC)
+            offset = file.tell()
+            file.write(b''.join(self.pending_records))
+            file.flush()
+            os.fsync(file.fileno())
+
+        for record in self.pending_records:
+            self.index_record(offset, memoryview(record)[RECORD_HEADER.size:])
+            offset += len(record)
+        self.nb_records += len(self.pending_records)
+        self.set_indexed_state(offset, self.nb_records)
+        self.index.commit()
+        self.pending_records = []
+        self.pending_jobs = {}
+
+    def compact(self):
+        """
+        Rewrite the journal without the records of jobs that were saved again. The new journal is written to a temporary
+        file that replaces the old one once complete, so that one valid journal always exists. Jobs are written in the
+        order in which they were first saved, so that this order is kept if the index is rebuilt
+        """
+        self.flush()
+        self.close_read_file()
+        tmp_path = self.path + '.tmp'
+        new_offsets = []
+        offset = len(JOURNAL_MAGIC)
+        with open(self.path, 'rb') as old_file, open(tmp_path, 'wb') as file:
+            file.write(JOURNAL_MAGIC)
+            for key_offset in self.index.execute('SELECT contingency_id, static_id, dynamic_seed, offset FROM results ORDER BY first_offset').fetchall():
+                old_file.seek(key_offset[3])
+                header = old_file.read(RECORD_HEADER.size)
+                length, _ = RECORD_HEADER.unpack(header)
+                file.write(header + old_file.read(length))
+                new_offsets.append((offset, offset) + key_offset[:3])
+                offset += RECORD_HEADER.size + length
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+        self.index.executemany('UPDATE results SET offset = ?, first_offset = ? WHERE contingency_id = ? AND static_id = ? AND dynamic_seed = ?', new_offsets)
+        self.nb_records = len(new_offsets)
+        self.set_indexed_state(offset, self.nb_records)
+        self.index.commit()
@@ -1,15 +1,109 @@
 from __future__ import annotations
 from common import *
-from dataclasses import dataclass
+import sys
+import threading
+import numpy as np
 import dynawo_outputs
 
-@dataclass
+"""
+Results of the jobs. They are kept for every completed job (job queue, result journal, messages), so they are stored
+compactly: the trip timeline is packed in a bytes object of TRIP_EVENT records (float32 time, 32-bit codes of the
+model and of the event description in the string tables below), and the failure ids are tuples of interned strings.
+The trip timeline is only converted back to TimeLineEvent objects when it is read. The values read when writing the
+analysis output (first tripped models...) are computed once, when the trip timeline is set.
+"""
+
+TRIP_EVENT = np.dtype([('time', '<f4'), ('model', '<u4'), ('event_description', '<u4')])
+NB_FIRST_TRIPPED_MODELS = 3  # Number of (sanitised) tripped models written for each job in the analysis output
+
+
+class StringTable:
+    """
+    Interned strings identified by int codes, shared by all results of the process (only one network is studied per run).
+    Results are created by the main and background threads of the master, so new strings are added under a lock (a
+    string is only added to codes once it is in strings, so lookups do not need it)
+    """
+    def __init__(self):
+        self.strings: list[str] = []
+        self.codes: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get_code(self, string: str) -> int:
+        code = self.codes.get(string)
+        if code is None:
+            with self.lock:
+                code = self.codes.get(string)
+                if code is None:
+                    code = len(self.strings)
+                    string = sys.intern(string)
+                    self.strings.append(string)
+                    self.codes[string] = code
+        return code
+
+    def intern(self, string: str) -> str:
+        return self.strings[self.get_code(string)]
+
+model_names = StringTable()
+event_descriptions = StringTable()
+
+
 class Results:
-    load_shedding: float
-    cost: float
-    trip_timeline: list[dynawo_outputs.TimeLineEvent]
-    excited_hidden_failures: list[str]
-    excited_generator_failures: list[str]
+    __slots__ = ['load_shedding', 'cost', 'trip_events', 'excited_hidden_failures', 'excited_generator_failures', 'first_tripped_models', 'has_non_rtpv_trips']
+
+    def __init__(self, load_shedding, cost, trip_timeline: list[dynawo_outputs.TimeLineEvent], excited_hidden_failures: list[str], excited_generator_failures: list[str]):
+        self.load_shedding = load_shedding
+        self.cost = cost
+        self.set_trip_timeline([event.time for event in trip_timeline], [event.model for event in trip_timeline], [event.event_description for event in trip_timeline])
+        self.excited_hidden_failures = tuple(model_names.intern(model) for model in excited_hidden_failures)
+        self.excited_generator_failures = tuple(model_names.intern(model) for model in excited_generator_failures)
+
+    @classmethod
+    def from_columns(cls, load_shedding, cost, times, models: list[str], descriptions: list[str], excited_hidden_failures: list[str], excited_generator_failures: list[str]) -> Results:
+        """
+        Same as Results(), but with the trip timeline given as columns (avoids creating TimeLineEvent objects)
+        """
+        results = cls(load_shedding, cost, [], excited_hidden_failures, excited_generator_failures)
+        results.set_trip_timeline(times, models, descriptions)
+        return results
+
+    def set_trip_timeline(self, times, models: list[str], descriptions: list[str]):
+        if len(times) == 0:
+            self.trip_events = b''  # Shared by all results without trips
+            self.first_tripped_models = ()
+            self.has_non_rtpv_trips = False
+            return
+        trip_events = np.empty(len(times), dtype=TRIP_EVENT)
+        trip_events['time'] = times
+        trip_events['model'] = [model_names.get_code(model) for model in models]
+        trip_events['event_description'] = [event_descriptions.get_code(description) for description in descriptions]
+        self.trip_events = trip_events.tobytes()
+        tripped_models = sanitise_tripped_models(models, descriptions)
+        self.first_tripped_models = tuple(sys.intern(model) for model in tripped_models[:NB_FIRST_TRIPPED_MODELS])
+        self.has_non_rtpv_trips = any('RTPV' not in model for model in models)
+
+    def get_trip_columns(self) -> tuple[np.ndarray, list[str], list[str]]:
+        """
+        Return the times (float32), models and event descriptions of the trip timeline
+        """
+        trip_events = np.frombuffer(self.trip_events, dtype=TRIP_EVENT)
+        models = [model_names.strings[code] for code in trip_events['model'].tolist()]
+        descriptions = [event_descriptions.strings[code] for code in trip_events['event_description'].tolist()]
+        return trip_events['time'], models, descriptions
+
+    @property
+    def trip_timeline(self) -> list[dynawo_outputs.TimeLineEvent]:
+        times, models, descriptions = self.get_trip_columns()
+        # str() of a float32 gives its shortest representation (e.g. 1.2 instead of 1.2000000476837158)
+        return [dynawo_outputs.TimeLineEvent(float(str(time)), model, description) for time, model, description in zip(times, models, descriptions)]
+
+    def __getstate__(self):
+        # Codes are specific to the string tables of the process, so results are pickled with strings (same state as the
+        # former dataclass, which also allows loading results pickled by previous versions, see saved_results.pickle)
+        return {'load_shedding': self.load_shedding, 'cost': self.cost, 'trip_timeline': self.trip_timeline,
+                'excited_hidden_failures': list(self.excited_hidden_failures), 'excited_generator_failures': list(self.excited_generator_failures)}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
 
     def __repr__(self) -> str:
         return CSV_SEPARATOR.join([str(self.load_shedding), str(self.cost)] + [str(timeline_event) for timeline_event in self.trip_timeline])
@@ -17,23 +111,30 @@ class Results:
     def get_sanitised_tripped_models(self):
         """
         Return tripped models from trip_timeline but disregard 'fake trips' of distance protection, duplicates, and merge succesive RTPV trips
+        (the first NB_FIRST_TRIPPED_MODELS are also kept in first_tripped_models)
         """
-        trip_timeline = [timeline_event for timeline_event in self.trip_timeline if 'tripped zone 1' not in timeline_event.event_description or 'tripped zone 4' not in timeline_event.event_description]
+        _, models, descriptions = self.get_trip_columns()
+        return sanitise_tripped_models(models, descriptions)
 
-        tripped_models_no_duplicates = []
-        for trip_event in trip_timeline:
-            if trip_event.model not in tripped_models_no_duplicates:
-                tripped_models_no_duplicates.append(trip_event.model)
 
-        tripped_models_merged_rtpv = []
-        for tripped_model in tripped_models_no_duplicates:
-            if len(tripped_models_merged_rtpv) == 0:
-                tripped_models_merged_rtpv.append(tripped_model)
+def sanitise_tripped_models(models: list[str], descriptions: list[str]) -> list[str]:
+    """
+    See Results.get_sanitised_tripped_models()
+    """
+    tripped_models_no_duplicates = {}  # Dict used as an ordered set
+    for model, description in zip(models, descriptions):
+        if 'tripped zone 1' not in description or 'tripped zone 4' not in description:
+            tripped_models_no_duplicates[model] = None
+
+    tripped_models_merged_rtpv = []
+    for tripped_model in tripped_models_no_duplicates:
+        if len(tripped_models_merged_rtpv) == 0:
+            tripped_models_merged_rtpv.append(tripped_model)
+        else:
+            # Merge successive RTPV trips in timeline
+            if 'RTPV' in tripped_models_merged_rtpv[-1] and 'RTPV' in tripped_model:
+                tripped_models_merged_rtpv[-1] += ', ' + tripped_model
             else:
-                # Merge successive RTPV trips in timeline
-                if 'RTPV' in tripped_models_merged_rtpv[-1] and 'RTPV' in tripped_model:
-                    tripped_models_merged_rtpv[-1] += ', ' + tripped_model
-                else:
-                    tripped_models_merged_rtpv.append(tripped_model)
+                tripped_models_merged_rtpv.append(tripped_model)
 
-        return tripped_models_merged_rtpv
+    return tripped_models_merged_rtpv
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from common import *
+from itertools import count
+import atexit
+import os
+import queue
+import shutil
+import socket
+import threading
+
+"""
+Working directories of the jobs (see SCRATCH_BACKEND). The static network, which does not depend on the job and is
+large, is hard linked in the working directories (or symlinked if the working directories are on another filesystem)
+instead of copied. The other input files (.jobs, .crv and .fsv files) are small and always copied: Dynawo resolves the
+paths they contain (e.g. outputs, compileDir) relative to them, which would be 3-DynData for a symlink. Working directories of completed jobs are renamed (one metadata operation) and
+deleted later by a background thread in batches of CLEANUP_BATCH_SIZE, so that the slaves do not wait for the
+deletion of the files written by Dynawo.
+"""
+
+deletion_ids = count()
+deletion_queue: queue.Queue[str | None] = queue.Queue()
+deletion_thread = None
+
+
+def get_working_dir(static_id, dynamic_seed, contingency_id) -> str:
+    if SCRATCH_BACKEND == 'shared':
+        root = './simulations'
+    elif SCRATCH_BACKEND == 'shm':
+        root = '/dev/shm/pdsa'
+    elif SCRATCH_BACKEND == 'node_local':
+        root = SCRATCH_DIR
+    elif SCRATCH_BACKEND == 'worker':
+        return os.path.join(SCRATCH_DIR, f'worker_{socket.gethostname()}_{os.getpid()}')
+    else:
+        raise NotImplementedError('Unknown scratch backend {}'.format(SCRATCH_BACKEND))
+    return os.path.join(root, f'{CASE}_{NETWORK_NAME}', str(static_id), str(dynamic_seed), contingency_id)
+
+
+def link_file(source, destination):
+    """
+    Hard link (or symlink) source to destination (file path, or directory in which it is linked with the same name)
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    if not LINK_INPUT_FILES:
+        shutil.copy(source, destination)
+        return
+    if os.path.lexists(destination):
+        os.remove(destination)  # Replaced, as writing to a former hard link would modify its source
+    try:
+        os.link(source, destination)
+    except OSError:  # Different filesystems or links not supported
+        os.symlink(os.path.abspath(source), destination)
+
+
+def remove_dir(path):
+    """
+    Delete a directory (asynchronously if CLEANUP_BATCH_SIZE > 0), the path can be reused as soon as this function returns
+    """
+    if CLEANUP_BATCH_SIZE == 0:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    deleted_path = '{}.deleted_{}_{}'.format(path, os.getpid(), next(deletion_ids))
+    try:
+        os.rename(path, deleted_path)
+    except FileNotFoundError:
+        return
+    start_deletion_thread()
+    deletion_queue.put(deleted_path)
+
+
+def start_deletion_thread():
+    global deletion_thread
+    if deletion_thread is None:
+        deletion_thread = threading.Thread(target=delete_dirs, daemon=True)
+        deletion_thread.start()
+        atexit.register(flush)
+
+
+def delete_dirs():
+    """
+    Background thread deleting the directories given by remove_dir() once CLEANUP_BATCH_SIZE of them are waiting, or
+    when flush() is called (None in the queue)
+    """
+    batch = []
+    while True:
+        path = deletion_queue.get()
+        if path is not None:
+            batch.append(path)
+        if path is None or len(batch) >= CLEANUP_BATCH_SIZE:
+            for deleted_path in batch:
+                shutil.rmtree(deleted_path, ignore_errors=True)
+                deletion_queue.task_done()
+            batch = []
+        if path is None:
+            deletion_queue.task_done()
+
+
+def flush():
+    """
+    Wait until all directories given to remove_dir() are deleted
+    """
+    if deletion_thread is not None:
+        deletion_queue.put(None)
+        deletion_queue.join()
@@ -1,35 +1,74 @@
+from __future__ import annotations
 from common import *
 from mpi4py import MPI
+from contingencies import Contingency
 from job import Job
+from collections import deque
+import job_messages
 import logger
+import network_cache
 
 class Slave:
-    def __init__(self):
-        self.comm = MPI.COMM_WORLD
+    def __init__(self, contingency_list: list[Contingency] = None, comm: MPI.Comm = MPI.COMM_WORLD, master: int = 0):
+        """
+        comm and master are the communicator and rank of the process that sends the jobs (the master, or the sub-master of the node, see HIERARCHICAL_MASTER)
+        contingency_list is created by the master and broadcast (see main.py), it is only created here if not given
+        """
+        self.comm = comm
+        self.master = master
         self.rank = MPI.COMM_WORLD.Get_rank()
+        if contingency_list is None:
+            contingency_list = Contingency.create_contingency_list()
+        # Jobs received from the master only contain the id of their contingency
+        self.contingencies = {contingency.id: contingency for contingency in contingency_list}
         self.run()
 
     def run(self):
+        """
+        Run the jobs sent by the master. The master can send up to PREFETCH_DEPTH jobs in advance, they are kept in
+        pending_jobs so that the next job can start as soon as the previous one is completed. Each DONE message gives
+        back one job slot (credit) to the master.
+        """
         status = MPI.Status()
+        pending_jobs: deque[tuple[int, Job]] = deque()  # (ticket, job)
+        nb_jobs = 0
 
         try:
+            self.comm.Send([job_messages.encode_ready_message(PREFETCH_DEPTH), MPI.BYTE], dest=self.master, tag=MPI_TAGS.READY.value)
             while True:
-                self.comm.send(None, dest=0, tag=MPI_TAGS.READY.value)
-                job = self.comm.recv(source=0, tag=MPI.ANY_TAG, status=status)
-                tag = status.Get_tag()
-
-                if tag == MPI_TAGS.START.value:
-                    logger.logger.log(logger.logging.TRACE, 'Slave {}: received input job {}'.format(self.rank, job))
-                    self.do_work(job)
-                    logger.logger.info('Slave {} completed job {}'.format(self.rank, job))
-                    self.comm.send(job, dest=0, tag=MPI_TAGS.DONE.value)  # Blocking, otherwise job might be modified in buffer before being sent
-                elif tag == MPI_TAGS.EXIT.value:
+                # Receive all jobs already sent by the master, block only if there is nothing left to run
+                exit_requested = False
+                while True:
+                    if len(pending_jobs) == 0:
+                        self.comm.Probe(source=self.master, tag=MPI.ANY_TAG, status=status)
+                    elif not self.comm.Iprobe(source=self.master, tag=MPI.ANY_TAG, status=status):
+                        break
+                    tag = status.Get_tag()
+                    buffer = bytearray(status.Get_count(MPI.BYTE))
+                    self.comm.Recv([buffer, MPI.BYTE], source=self.master, tag=tag)
+                    if tag == MPI_TAGS.START.value:
+                        for request in job_messages.decode_batch(buffer):
+                            ticket, job = job_messages.decode_job_request(request, self.contingencies)
+                            logger.logger.log(logger.logging.TRACE, 'Slave {}: received input job {}'.format(self.rank, job))
+                            pending_jobs.append((ticket, job))
+                    elif tag == MPI_TAGS.EXIT.value:
+                        exit_requested = True  # Only sent by the master once all jobs are completed
+                        break
+                if exit_requested:
                     break
 
-            self.comm.send(None, dest=0, tag=MPI_TAGS.EXIT.value)
+                ticket, job = pending_jobs.popleft()
+                self.do_work(job)
+                nb_jobs += 1
+                logger.logger.info('Slave {} completed job {}'.format(self.rank, job))
+                self.comm.Send([job_messages.encode_batch([job_messages.encode_job_result(job, ticket)]), MPI.BYTE], dest=self.master, tag=MPI_TAGS.DONE.value)
+
+            logger.logger.info('Slave {}: {} networks loaded for {} jobs (network cache hit rate: {:.1%})'.format(self.rank, network_cache.nb_misses, nb_jobs, network_cache.get_hit_rate()))
+            self.comm.Send([bytearray(0), MPI.BYTE], dest=self.master, tag=MPI_TAGS.EXIT.value)
 
         except KeyboardInterrupt:
-            self.comm.isend(None, dest=0, tag=MPI_TAGS.READY.value)  # Non-blocking as the master might no longer be listening
+            # Non-blocking as the master might no longer be listening
+            self.comm.Isend([job_messages.encode_ready_message(0), MPI.BYTE], dest=self.master, tag=MPI_TAGS.READY.value)
 
 
     def do_work(self, job: Job):
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from common import *
+from mpi4py import MPI
+from collections import deque
+import job_messages
+import logger
+import time
+
+class SubMaster:
+    """
+    Relay between the master and the slaves of a node (see HIERARCHICAL_MASTER). From the point of view of the master,
+    a sub-master is a slave that can hold many jobs at once. Job requests are forwarded as is to the local slaves
+    (they are not decoded), and the job results of the local slaves are sent back to the master in batches. The
+    master thus only exchanges messages with one rank per node.
+    """
+    def __init__(self, node_comm: MPI.Comm, slaves: list[int]):
+        """
+        slaves are the ranks of the local slaves in node_comm
+        """
+        if len(slaves) == 0:
+            raise ValueError('Need at least one slave')
+
+        self.comm = MPI.COMM_WORLD
+        self.node_comm = node_comm
+        self.rank = MPI.COMM_WORLD.Get_rank()
+        self.slaves = list(slaves)
+
+        self.pending_requests: deque[memoryview] = deque()  # Job requests received from the master, not yet sent to a slave
+        self.slave_credits = {slave: 0 for slave in self.slaves}
+        self.outstanding_jobs = {slave: 0 for slave in self.slaves}
+        self.send_requests: list[tuple[MPI.Request, bytearray]] = []
+        self.results: list[memoryview] = []  # Job results not yet sent to the master
+        self.oldest_result_time = 0
+        self.run()
+
+    def run(self):
+        status = MPI.Status()
+        try:
+            # Hold a few more jobs than the slaves can, so that they are not starved while results are batched
+            nb_slots = len(self.slaves) * PREFETCH_DEPTH + SUB_MASTER_RESULT_BATCH_SIZE
+            self.comm.Send([job_messages.encode_ready_message(nb_slots), MPI.BYTE], dest=0, tag=MPI_TAGS.READY.value)
+            while True:
+                received = False
+                if self.comm.Iprobe(source=0, tag=MPI.ANY_TAG, status=status):
+                    received = True
+                    tag = status.Get_tag()
+                    buffer = bytearray(status.Get_count(MPI.BYTE))
+                    self.comm.Recv([buffer, MPI.BYTE], source=0, tag=tag)
+                    if tag == MPI_TAGS.START.value:
+                        self.pending_requests.extend(job_messages.decode_batch(buffer))
+                    elif tag == MPI_TAGS.EXIT.value:
+                        break  # Only sent by the master once all jobs are completed
+
+                if self.node_comm.Iprobe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status):
+                    received = True
+                    slave = status.Get_source()
+                    tag = status.Get_tag()
+                    buffer = bytearray(status.Get_count(MPI.BYTE))
+                    self.node_comm.Recv([buffer, MPI.BYTE], source=slave, tag=tag)
+                    if tag == MPI_TAGS.READY.value:
+                        self.slave_credits[slave] = job_messages.decode_ready_message(buffer)
+                    elif tag == MPI_TAGS.DONE.value:
+                        results = job_messages.decode_batch(buffer)
+                        self.outstanding_jobs[slave] -= len(results)
+                        self.add_results(results)
+
+                self.send_work_to_slaves()
+                if self.should_send_results():
+                    self.send_results()
+                if not received:
+                    time.sleep(MASTER_POLLING_PERIOD_S)
+
+            self.terminate_slaves()
+            self.comm.Send([bytearray(0), MPI.BYTE], dest=0, tag=MPI_TAGS.EXIT.value)
+
+        except KeyboardInterrupt:
+            self.comm.Isend([job_messages.encode_ready_message(0), MPI.BYTE], dest=0, tag=MPI_TAGS.READY.value)  # Non-blocking as the master might no longer be listening
+
+
+    def send_work_to_slaves(self):
+        """
+        Send the pending job requests one by one to the slaves with the least outstanding jobs
+        """
+        for nb_jobs in range(PREFETCH_DEPTH):
+            for slave in self.slaves:
+                if len(self.pending_requests) == 0:
+                    break
+                if self.outstanding_jobs[slave] == nb_jobs and nb_jobs < self.slave_credits[slave]:
+                    buffer = job_messages.encode_batch([self.pending_requests.popleft()])
+                    self.send_requests.append((self.node_comm.Isend([buffer, MPI.BYTE], dest=slave, tag=MPI_TAGS.START.value), buffer))
+                    self.outstanding_jobs[slave] += 1
+
+        if len(self.send_requests) > len(self.slaves):  # Release the buffers of the jobs that were received by the slaves
+            self.send_requests = [(request, buffer) for request, buffer in self.send_requests if not request.Test()]
+
+    def add_results(self, results: list[memoryview]):
+        for result in results:
+            if job_messages.get_batch_size(self.results + [result]) > MPI_RECV_BUFFER_SIZE:
+                self.send_results()
+            if len(self.results) == 0:
+                self.oldest_result_time = time.time()
+            self.results.append(result)
+
+    def should_send_results(self):
+        if len(self.results) == 0:
+            return False
+        if len(self.results) >= SUB_MASTER_RESULT_BATCH_SIZE:
+            return True
+        if time.time() - self.oldest_result_time > SUB_MASTER_FLUSH_PERIOD_S:
+            return True
+        # Do not delay new jobs if a slave is idle
+        return len(self.pending_requests) == 0 and min(self.outstanding_jobs.values()) == 0
+
+    def send_results(self):
+        logger.logger.log(logger.logging.TRACE, 'Sub-master {}: sending {} results to master'.format(self.rank, len(self.results)))
+        self.comm.Send([job_messages.encode_batch(self.results), MPI.BYTE], dest=0, tag=MPI_TAGS.DONE.value)
+        self.results = []
+
+
+    def terminate_slaves(self):
+        MPI.Request.Waitall([request for request, _ in self.send_requests])
+        self.send_requests = []
+        for slave in self.slaves:
+            self.node_comm.Send([bytearray(0), MPI.BYTE], dest=slave, tag=MPI_TAGS.EXIT.value)
+            self.node_comm.Recv([bytearray(0), MPI.BYTE], source=slave, tag=MPI_TAGS.EXIT.value)
+
+
+def get_hierarchical_topology():
+    """
+    Two-level topology: the master only communicates with one sub-master per node (the lowest rank of the node, or the
+    second lowest on the node of the master), and the sub-masters communicate with the other ranks of their node. A node
+    with a single rank besides the master has no sub-master (it would have no slave), this rank is a slave of the master.
+    Collective, must be called by all ranks. Return the node communicator, the world ranks of the ranks that the master
+    communicates with (sub-masters and slaves without sub-master), the world ranks of all sub-masters, and the node-local
+    ranks of the sub-master (None if the node has no sub-master) and slaves of the node
+    """
+    rank = MPI.COMM_WORLD.Get_rank()
+    node_comm = MPI.COMM_WORLD.Split_type(MPI.COMM_TYPE_SHARED)
+    node_ranks = node_comm.allgather(rank)  # World rank of each rank of the node (sorted as key defaults to the world rank)
+    local_ranks = [local_rank for local_rank, world_rank in enumerate(node_ranks) if world_rank != 0]
+    if len(local_ranks) >= 2:
+        sub_master, local_slaves = local_ranks[0], local_ranks[1:]
+    else:
+        sub_master, local_slaves = None, []
+    is_sub_master = sub_master is not None and node_ranks[sub_master] == rank
+    is_master_slave = rank != 0 and (is_sub_master or sub_master is None)
+    flags = MPI.COMM_WORLD.allgather((is_sub_master, is_master_slave))
+    sub_masters = [world_rank for world_rank, (sub_master_flag, _) in enumerate(flags) if sub_master_flag]
+    master_slaves = [world_rank for world_rank, (_, master_slave_flag) in enumerate(flags) if master_slave_flag]
+    return node_comm, master_slaves, sub_masters, sub_master, local_slaves
@@ -0,0 +1,161 @@
+from __future__ import annotations
+from common import *
+if WITH_LXML:
+    from lxml import etree
+else:
+    import xml.etree.ElementTree as etree
+
+"""
+Streaming writer for the dyd and par files (see STREAMING_XML_WRITER). The part of the files that is common to all jobs
+of a static sample (base files + dynamic data) is serialised once, and the elements of a job are written to the file as
+they are generated (ElementWriter, given to the functions that add them instead of the roots, see sub_element()), so
+that they are never kept in memory. Elements are written without indentation and with the Dynawo namespace as default
+namespace, the files are otherwise identical to the ones written with ElementTree (see benchmarks/write_job_files.py
+--check and --check-synthetic).
+"""
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+
+
+def get_local_name(tag) -> str:
+    tag = str(tag)  # ElementTree keeps the QName objects used to create elements
+    if tag[0] == '{':
+        namespace, local_name = tag[1:].split('}')
+        if namespace != DYNAWO_NAMESPACE:
+            raise ValueError('Unexpected namespace {}'.format(namespace))
+        return local_name
+    return tag
+
+def escape_text(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def escape_attribute(value: str) -> str:
+    return escape_text(value).replace('"', '&quot;').replace('\n', '&#10;').replace('\r', '&#13;').replace('\t', '&#09;')
+
+def serialise_element(element, parts: list[str]):
+    """
+    Append the serialisation of element (and its children) to parts. Whitespace-only text is dropped (indentation)
+    """
+    if element.tag is etree.Comment:
+        parts.append('<!--{}-->'.format(element.text))
+    else:
+        tag = get_local_name(element.tag)
+        parts.append('<' + tag)
+        for name, value in element.attrib.items():
+            parts.append(' {}="{}"'.format(get_local_name(name), escape_attribute(value)))
+        text = element.text if element.text is not None and element.text.strip() else ''
+        if len(element) == 0 and text == '':
+            parts.append('/>')
+        else:
+            parts.append('>' + escape_text(text))
+            for child in element:
+                serialise_element(child, parts)
+            parts.append('</{}>'.format(tag))
+    if element.tail is not None and element.tail.strip():
+        parts.append(escape_text(element.tail))
+
+
+def serialise_root(root) -> tuple[bytes, bytes]:
+    """
+    Serialise a root and its children, return the start of the file (up to the last child) and the end of the file
+    (end tag of the root), the elements of the jobs are written in between
+    """
+    tag = get_local_name(root.tag)
+    parts = [XML_DECLARATION, '<{} xmlns="{}"'.format(tag, DYNAWO_NAMESPACE)]
+    for name, value in root.attrib.items():
+        parts.append(' {}="{}"'.format(get_local_name(name), escape_attribute(value)))
+    parts.append('>')
+    for child in root:
+        serialise_element(child, parts)
+    return ''.join(parts).encode('utf-8'), '</{}>\n'.format(tag).encode('utf-8')
+
+
+class ElementWriter:
+    """
+    Writes the elements of a job to a file as they are created (used in place of the root of the file). Elements can
+    have children (e.g. par of a set), but no grandchildren: the last element is kept open until the next one is added
+    """
+    def __init__(self, path, start: bytes, end: bytes):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.parts: list[str] = []
+        self.open_tag = None  # Local name of the last element, None if closed
+        self.open_has_children = False
+        self.nb_elements = 0
+        self.libs: set[str] = set()  # Libraries of the black box models written (see compilation_cache.get_model_set())
+
+    def __enter__(self) -> ElementWriter:
+        self.file = open(self.path, 'wb')
+        self.file.write(self.start)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close_element()
+        self.parts.append(self.end.decode('utf-8'))
+        self.flush()
+        self.file.close()
+
+    def flush(self):
+        self.file.write(''.join(self.parts).encode('utf-8'))
+        self.parts = []
+
+    def close_element(self):
+        if self.open_tag is not None:
+            self.parts.append('</{}>'.format(self.open_tag) if self.open_has_children else '/>')
+            self.open_tag = None
+        if len(self.parts) > 1000:
+            self.flush()
+
+    def sub_element(self, tag, attrib: dict) -> OpenElement:
+        self.close_element()
+        self.open_tag = get_local_name(tag)
+        self.open_has_children = False
+        self.nb_elements += 1
+        self.parts.append('<' + self.open_tag)
+        for name, value in attrib.items():
+            self.parts.append(' {}="{}"'.format(get_local_name(name), escape_attribute(value)))
+        if 'lib' in attrib:
+            self.libs.add(attrib['lib'])
+        return OpenElement(self)
+
+    def add_child(self, tag, attrib: dict):
+        if not self.open_has_children:
+            self.parts.append('>')
+            self.open_has_children = True
+        self.parts.append('<' + get_local_name(tag))
+        for name, value in attrib.items():
+            self.parts.append(' {}="{}"'.format(get_local_name(name), escape_attribute(value)))
+        self.parts.append('/>')
+
+    def append(self, element):
+        """
+        Write a complete element (e.g. a comment), as Element.append()
+        """
+        self.close_element()
+        self.nb_elements += 1
+        serialise_element(element, self.parts)
+
+
+class OpenElement:
+    """
+    Last element written by an ElementWriter, to which children can still be added
+    """
+    def __init__(self, writer: ElementWriter):
+        self.writer = writer
+        self.index = writer.nb_elements
+
+    def sub_element(self, tag, attrib: dict):
+        if self.writer.open_tag is None or self.writer.nb_elements != self.index:
+            raise RuntimeError('Children can only be added to the last element written')
+        self.writer.add_child(tag, attrib)
+
+
+def sub_element(parent, tag, attrib: dict):
+    """
+    Same as etree.SubElement(parent, tag, attrib), parent can also be an ElementWriter (or an element that it returned),
+    the element is then directly written to its file (and None is returned for children)
+    """
+    if isinstance(parent, (ElementWriter, OpenElement)):
+        return parent.sub_element(tag, attrib)
+    return etree.SubElement(parent, tag, attrib)